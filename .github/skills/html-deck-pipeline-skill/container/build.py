@@ -0,0 +1,281 @@
+"""把讲稿构建为可直接静态托管的目录（无需运行 serve.py）。
+
+按 serve.py 的路由规则（`DeckHandler._static_route`）解析页面用到的全部资源，写出：
+- index.html：与 serve.py 相同的注入结果，另把 slides-config.json、css/config.yaml 与资源清单内联为
+  `window.__CONFIG.build`，deck.js 启动时不再请求配置文件
+- 带内容指纹的资源文件（`name.<hash>.ext`），可按 `Cache-Control: immutable` 长期缓存；slide 片段中相对路径的
+  `src` / `href`（图片等）一并写出，并改写为带指纹的路径
+- 每个 (主题, 字号) 的合并样式表（与 serve.py 的 `css/compiled/` 同版本）
+- 文本资源的 `.gz` / `.br` 预压缩版本（安装 brotli 后才有 br），静态服务器可按 Accept-Encoding 直接发送
+
+重复构建是增量的：源文件 (mtime, size) 未变时不重读，带指纹的输出已存在即跳过，index.html 内容不变时
+不重写；不再被引用的旧版本文件在构建结束时删除。
+
+用法:
+  python build.py <target_dir> [-o <out_dir>] [--theme dark-theme-2] [--no-compress] [--clean]
+"""
+
+import argparse
+import hashlib
+import json
+import mimetypes
+import posixpath
+import re
+import shutil
+import time
+from pathlib import Path
+
+from serve import (
+    COMPRESSIBLE_TYPES, CONTAINER, ENCODERS, MIN_COMPRESS_BYTES, AssetCache, Deck, DeckHandler, StylesheetCompiler,
+    atomic_write_text, default_fontsize, default_theme, load_deck_config, read_slides_config,
+)
+
+STATE_FILE = ".build-state.json"
+STATE_FORMAT = "deck-build-state/1"
+FINGERPRINT_LEN = 10
+ENCODING_SUFFIX = {"gzip": ".gz", "br": ".br"}
+ASSET_REF_RE = re.compile(r'\b(href|src)="([^"?#:]+)(?:\?v=[^"]*)?"')
+
+
+def fingerprinted(url: str, digest: str) -> str:
+    """"js/deck.js" + 摘要 → "js/deck.<摘要前 10 位>.js"（无扩展名时追加在末尾）。"""
+    stem, dot, ext = url.rpartition(".")
+    if not dot or "/" in ext or stem.endswith("/"):
+        return f"{url}.{digest[:FINGERPRINT_LEN]}"
+    return f"{stem}.{digest[:FINGERPRINT_LEN]}.{ext}"
+
+
+def configure_handler(theme: str | None = None) -> dict:
+    """按 serve.py main() 的方式设置 DeckHandler 的主题 / 字号状态，返回 css/config.yaml 内容。"""
+    deck_config = load_deck_config()
+    DeckHandler.deck_config = deck_config
+    DeckHandler.theme_names = {t["id"] for t in deck_config.get("themes", [])}
+    DeckHandler.fontsize_names = {fs["id"] for fs in deck_config.get("fontsizes", [])}
+    DeckHandler.theme_dir = CONTAINER / "css" / "theme" / (theme or default_theme(deck_config))
+    DeckHandler.watch_mode = False
+    DeckHandler.asset_cache = AssetCache()
+    DeckHandler.stylesheets = StylesheetCompiler(DeckHandler.asset_cache)
+    DeckHandler._index_cache = None
+    return deck_config
+
+
+class StaticBuilder:
+    """一次构建：收集页面会请求的 URL → 经 serve.py 路由解析为源文件 → 写出带指纹的输出与预压缩版本。
+
+    构建状态（源文件 mtime/size/摘要、输出文件及其预压缩后缀）保存在输出目录的 .build-state.json。
+    """
+
+    def __init__(self, deck: Deck, out_dir: Path, compress: bool = True) -> None:
+        self.deck = deck
+        self.out_dir = out_dir
+        self.compress = compress
+        self.assets: dict = {}   # URL → 输出相对路径
+        self.sources: dict = {}  # 源文件绝对路径 → [mtime_ns, size, 摘要]
+        self.outputs: dict = {}  # 输出相对路径 → 已写出的预压缩后缀
+        self.written = 0
+        self.skipped = 0
+        self.removed = 0
+        state = self._load_state()
+        self._old_sources = state.get("sources", {})
+        self._old_outputs = state.get("outputs", {})
+        self._reuse = state.get("compress") == compress  # 切换 --no-compress 后全部重写
+
+    def _load_state(self) -> dict:
+        try:
+            state = json.loads((self.out_dir / STATE_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return state if state.get("format") == STATE_FORMAT else {}
+
+    def build(self) -> None:
+        slides_config = read_slides_config(self.deck.target_dir) or {}
+        deck_config = DeckHandler.deck_config or {}
+
+        for theme in sorted(DeckHandler.theme_names):
+            for fontsize in sorted(DeckHandler.fontsize_names):
+                sheet = DeckHandler.stylesheets.get(theme, fontsize)
+                if sheet is not None:
+                    url = f"css/compiled/{theme}/{fontsize}.css"
+                    self.assets[url] = self._emit(fingerprinted(url, sheet.etag.strip('"')), lambda s=sheet: s.data)
+
+        index = DeckHandler._rendered_index()
+        if index is None:
+            raise FileNotFoundError("container/index.html")
+        html = index.data.decode("utf-8")
+        slide_urls = self._slide_urls(slides_config)
+        for url in slide_urls:
+            if url not in self.assets:
+                self.add_file(url, link_assets=True)
+        for url in dict.fromkeys([*self._runtime_urls(), *(m[2] for m in ASSET_REF_RE.finditer(html))]):
+            if url not in self.assets:
+                self.add_file(url)
+
+        html = ASSET_REF_RE.sub(lambda m: f'{m[1]}="{self.assets[m[2]]}"' if m[2] in self.assets else m[0], html)
+        build = {
+            "assets": self.assets,
+            "slidesConfig": slides_config,
+            "cssConfig": {"themes": deck_config.get("themes", []), "fontsizes": deck_config.get("fontsizes", [])},
+        }
+        inline = json.dumps(build, ensure_ascii=False).replace("</", "<\\/")
+        html = html.replace("</head>", f"  <script>(window.__CONFIG = window.__CONFIG || {{}}).build = {inline};</script>\n</head>")
+        self._emit("index.html", html.encode("utf-8"), content_addressed=False)
+        if slides_config:
+            self._emit("slides-config.json", json.dumps(slides_config, ensure_ascii=False, indent=2).encode("utf-8"),
+                       content_addressed=False)
+
+        self._remove_stale()
+        state = {"format": STATE_FORMAT, "compress": self.compress, "sources": self.sources, "outputs": self.outputs}
+        atomic_write_text(self.out_dir / STATE_FILE, json.dumps(state, ensure_ascii=False, indent=1))
+
+    @staticmethod
+    def _slide_urls(slides_config: dict) -> list:
+        """slides-config.json 列出的 slide 片段（deck.js 运行时按名称请求）。"""
+        return [f"slides/{s.get('part', '')}/{s.get('file', '')}" for s in slides_config.get("slides", [])]
+
+    def _runtime_urls(self) -> list:
+        """deck.js 运行时按名称请求的其余资源：章节样式、骨架 CSS（导出与主题切换用）。"""
+        urls = []
+        style_dir = self.deck.target_dir / "style"
+        if style_dir.is_dir():
+            urls += [f"style/{p.relative_to(style_dir).as_posix()}" for p in sorted(style_dir.rglob("*")) if p.is_file()]
+        css_dir = DeckHandler.stylesheets.css_dir
+        urls += [f"css/common/{p.name}" for p in sorted((css_dir / "common").glob("*.css"))]
+        urls += [f"css/theme/{t}/tokens.css" for t in sorted(DeckHandler.theme_names)]
+        urls += [f"css/fontsize/{f}.css" for f in sorted(DeckHandler.fontsize_names)]
+        return urls + ["css/config.yaml"]
+
+    def add_file(self, url: str, link_assets: bool = False) -> str | None:
+        """按 serve.py 的路由解析 URL 并写出带指纹的副本；不对应文件时返回 None。
+
+        link_assets 用于 slide 片段：写出其中引用的资源并改写引用，摘要按改写后的内容计算（每次都读源文件）。
+        """
+        route = DeckHandler._static_route("/" + url, self.deck)
+        if route is None:
+            return None
+        try:
+            src = DeckHandler._resolve_file(route[0], "/" + url, route[1])
+            st = src.stat()
+        except OSError:
+            return None
+        stamp = [st.st_mtime_ns, st.st_size]
+        cached = self._old_sources.get(str(src))
+        data = None
+        if link_assets:
+            data = self._link_assets(src.read_bytes())
+            digest = hashlib.blake2b(data, digest_size=12).hexdigest()
+        elif cached is not None and cached[:2] == stamp:
+            digest = cached[2]
+        else:
+            data = src.read_bytes()
+            digest = hashlib.blake2b(data, digest_size=12).hexdigest()
+        self.sources[str(src)] = [*stamp, digest]
+        rel = self._emit(fingerprinted(url, digest), lambda: data if data is not None else src.read_bytes())
+        self.assets[url] = rel
+        return rel
+
+    def _link_assets(self, data: bytes) -> bytes:
+        """slide 片段插入 index 后按页面根路径解析：相对的 src / href 指向的文件写出后换成带指纹的路径。"""
+        def link(m: re.Match) -> str:
+            url = posixpath.normpath(m[2])
+            if url.startswith(("/", "..")):
+                return m[0]
+            rel = self.assets.get(url) or self.add_file(url)
+            return f'{m[1]}="{rel}"' if rel else m[0]
+        return ASSET_REF_RE.sub(link, data.decode("utf-8")).encode("utf-8")
+
+    def _emit(self, rel: str, data, content_addressed: bool = True) -> str:
+        """写出一个输出文件及其预压缩版本。
+
+        content_addressed 时文件名即版本，上次已写出且仍存在就跳过（不读源文件）；否则比较内容，相同则跳过。
+        """
+        path = self.out_dir / rel
+        previous = self._old_outputs.get(rel)
+        up_to_date = self._reuse and previous is not None and path.is_file() and all(
+            path.with_name(path.name + suffix).is_file() for suffix in previous)
+        if content_addressed and up_to_date:
+            self.outputs[rel] = previous
+            self.skipped += 1
+            return rel
+        body = data() if callable(data) else data
+        if up_to_date and path.read_bytes() == body:
+            self.outputs[rel] = previous
+            self.skipped += 1
+            return rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write(path, body)
+        self.outputs[rel] = self._precompress(path, body)
+        self.written += 1
+        return rel
+
+    def _precompress(self, path: Path, body: bytes) -> list:
+        mime = mimetypes.guess_type(path.name)[0] or ""
+        suffixes = []
+        for encoding, encode in ENCODERS.items():
+            target = path.with_name(path.name + ENCODING_SUFFIX[encoding])
+            packed = None
+            if self.compress and len(body) >= MIN_COMPRESS_BYTES and mime.startswith(COMPRESSIBLE_TYPES):
+                packed = encode(body)
+            if packed is not None and len(packed) < len(body):
+                self._write(target, packed)
+                suffixes.append(ENCODING_SUFFIX[encoding])
+            elif target.exists():
+                target.unlink()
+        return suffixes
+
+    @staticmethod
+    def _write(path: Path, body: bytes) -> None:
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(body)
+        tmp.replace(path)
+
+    def _remove_stale(self) -> None:
+        """删除上次构建写出、这次不再引用的文件（旧指纹版本）及其预压缩版本。"""
+        for rel, suffixes in self._old_outputs.items():
+            if rel in self.outputs:
+                continue
+            path = self.out_dir / rel
+            for victim in [path, *(path.with_name(path.name + s) for s in suffixes)]:
+                try:
+                    victim.unlink()
+                except FileNotFoundError:
+                    continue
+            self.removed += 1
+            parent = path.parent
+            while parent != self.out_dir and parent.is_dir() and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="把讲稿构建为可静态托管的目录")
+    parser.add_argument("target", nargs="?", default=".", help="目标目录（包含 slides-config.json 和 slides/）")
+    parser.add_argument("-o", "--out", default=None, help="输出目录（默认：与目标目录同级的 <目录名>-dist）")
+    parser.add_argument("--theme", default=None, help="首屏使用的主题（默认从 config.yaml 读取）")
+    parser.add_argument("--no-compress", action="store_true", help="不生成 .gz / .br 预压缩文件")
+    parser.add_argument("--clean", action="store_true", help="先清空输出目录再完整构建")
+    args = parser.parse_args()
+
+    deck = Deck(Path(args.target))
+    if not (deck.target_dir / "slides-config.json").is_file():
+        print(f"错误：目标目录缺少 slides-config.json: {deck.target_dir}")
+        return
+    out_dir = Path(args.out).resolve() if args.out else deck.target_dir.with_name(f"{deck.target_dir.name}-dist")
+    if out_dir == deck.target_dir or deck.target_dir in out_dir.parents:
+        print(f"错误：输出目录不能位于目标目录内: {out_dir}")
+        return
+    if args.clean and out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    deck_config = configure_handler(args.theme)
+    t0 = time.perf_counter()
+    builder = StaticBuilder(deck, out_dir, compress=not args.no_compress)
+    builder.build()
+    print(f"目标目录: {deck.target_dir}")
+    print(f"首屏样式: {DeckHandler.theme_dir.name} / {default_fontsize(deck_config)}")
+    print(f"构建完成: {out_dir}（写入 {builder.written} 个文件，{builder.skipped} 个未变化，"
+          f"删除 {builder.removed} 个旧版本，{time.perf_counter() - t0:.2f}s）")
+
+
+if __name__ == "__main__":
+    main()
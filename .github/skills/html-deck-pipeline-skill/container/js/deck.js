@@ -7,6 +7,56 @@
   let currentIdx = 0;
   let currentPart = 'ch01';
   let loadedPartCss = new Set();
+  const DECK_CFG = (window.__CONFIG && window.__CONFIG.deck) || {};
+  const PREFETCH_RADIUS = DECK_CFG.prefetchRadius ?? 2;
+  // Static build (container/build.py): inlined configs + URL → fingerprinted file manifest
+  const BUILD = (window.__CONFIG && window.__CONFIG.build) || null;
+
+  function assetUrl(path) {
+    return (BUILD && BUILD.assets[path]) || path;
+  }
+
+  /* ── Fragment cache: bounded LRU of slide HTML, mirrored to sessionStorage so it survives reloads ──
+     Entries carry the server content hash (GET slides-index); a hash mismatch is a miss. */
+  const fragments = {
+    max: DECK_CFG.fragmentCacheSize ?? 24,
+    map: new Map(),      // slideKey → { hash, html }
+    hashes: new Map(),   // slideKey → current content hash from the server (empty when statically hosted)
+    prefix: 'deck-fragment:' + location.pathname + ':',
+
+    get(key) {
+      let entry = this.map.get(key);
+      if (!entry && this.hashes.has(key)) {
+        // Persisted copies are only trusted when the server can vouch for their hash
+        try { entry = JSON.parse(sessionStorage.getItem(this.prefix + key)); } catch { entry = null; }
+      }
+      if (!entry || (this.hashes.has(key) && this.hashes.get(key) !== entry.hash)) {
+        if (entry) this.delete(key);
+        return undefined;
+      }
+      this.map.delete(key);
+      this.map.set(key, entry);
+      return entry.html;
+    },
+
+    has(key) { return this.get(key) !== undefined; },
+
+    set(key, html, hash) {
+      if (hash) this.hashes.set(key, hash);
+      const entry = { hash: hash || this.hashes.get(key) || null, html };
+      this.map.delete(key);
+      this.map.set(key, entry);
+      if (entry.hash) {
+        try { sessionStorage.setItem(this.prefix + key, JSON.stringify(entry)); } catch { /* quota: memory only */ }
+      }
+      while (this.map.size > this.max) this.delete(this.map.keys().next().value);
+    },
+
+    delete(key) {
+      this.map.delete(key);
+      try { sessionStorage.removeItem(this.prefix + key); } catch { /* ignore */ }
+    }
+  };
 
   const deck = document.getElementById('deck');
   const progressBar = document.querySelector('#deck-progress .bar');
@@ -18,7 +68,7 @@
     if (loadedPartCss.has(part)) return;
     const link = document.createElement('link');
     link.rel = 'stylesheet';
-    link.href = `style/${part}.css`;
+    link.href = assetUrl(`style/${part}.css`);
     link.id = `css-${part}`;
     document.head.appendChild(link);
     loadedPartCss.add(part);
@@ -59,12 +109,22 @@
     if (!s) return;
 
     setPart(s.part);
-    const url = `slides/${s.part}/${s.file}`;
+    const key = s.part + '/' + s.file;
+    const url = assetUrl(`slides/${s.part}/${s.file}`);
 
     try {
-      const res = await fetch(url);
-      if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      const html = await res.text();
+      let html = fragments.get(key);
+      if (html === undefined && fragments.hashes.size) {
+        // One request brings the slide and its neighbours
+        await fetchRange(idx - PREFETCH_RADIUS, idx + PREFETCH_RADIUS + 1);
+        html = fragments.get(key);
+      }
+      if (html === undefined) {
+        const res = await fetch(url);
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        html = await res.text();
+        fragments.set(key, html);
+      }
 
       deck.innerHTML = html;
       const slideEl = deck.querySelector('.slide');
@@ -78,6 +138,7 @@
       updateProgress();
       updatePartNav();
       updateHash();
+      schedulePrefetch(idx);
       // Editor hook: notify editor that a new slide has loaded
       if (window.__deckAPI && typeof window.__deckAPI.onSlideLoaded === 'function') {
         window.__deckAPI.onSlideLoaded();
@@ -87,6 +148,58 @@
     }
   }
 
+  /* ── Prefetch ±PREFETCH_RADIUS slides in idle time so flips never wait on the network ── */
+  let prefetchHandle = 0;
+  const inflight = new Map();  // "from-to" → Promise
+
+  function fetchRange(from, to) {
+    from = Math.max(0, from);
+    to = Math.min(SLIDES.length, to);
+    const id = `${from}-${to}`;
+    if (from >= to) return Promise.resolve();
+    if (inflight.has(id)) return inflight.get(id);
+    const p = fetch(`bundle?from=${from}&to=${to}`)
+      .then(res => (res.ok ? res.json() : null))
+      .then(bundle => {
+        if (!bundle) return;
+        bundle.slides.forEach(s => {
+          if (s.html !== null) fragments.set(s.part + '/' + s.file, s.html, s.hash);
+        });
+      })
+      .catch(() => {})
+      .finally(() => inflight.delete(id));
+    inflight.set(id, p);
+    return p;
+  }
+
+  function schedulePrefetch(idx) {
+    if (!fragments.hashes.size || PREFETCH_RADIUS <= 0) return;  // not served by serve.py
+    const idle = window.requestIdleCallback || (cb => setTimeout(cb, 50));
+    const cancel = window.cancelIdleCallback || clearTimeout;
+    if (prefetchHandle) cancel(prefetchHandle);
+    prefetchHandle = idle(() => {
+      prefetchHandle = 0;
+      const missing = [];
+      for (let i = idx - PREFETCH_RADIUS; i <= idx + PREFETCH_RADIUS; i++) {
+        const s = SLIDES[i];
+        if (s && !fragments.has(s.part + '/' + s.file)) missing.push(i);
+      }
+      if (missing.length) fetchRange(missing[0], missing[missing.length - 1] + 1);
+    });
+  }
+
+  // GET slides-index: content hash per slide, used to validate cached fragments across reloads
+  async function fetchSlideIndex() {
+    if (BUILD) return;  // fingerprinted URLs already version every slide
+    try {
+      const res = await fetch('slides-index');
+      if (!res.ok) return;
+      const index = await res.json();
+      fragments.hashes.clear();
+      index.slides.forEach(s => { if (s.hash) fragments.hashes.set(s.part + '/' + s.file, s.hash); });
+    } catch { /* statically hosted: no hashes, fragments cached for this page only */ }
+  }
+
   /* ── Navigate ── */
   function next() { if (currentIdx < SLIDES.length - 1) loadSlide(currentIdx + 1); }
   function prev() { if (currentIdx > 0) loadSlide(currentIdx - 1); }
@@ -105,6 +218,7 @@
   /* ── Part nav buttons ── */
   function buildPartNav() {
     if (!partNav) return;
+    partNav.innerHTML = '';
     PART_ORDER.forEach(part => {
       const btn = document.createElement('button');
       btn.textContent = PART_LABELS[part];
@@ -114,6 +228,14 @@
     });
   }
 
+  // 缩略图 URL（serve.py /thumbs，按内容哈希缓存在磁盘）；静态构建没有该端点
+  function thumbnailUrl(idx) {
+    const s = SLIDES[idx];
+    if (!s || BUILD) return null;
+    const q = `theme=${encodeURIComponent(getTheme())}&fontsize=${encodeURIComponent(getFontSize())}`;
+    return `thumbs/${s.part}/${s.file.replace(/\.html$/, '')}.webp?${q}`;
+  }
+
   function updatePartNav() {
     if (!partNav) return;
     partNav.querySelectorAll('button').forEach(btn => {
@@ -168,6 +290,10 @@
   let deckConfig = null;  // { themes: [...], fontsizes: [...] }
 
   async function loadConfig() {
+    if (BUILD && BUILD.cssConfig) {
+      deckConfig = BUILD.cssConfig;
+      return;
+    }
     try {
       const res = await fetch('css/config.yaml');
       if (!res.ok) throw new Error(`HTTP ${res.status}`);
@@ -228,20 +354,72 @@
     return defaultThemeId();
   }
 
+  /* ── Compiled stylesheet (serve.py merges tokens + fontsize + common CSS per theme/fontsize) ── */
+  // window.__CONFIG.stylesheets = { "theme/fontsize": version }; absent when statically hosted
+  let compiledVersions = (window.__CONFIG && window.__CONFIG.stylesheets) || null;
+
+  function compiledCssHref(theme, fontsize) {
+    const built = BUILD && BUILD.assets[`css/compiled/${theme}/${fontsize}.css`];
+    if (built) return built;
+    const v = compiledVersions[theme + '/' + fontsize];
+    return `css/compiled/${theme}/${fontsize}.css` + (v ? `?v=${v}` : `?t=${Date.now()}`);
+  }
+
+  // Settles once *link* has loaded (or failed)
+  function sheetLoaded(link) {
+    return new Promise(resolve => {
+      link.addEventListener('load', resolve, { once: true });
+      link.addEventListener('error', resolve, { once: true });
+    });
+  }
+
+  // Point #deck-css at the sheet for the current theme/fontsize; keep the old sheet until the new one loads.
+  // Resolves when the new sheet is in effect.
+  function applyCompiledCss() {
+    const link = document.getElementById('deck-css');
+    if (!link || !compiledVersions) return Promise.resolve();
+    const root = document.documentElement;
+    const href = compiledCssHref(root.getAttribute('data-theme') || getTheme(),
+                                 root.getAttribute('data-font-size') || getFontSize());
+    if (link.getAttribute('href') === href) return Promise.resolve();
+    const fresh = link.cloneNode();
+    fresh.setAttribute('href', href);
+    link.removeAttribute('id');
+    const loaded = sheetLoaded(fresh).then(() => link.remove());
+    link.after(fresh);
+    return loaded;
+  }
+
+  async function refreshCompiledCss() {
+    try {
+      const res = await fetch('css/compiled/versions.json', { cache: 'no-store' });
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      compiledVersions = await res.json();
+    } catch (e) {
+      compiledVersions = {};  // unknown versions → uncached URLs until the next full load
+    }
+    applyCompiledCss();
+    applyAutoScale();
+  }
+
   function applyTheme(theme) {
     document.documentElement.setAttribute('data-theme', theme);
+    const pending = [applyCompiledCss()];
     // Swap CSS link hrefs to point to the selected theme directory
     const links = document.querySelectorAll('link[rel="stylesheet"][href^="css/"]');
     links.forEach(link => {
       // Extract filename from current href (e.g. "css/dark-theme-2/tokens.css" → "tokens.css")
-      const parts = link.href.split('/');
+      const parts = link.href.split('?')[0].split('/');
       const file = parts[parts.length - 1];
-      if (THEME_CSS.includes(file)) {
-        link.href = `css/theme/${theme}/${file}`;
+      const href = `css/theme/${theme}/${file}`;
+      if (THEME_CSS.includes(file) && link.getAttribute('href') !== href) {
+        pending.push(sheetLoaded(link));
+        link.href = href;
       }
     });
     const sel = document.getElementById('theme-select');
     if (sel) sel.value = theme;
+    return Promise.all(pending);
   }
 
   function onThemeChange() {
@@ -270,12 +448,18 @@
 
   function applyFontSize(fontsize) {
     document.documentElement.setAttribute('data-font-size', fontsize);
+    const pending = [applyCompiledCss()];
     const links = document.querySelectorAll('link[rel="stylesheet"][href^="css/fontsize/"]');
     links.forEach(link => {
-      link.href = `css/fontsize/${fontsize}.css`;
+      const href = `css/fontsize/${fontsize}.css`;
+      if (link.getAttribute('href') !== href) {
+        pending.push(sheetLoaded(link));
+        link.href = href;
+      }
     });
     const sel = document.getElementById('fontsize-select');
     if (sel) sel.value = fontsize;
+    return Promise.all(pending);
   }
 
   function onFontSizeChange() {
@@ -313,6 +497,61 @@
     }
   }
 
+  /* ── Hot reload (serve.py --watch pushes typed SSE events) ── */
+
+  // css-changed: swap only the matching <link>, keep the old sheet until the new one loads (no flash)
+  function reloadCss(data) {
+    const wanted = new Set((data && data.paths) || []);
+    if (document.getElementById('deck-css') && [...wanted].some(p => p.startsWith('css/'))) {
+      refreshCompiledCss();  // skeleton CSS is merged into #deck-css: re-resolve its version
+    }
+    document.querySelectorAll('link[rel="stylesheet"]').forEach(link => {
+      const href = (link.getAttribute('href') || '').split('?')[0];
+      if (!wanted.has(href)) return;
+      const fresh = link.cloneNode();
+      fresh.setAttribute('href', `${href}?v=${Date.now()}`);
+      const drop = () => link.remove();
+      fresh.addEventListener('load', drop, { once: true });
+      fresh.addEventListener('error', drop, { once: true });
+      link.after(fresh);
+    });
+    applyAutoScale();
+  }
+
+  // slide-changed: drop the cached fragment, re-render the current slide in place
+  function reloadSlide(data) {
+    if (data) fragments.delete(data.part + '/' + data.file);
+    const s = SLIDES[currentIdx];
+    if (!s || !data || s.part !== data.part || s.file !== data.file) {
+      schedulePrefetch(currentIdx);  // re-warm the neighbour if it was one
+      return;
+    }
+    // Don't clobber an in-progress text edit; the next navigation picks up the new file
+    if (deck.querySelector('[contenteditable="true"]')) return;
+    loadSlide(currentIdx);
+  }
+
+  // config-changed: slides-config.json is re-read in place; theme/fontsize registry needs a full reload
+  async function reloadConfig(data) {
+    const paths = (data && data.paths) || [];
+    if (paths.some(p => p !== 'slides-config.json')) {
+      location.reload();
+      return;
+    }
+    const cur = SLIDES[currentIdx];
+    const curKey = cur ? cur.part + '/' + cur.file : null;
+    try {
+      await fetchSlidesConfig();
+    } catch (err) {
+      console.error('Failed to reload slides-config.json:', err);
+      return;
+    }
+    await fetchSlideIndex();
+    buildPartNav();
+    const idx = SLIDES.findIndex(s => s.part + '/' + s.file === curKey);
+    loadSlide(idx >= 0 ? idx : Math.min(currentIdx, SLIDES.length - 1));
+  }
+
   /* ── Export single static HTML ── */
 
   async function exportToSingleHTML() {
@@ -328,15 +567,22 @@
       const fontsize = getFontSize();
       const themeCssPaths = THEME_CSS.map(f => `css/theme/${theme}/${f}`);
       const fontsizeCssPath = `css/fontsize/${fontsize}.css`;
-      const allCssParts = PART_ORDER.map(p => `style/${p}.css`);
-      const cssPaths = [...SHARED_CSS, ...themeCssPaths, fontsizeCssPath, ...allCssParts];
-      const cssTexts = await Promise.all(cssPaths.map(async path => {
+      // 全部 slide 片段与章节 CSS 一次取回（serve.py /bundle）；不可用时退回逐个请求
+      const bundle = await fetchBundle();
+      const fetchText = async (path, missing) => {
         try {
-          const res = await fetch(path);
-          return res.ok ? await res.text() : `/* ${path} not found */`;
-        } catch { return `/* ${path} failed */`; }
+          const res = await fetch(assetUrl(path));
+          return res.ok ? await res.text() : missing;
+        } catch { return missing; }
+      };
+      const cssPaths = [...SHARED_CSS, ...themeCssPaths, fontsizeCssPath];
+      const cssTexts = await Promise.all(cssPaths.map(path => fetchText(path, `/* ${path} not found */`)));
+      const partCss = await Promise.all(PART_ORDER.map(p => {
+        const path = `style/${p}.css`;
+        if (bundle) return bundle.css[p] !== undefined ? bundle.css[p] : `/* ${path} not found */`;
+        return fetchText(path, `/* ${path} not found */`);
       }));
-      const allCss = cssTexts.join('\n');
+      const allCss = [...cssTexts, ...partCss].join('\n');
 
       // Inject editor customizations if available
       let editorOverrides = '';
@@ -345,12 +591,13 @@
       }
 
       // 2. Fetch all slides
-      const slideHtmls = await Promise.all(SLIDES.map(async s => {
-        try {
-          const res = await fetch(`slides/${s.part}/${s.file}`);
-          return res.ok ? await res.text() : `<!-- ${s.file} load failed -->`;
-        } catch { return `<!-- ${s.file} load failed -->`; }
-      }));
+      const slideHtmls = bundle
+        ? bundle.slides.map(s => (s.html !== null ? s.html : `<!-- ${s.file} load failed -->`))
+        : await Promise.all(SLIDES.map(s => {
+          const html = fragments.get(s.part + '/' + s.file);
+          if (html !== undefined) return html;
+          return fetchText(`slides/${s.part}/${s.file}`, `<!-- ${s.file} load failed -->`);
+        }));
 
       // 3. Build the exported document
       const slidesHtml = slideHtmls.map((html, i) => {
@@ -693,6 +940,30 @@ ${slidesHtml}
   }
 
   /* ── Init ── */
+  async function fetchSlidesConfig() {
+    let config = BUILD && BUILD.slidesConfig;
+    if (!config) {
+      const res = await fetch('slides-config.json');
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      config = await res.json();
+    }
+    SLIDES = config.slides || [];
+    PART_LABELS = config.parts || {};
+    PART_ORDER = config.partOrder || Object.keys(config.parts || {});
+    if (config.title) document.title = config.title;
+  }
+
+  // GET /bundle: every slide fragment + part CSS in one versioned response; null when not served by serve.py
+  async function fetchBundle() {
+    if (BUILD) return null;
+    try {
+      const res = await fetch('bundle');
+      return res.ok ? await res.json() : null;
+    } catch {
+      return null;
+    }
+  }
+
   async function init() {
     // Load config.yaml first (themes + fontsizes)
     await loadConfig();
@@ -700,13 +971,7 @@ ${slidesHtml}
 
     // Fetch slides-config.json
     try {
-      const res = await fetch('slides-config.json');
-      if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      const config = await res.json();
-      SLIDES = config.slides || [];
-      PART_LABELS = config.parts || {};
-      PART_ORDER = config.partOrder || Object.keys(config.parts || {});
-      if (config.title) document.title = config.title;
+      await fetchSlidesConfig();
     } catch (err) {
       console.error('Failed to load slides-config.json:', err);
       return;
@@ -717,6 +982,7 @@ ${slidesHtml}
       return;
     }
 
+    await fetchSlideIndex();
     initTheme();
     initFontSize();
     buildPartNav();
@@ -747,6 +1013,15 @@ ${slidesHtml}
         return deck.querySelector('.slide.active');
       },
       applyAutoScale: applyAutoScale,
+      // Resolves once the slide is in the DOM and auto-scaled (used by scripts/measure_utilization.py)
+      goToSlide: function(idx) { return loadSlide(idx); },
+      // Switch theme / fontsize without persisting the choice; resolve once the stylesheets have loaded
+      setTheme: function(theme) { return applyTheme(theme); },
+      setFontSize: function(fontsize) { return applyFontSize(fontsize); },
+      thumbnailUrl: thumbnailUrl,
+      reloadCss: reloadCss,
+      reloadSlide: reloadSlide,
+      reloadConfig: reloadConfig,
       onSlideLoaded: null  // editor sets this
     };
   }
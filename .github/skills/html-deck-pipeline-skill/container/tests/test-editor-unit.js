@@ -5,6 +5,7 @@
  *   - rgbToHex utility
  *   - Undo/redo manager (push, undo, redo, canUndo, canRedo, max stack, redo-clears-on-new-push)
  *   - Modification storage (Map operations: storeMod, removeMod)
+ *   - Saved-override deletions (clearOverride, cssRules payload with null props)
  *   - hasPendingChanges logic
  *   - isSizeProperty logic
  *
@@ -116,6 +117,51 @@ function removeMod(store, key, path, prop) {
   if (em.size === 0) sm.delete(path);
 }
 
+// ── Saved-override deletions (mirrors clearOverride / unclearOverride / buildSavePayload) ──
+function clearOverride(saved, clearedStore, key, path, props) {
+  const rule = key && path && saved.has(key) && saved.get(key).get(path);
+  if (!rule) return [];
+  if (!clearedStore.has(key)) clearedStore.set(key, new Map());
+  const sc = clearedStore.get(key);
+  if (!sc.has(path)) sc.set(path, new Set());
+  const cleared = sc.get(path);
+  const marked = (props || Array.from(rule)).filter(p => rule.has(p) && !cleared.has(p));
+  marked.forEach(p => cleared.add(p));
+  return marked;
+}
+
+function unclearOverride(clearedStore, key, path, prop) {
+  const sc = clearedStore.get(key);
+  const cleared = sc && sc.get(path);
+  if (!cleared) return;
+  cleared.delete(prop);
+  if (cleared.size === 0) sc.delete(path);
+  if (sc.size === 0) clearedStore.delete(key);
+}
+
+function buildCssRules(modifications, clearedStore) {
+  const cssRules = [];
+  for (const [slideKey, slideMods] of modifications) {
+    for (const [path, props] of slideMods) {
+      if (props.size === 0) continue;
+      const rule = { slideKey: slideKey, selector: path, props: {} };
+      for (const [prop, value] of props) rule.props[prop] = value;
+      cssRules.push(rule);
+    }
+  }
+  for (const [slideKey, slideCleared] of clearedStore) {
+    for (const [path, props] of slideCleared) {
+      let rule = cssRules.find(r => r.slideKey === slideKey && r.selector === path);
+      if (!rule) {
+        rule = { slideKey: slideKey, selector: path, props: {} };
+        cssRules.push(rule);
+      }
+      props.forEach(prop => { if (!(prop in rule.props)) rule.props[prop] = null; });
+    }
+  }
+  return cssRules;
+}
+
 // ── hasPendingChanges logic ─────────────────────────────────────────────────
 function hasPendingChanges(modifications, domMods, textChanges, deletions) {
   if (modifications.size > 0) return true;
@@ -577,6 +623,50 @@ describe('Modification Storage (Map nesting)', () => {
   });
 });
 
+// ── Saved-override deletions ────────────────────────────────────────────────
+describe('Saved-override deletions', () => {
+  const savedStore = () => new Map([['slide-1', new Map([['div > p', new Set(['color', 'font-size'])]])]]);
+
+  it('reset of saved props is sent as null props', () => {
+    const cleared = new Map();
+    const marked = clearOverride(savedStore(), cleared, 'slide-1', 'div > p', ['color', 'margin-top']);
+    assertEqual(JSON.stringify(marked), '["color"]', 'only saved props are marked');
+    assertEqual(JSON.stringify(buildCssRules(new Map(), cleared)),
+      '[{"slideKey":"slide-1","selector":"div > p","props":{"color":null}}]');
+  });
+
+  it('reset of a whole element clears every saved prop', () => {
+    const cleared = new Map();
+    clearOverride(savedStore(), cleared, 'slide-1', 'div > p');
+    const rules = buildCssRules(new Map(), cleared);
+    assertEqual(JSON.stringify(rules[0].props), '{"color":null,"font-size":null}');
+  });
+
+  it('a new value for a cleared prop wins over the deletion', () => {
+    const mods = createModStore();
+    const cleared = new Map();
+    clearOverride(savedStore(), cleared, 'slide-1', 'div > p');
+    storeMod(mods, 'slide-1', 'div > p', 'color', 'red');
+    unclearOverride(cleared, 'slide-1', 'div > p', 'color');
+    const rules = buildCssRules(mods, cleared);
+    assertEqual(rules.length, 1, 'one merged rule');
+    assertEqual(JSON.stringify(rules[0].props), '{"color":"red","font-size":null}');
+  });
+
+  it('unclearing every prop drops the pending deletion', () => {
+    const cleared = new Map();
+    const marked = clearOverride(savedStore(), cleared, 'slide-1', 'div > p', ['color']);
+    marked.forEach(p => unclearOverride(cleared, 'slide-1', 'div > p', p));
+    assertEqual(cleared.size, 0, 'nothing left to delete');
+  });
+
+  it('elements without saved overrides are not marked', () => {
+    const cleared = new Map();
+    assertEqual(clearOverride(savedStore(), cleared, 'slide-2', 'h1').length, 0);
+    assertEqual(cleared.size, 0);
+  });
+});
+
 // ── hasPendingChanges ───────────────────────────────────────────────────────
 describe('hasPendingChanges', () => {
   it('returns false when all stores are empty', () => {
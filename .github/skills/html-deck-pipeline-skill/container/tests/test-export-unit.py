@@ -0,0 +1,83 @@
+"""test-export-unit.py — Unit tests for export.py (headless single-file HTML export).
+
+Run: python test-export-unit.py
+"""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+CONTAINER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(CONTAINER))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import export  # noqa: E402
+import serve  # noqa: E402
+
+make_deck = __import__("test-serve-unit").make_deck
+
+
+class ExportTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.target = make_deck(self.root / "deck")
+        self.deck_config = serve.load_deck_config()
+        self.theme = serve.default_theme(self.deck_config)
+        self.fontsize = serve.default_fontsize(self.deck_config)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def export(self, target: Path | None = None) -> str:
+        out = self.root / "out.html"
+        job = export.ExportJob(target or self.target, self.theme, self.fontsize, out)
+        export.export_deck(job, self.deck_config)
+        return out.read_text(encoding="utf-8")
+
+    def test_document_structure(self):
+        html = self.export()
+        self.assertTrue(html.startswith("<!doctype html>"))
+        self.assertTrue(html.rstrip().endswith("</html>"))
+        self.assertIn(f'data-theme="{self.theme}" data-font-size="{self.fontsize}"', html)
+        self.assertIn("<title>Test</title>", html)
+        self.assertIn(".part-ch01 h2 { color: red; }", html)
+        tokens = (CONTAINER / "css" / "theme" / self.theme / "tokens.css").read_text(encoding="utf-8")
+        self.assertIn(tokens, html)
+        self.assertNotIn("not found", html)
+        self.assertEqual(sorted(p.name for p in self.root.iterdir()), ["deck", "out.html"])  # 临时文件已替换
+
+    def test_only_first_slide_is_active(self):
+        html = self.export()
+        self.assertEqual(html.count('<section class="slide active">'), 1)
+        self.assertEqual(html.count('<section class="slide">'), 2)
+        self.assertLess(html.index("Slide 1"), html.index("Slide 2"))
+
+    def test_missing_files_leave_placeholders(self):
+        (self.target / "style" / "ch01.css").unlink()
+        (self.target / "slides" / "ch01" / "02-slide.html").unlink()
+        html = self.export()
+        self.assertIn("/* style/ch01.css not found */", html)
+        self.assertIn("<!-- 02-slide.html load failed -->", html)
+
+    def test_editor_overrides_are_included(self):
+        (self.target / "style" / "editor-overrides.css").write_text(".x { color: blue; }\n", encoding="utf-8")
+        self.assertIn(".x { color: blue; }", self.export())
+
+    def test_plan_jobs_names_outputs(self):
+        other = make_deck(self.root / "other")
+        jobs = export.plan_jobs([self.target], None, [self.theme], [self.fontsize])
+        self.assertEqual([j.out_path for j in jobs], [self.target / "Test-export.html"])
+        out = self.root / "dist"
+        jobs = export.plan_jobs([self.target, other], out, ["a", "b"], [self.fontsize])
+        self.assertEqual(sorted(j.out_path.name for j in jobs),
+                         ["deck-Test-a-export.html", "deck-Test-b-export.html",
+                          "other-Test-a-export.html", "other-Test-b-export.html"])
+        self.assertEqual(len({j.out_path for j in jobs}), 4)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
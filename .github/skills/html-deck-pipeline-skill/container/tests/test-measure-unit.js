@@ -0,0 +1,225 @@
+/**
+ * test-measure-unit.js — Unit tests for the utilization samplers (SAMPLER_JS)
+ *
+ * Runs the in-page sampling code of scripts/measure_utilization.py and
+ * internal-skill/measure-utilization/_measure_utilization.py against a mock DOM:
+ *   - the rects engine matches the points engine on hand-written layouts
+ *     (positioned wrappers, overlays, nested z-index contexts)
+ *   - the two engines agree on random layouts
+ *
+ * The mock elementFromPoint hit-tests in a simplified CSS 2.1 Appendix E paint order
+ * (box, negative-z contexts, in-flow descendants, positioned descendants by z), written
+ * independently of the rects engine.
+ *
+ * Run: node test-measure-unit.js
+ */
+
+const path = require('path');
+const fs = require('fs');
+
+// ── Test framework (minimal, zero deps) ──────────────────────────────────────
+const stats = { pass: 0, fail: 0 };
+const failures = [];
+
+function assertEqual(actual, expected, msg) {
+  if (actual === expected) {
+    stats.pass++;
+  } else {
+    stats.fail++;
+    failures.push(`${msg} — expected ${JSON.stringify(expected)}, got ${JSON.stringify(actual)}`);
+  }
+}
+
+function describe(label, fn) {
+  console.log(`\n${label}`);
+  fn();
+}
+
+function it(label, fn) {
+  try {
+    fn();
+  } catch (e) {
+    stats.fail++;
+    failures.push(`${label} — THREW: ${e.message}`);
+  }
+}
+
+function logResult() {
+  const total = stats.pass + stats.fail;
+  console.log(`\n${'='.repeat(50)}`);
+  console.log(`RESULTS: ${stats.pass} passed, ${stats.fail} failed, ${total} total`);
+  if (failures.length > 0) {
+    console.log(`\nFAILURES:`);
+    failures.forEach((f, i) => console.log(`  ${i + 1}) ${f}`));
+    process.exit(1);
+  } else {
+    console.log(`\nAll tests passed.`);
+  }
+}
+
+// ── Mock DOM ─────────────────────────────────────────────────────────────────
+const SKILL = path.join(__dirname, '..', '..');
+const SOURCES = [
+  path.join(SKILL, 'scripts', 'measure_utilization.py'),
+  path.join(SKILL, 'internal-skill', 'measure-utilization', '_measure_utilization.py'),
+];
+
+function loadSamplers(file) {
+  const src = fs.readFileSync(file, 'utf-8');
+  const start = src.indexOf('SAMPLER_JS = """') + 'SAMPLER_JS = """'.length;
+  const body = src.slice(start, src.indexOf('"""', start));
+  return new Function(`${body}; return { sampleRects, samplePoints };`)();
+}
+
+// el(tag, [left, top, width, height], style, children, text)
+function el(tag, [left, top, width, height], style = {}, children = [], text = '') {
+  const node = {
+    tagName: tag, children, parentElement: null, text,
+    style: {
+      backgroundColor: 'rgba(0, 0, 0, 0)', borderWidth: '0px', overflowX: 'visible', overflowY: 'visible',
+      visibility: 'visible', pointerEvents: 'auto', position: 'static', zIndex: 'auto', ...style,
+    },
+  };
+  children.forEach(c => { c.parentElement = node; });
+  node.getBoundingClientRect = () => ({ left, top, width, height, right: left + width, bottom: top + height });
+  node.getClientRects = () => [node.getBoundingClientRect()];
+  Object.defineProperty(node, 'textContent', { get: () => node.text + children.map(c => c.textContent).join('') });
+  node.querySelectorAll = () => {
+    const out = [];
+    const walk = e => e.children.forEach(c => { out.push(c); walk(c); });
+    walk(node);
+    return out;
+  };
+  return node;
+}
+
+// Simplified CSS 2.1 Appendix E: every positioned / z-indexed box is painted atomically
+function paintOrder(root) {
+  const out = [];
+  const stacked = e => e.style.position !== 'static' || (parseInt(e.style.zIndex, 10) || 0) !== 0;
+  const zOf = e => parseInt(e.style.zIndex, 10) || 0;
+  function collect(e, flow, layers) {
+    for (const c of e.children) {
+      if (stacked(c)) {
+        layers.push(c);
+      } else {
+        flow.push(c);
+        collect(c, flow, layers);
+      }
+    }
+  }
+  function paint(e) {
+    out.push(e);
+    const flow = [], layers = [];
+    collect(e, flow, layers);
+    layers.filter(c => zOf(c) < 0).sort((a, b) => zOf(a) - zOf(b)).forEach(paint);
+    flow.forEach(c => out.push(c));
+    layers.filter(c => zOf(c) >= 0).sort((a, b) => zOf(a) - zOf(b)).forEach(paint);
+  }
+  paint(root);
+  return out;
+}
+
+function measure(samplers, slide) {
+  const order = paintOrder(slide);
+  global.getComputedStyle = e => e.style;
+  global.document = {
+    body: {}, documentElement: {},
+    elementFromPoint(x, y) {
+      for (let i = order.length - 1; i >= 0; i--) {
+        const e = order[i];
+        const r = e.getBoundingClientRect();
+        if (e.style.visibility === 'visible' && e.style.pointerEvents !== 'none' &&
+            x >= r.left && x < r.right && y >= r.top && y < r.bottom) return e;
+      }
+      return null;
+    },
+  };
+  const box = slide.getBoundingClientRect();
+  return {
+    rects: Math.round(samplers.sampleRects(slide, box, 40, 40) * 10) / 10,
+    points: Math.round(samplers.samplePoints(slide, box, 40, 40) * 10) / 10,
+  };
+}
+
+const SLIDE = [0, 0, 800, 400];
+const slide = children => el('SECTION', SLIDE, {}, children);
+const half = [0, 0, 400, 400];
+const full = [0, 0, 800, 400];
+
+// ══════════════════════════════════════════════════════════════════════════════
+// TESTS
+// ══════════════════════════════════════════════════════════════════════════════
+
+for (const file of SOURCES) {
+  const samplers = loadSamplers(file);
+  const name = path.relative(SKILL, file);
+
+  describe(`${name}: hand-written layouts`, () => {
+    const cases = [
+      ['static paragraph', slide([el('P', half, {}, [], 'text')]), 50],
+      ['positioned non-content wrapper around content',
+        slide([el('DIV', full, { position: 'relative' }, [el('P', half, {}, [], 'text')])]), 50],
+      ['empty absolute overlay above content',
+        slide([el('P', half, {}, [], 'text'), el('DIV', full, { position: 'absolute' })]), 0],
+      ['content above a negative-z background layer',
+        slide([el('DIV', full, { position: 'absolute', zIndex: '-1' }), el('P', half, {}, [], 'text')]), 50],
+      ['negative-z child paints over its own positioned box',
+        slide([el('DIV', full, { position: 'relative', zIndex: '1' }, [el('P', half, { position: 'relative', zIndex: '-1' }, [], 'text')])]), 50],
+      ['nested z-index stays inside its parent context',
+        slide([
+          el('DIV', full, { position: 'relative', zIndex: '1' }, [el('P', half, { position: 'relative', zIndex: '5' }, [], 'text')]),
+          el('DIV', full, { position: 'absolute', zIndex: '3' }),
+        ]), 0],
+      ['later positioned sibling paints over an earlier one\'s whole subtree',
+        slide([
+          el('DIV', half, { position: 'absolute' }, [el('P', half, {}, [], 'text')]),
+          el('DIV', full, { position: 'relative' }),
+        ]), 0],
+      ['pointer-events:none overlay is transparent to hit-testing',
+        slide([el('P', half, {}, [], 'text'), el('DIV', full, { position: 'absolute', pointerEvents: 'none' })]), 50],
+    ];
+    for (const [label, tree, expected] of cases) {
+      it(label, () => {
+        const { rects, points } = measure(samplers, tree);
+        assertEqual(points, expected, `${name} points: ${label}`);
+        assertEqual(rects, expected, `${name} rects: ${label}`);
+      });
+    }
+  });
+
+  describe(`${name}: random layouts`, () => {
+    it('rects matches points', () => {
+      let seed = 7;
+      const rnd = n => { seed = (seed * 48271) % 2147483647; return seed % n; };  // MINSTD, exact in doubles
+      const tags = ['DIV', 'P', 'SPAN', 'H3', 'SECTION'];
+      const positions = ['static', 'static', 'static', 'relative', 'absolute'];
+      const make = (depth, [left, top, width, height]) => {
+        const children = [];
+        if (depth < 3) {
+          for (let i = rnd(4); i > 0; i--) {
+            children.push(make(depth + 1, [left + rnd(width) - 10, top + rnd(height) - 10, 20 + rnd(width), 10 + rnd(height)]));
+          }
+        }
+        const position = positions[rnd(positions.length)];
+        const style = {
+          position,
+          zIndex: position !== 'static' && rnd(3) === 0 ? String(rnd(5) - 1) : 'auto',
+          backgroundColor: rnd(5) === 0 ? 'red' : 'rgba(0, 0, 0, 0)',
+          visibility: rnd(20) === 0 ? 'hidden' : 'visible',
+        };
+        return el(tags[rnd(tags.length)], [left, top, width, height], style, children,
+                  !children.length && rnd(3) === 0 ? 'txt' : '');
+      };
+      let mismatches = 0;
+      for (let trial = 0; trial < 200; trial++) {
+        const { rects, points } = measure(samplers, make(0, SLIDE));
+        if (rects !== points) mismatches++;
+      }
+      assertEqual(mismatches, 0, `${name}: random layouts where rects != points`);
+    });
+  });
+}
+
+// ── Print results ──────────────────────────────────────────────────────────
+logResult();
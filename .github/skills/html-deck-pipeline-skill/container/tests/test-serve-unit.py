@@ -0,0 +1,1015 @@
+"""test-serve-unit.py — Unit tests for serve.py (in-process server, no browser).
+
+Run: python test-serve-unit.py
+"""
+
+from __future__ import annotations
+
+import gc
+import gzip
+import http.client
+import json
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+
+CONTAINER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(CONTAINER))
+
+import serve  # noqa: E402
+
+
+def make_deck(root: Path, n_slides: int = 3) -> Path:
+    """Create a minimal target directory with slides-config.json and slides/ch01/*.html."""
+    slides_dir = root / "slides" / "ch01"
+    slides_dir.mkdir(parents=True)
+    (root / "style").mkdir()
+    (root / "style" / "ch01.css").write_text(".part-ch01 h2 { color: red; }\n", encoding="utf-8")
+    slides = []
+    for i in range(n_slides):
+        name = f"{i + 1:02d}-slide.html"
+        (slides_dir / name).write_text(
+            f'<section class="slide">\n  <div class="slide-body">\n'
+            f'    <h2>Slide {i + 1}</h2>\n    <p>First</p>\n    <p>Second</p>\n'
+            f'  </div>\n</section>\n',
+            encoding="utf-8",
+        )
+        slides.append({"part": "ch01", "file": name, "title": f"Slide {i + 1}"})
+    config = {"title": "Test", "parts": {"ch01": "One"}, "partOrder": ["ch01"], "slides": slides}
+    (root / "slides-config.json").write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+    return root
+
+
+class ServerTestCase(unittest.TestCase):
+    """Starts a DeckServer on an ephemeral port against a temporary deck."""
+
+    watch = False
+    workers = 4
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.target = make_deck(Path(self._tmp.name))
+        deck_config = serve.load_deck_config()
+        serve.DeckHandler.decks = {"": serve.Deck(self.target)}
+        serve.DeckHandler.theme_dir = serve.CONTAINER / "css" / "theme" / serve.default_theme(deck_config)
+        serve.DeckHandler.deck_config = deck_config
+        serve.DeckHandler.theme_names = {t["id"] for t in deck_config["themes"]}
+        serve.DeckHandler.fontsize_names = {f["id"] for f in deck_config["fontsizes"]}
+        serve.DeckHandler.watch_mode = self.watch
+        serve.DeckHandler.log_message = lambda *a, **k: None
+        serve.DeckHandler.asset_cache = serve.AssetCache()
+        serve.DeckHandler.stylesheets = serve.StylesheetCompiler(serve.DeckHandler.asset_cache)
+        serve.DeckHandler.compress = True
+        serve.DeckHandler._index_cache = None
+        serve.DeckHandler.log_store = serve.SessionLogStore(self.target / "logs", max_entries=5)
+        serve.DeckHandler._bundle_cache.clear()
+        serve.DeckHandler.metrics = serve.Metrics()
+        serve.DeckHandler.thumbnails = serve.ThumbnailRenderer(Path(self._tmp.name) / ".thumbs")
+        if self.watch:
+            serve.DeckHandler.sse_hub = serve.SSEHub(keepalive=0.5)
+            serve.DeckHandler.sse_hub.start()
+        self.server = serve.DeckServer(("localhost", 0), serve.DeckHandler, max_workers=self.workers)
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def tearDown(self):
+        serve.DeckHandler._stop_watcher()
+        self.server.shutdown()
+        self.server.server_close()
+        if serve.DeckHandler.sse_hub is not None:
+            serve.DeckHandler.sse_hub.close()
+        serve.DeckHandler.sse_hub = None
+        serve.DeckHandler.watch_mode = False
+        serve.DeckHandler.thumbnails.close()
+        self._tmp.cleanup()
+
+    def url(self, path: str) -> str:
+        return f"http://localhost:{self.port}{path}"
+
+    def get(self, path: str, headers: dict | None = None, timeout: float = 5):
+        req = urllib.request.Request(self.url(path), headers=headers or {})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as res:
+                return res.status, dict(res.headers), res.read()
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers), e.read()
+
+    def post(self, path: str, payload, timeout: float = 5):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        req = urllib.request.Request(self.url(path), data=data, method="POST",
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as res:
+                return res.status, json.loads(res.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b"{}")
+
+    def open_sse(self) -> socket.socket:
+        sock = socket.create_connection(("localhost", self.port), timeout=5)
+        sock.sendall(b"GET /events HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n")
+        buf = b""
+        while b"data: connected" not in buf:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            buf += chunk
+        self.assertIn(b"data: connected", buf)
+        return sock
+
+
+class RoutingTests(ServerTestCase):
+    def test_index_injects_config(self):
+        status, headers, body = self.get("/")
+        self.assertEqual(status, 200)
+        self.assertIn(b"window.__CONFIG", body)
+
+    def test_index_rendered_once_with_etag(self):
+        _, headers, body = self.get("/", {"Accept-Encoding": "gzip"})
+        self.assertEqual(headers["Content-Type"], "text/html; charset=utf-8")
+        cached = serve.DeckHandler._index_cache
+        self.assertIsNotNone(cached)
+        self.get("/index.html")
+        self.assertIs(serve.DeckHandler._index_cache, cached)
+        self.assertEqual(self.get("/", {"If-None-Match": cached[1].etag})[0], 304)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertIn(b"window.__CONFIG", gzip.decompress(body))
+
+    def test_target_routes(self):
+        self.assertEqual(self.get("/slides-config.json")[0], 200)
+        status, _, body = self.get("/slides/ch01/01-slide.html")
+        self.assertEqual(status, 200)
+        self.assertIn(b"Slide 1", body)
+        self.assertEqual(self.get("/style/ch01.css")[0], 200)
+
+    def test_css_routes(self):
+        self.assertEqual(self.get("/css/common/base.css")[0], 200)
+        self.assertEqual(self.get("/css/theme/light-theme/tokens.css")[0], 200)
+        self.assertEqual(self.get("/css/fontsize/large.css")[0], 200)
+        self.assertEqual(self.get("/css/config.yaml")[0], 200)
+        self.assertEqual(self.get("/css/theme/no-such-theme/tokens.css")[0], 404)
+
+    def test_path_traversal_forbidden(self):
+        status = self.get("/slides/../../etc/passwd")[0]
+        self.assertIn(status, (403, 404))
+
+    def test_missing_file(self):
+        self.assertEqual(self.get("/slides/ch01/nope.html")[0], 404)
+
+
+class AssetCacheTests(ServerTestCase):
+    def test_etag_and_304(self):
+        status, headers, body = self.get("/slides/ch01/01-slide.html")
+        self.assertEqual(status, 200)
+        etag = headers["ETag"]
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn("Last-Modified", headers)
+        self.assertEqual(int(headers["Content-Length"]), len(body))
+        status, headers, body = self.get("/slides/ch01/01-slide.html", {"If-None-Match": etag})
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b"")
+        self.assertEqual(headers["ETag"], etag)
+
+    def test_if_modified_since(self):
+        _, headers, _ = self.get("/css/common/base.css")
+        status = self.get("/css/common/base.css", {"If-Modified-Since": headers["Last-Modified"]})[0]
+        self.assertEqual(status, 304)
+        status = self.get("/css/common/base.css", {"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"})[0]
+        self.assertEqual(status, 200)
+
+    def test_edit_is_visible_immediately(self):
+        slide = self.target / "slides" / "ch01" / "01-slide.html"
+        _, headers, _ = self.get("/slides/ch01/01-slide.html")
+        slide.write_text("<section class=\"slide\"><h2>Edited and longer</h2></section>", encoding="utf-8")
+        status, headers2, body = self.get("/slides/ch01/01-slide.html", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 200)
+        self.assertIn(b"Edited", body)
+        self.assertNotEqual(headers["ETag"], headers2["ETag"])
+
+    def test_cache_hits_and_budget(self):
+        cache = serve.AssetCache(max_bytes=300)
+        files = []
+        for i in range(3):
+            f = self.target / f"blob{i}.bin"
+            f.write_bytes(bytes([i]) * 120)
+            files.append(f)
+        cache.get(files[0])
+        cache.get(files[0])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.get(files[1])
+        cache.get(files[2])  # 360 bytes > 300: evicts files[0]
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertLessEqual(stats["bytes"], 300)
+        cache.get(files[0])
+        self.assertEqual(cache.misses, 4)
+
+
+class CompiledCssTests(ServerTestCase):
+    def test_minify_keeps_strings_and_calc(self):
+        css = '/* x */\na  >  b , c:hover {\n  content: " a ; b ";\n  width: calc(1rem + 2px) !important;\n}\n'
+        self.assertEqual(serve.minify_css(css), 'a>b,c:hover{content:" a ; b ";width:calc(1rem + 2px) !important}')
+
+    def test_index_links_one_versioned_sheet(self):
+        _, _, body = self.get("/")
+        html = body.decode("utf-8")
+        self.assertNotIn('href="css/common/base.css"', html)
+        self.assertNotIn("tokens.css", html)
+        self.assertIn('href="style/editor-overrides.css"', html)
+        versions = json.loads(self.get("/css/compiled/versions.json")[2])
+        self.assertEqual(len(versions), len(serve.DeckHandler.theme_names) * len(serve.DeckHandler.fontsize_names))
+        theme = serve.DeckHandler.theme_dir.name
+        fontsize = serve.default_fontsize(serve.DeckHandler.deck_config)
+        self.assertIn(f'id="deck-css" href="css/compiled/{theme}/{fontsize}.css?v={versions[f"{theme}/{fontsize}"]}"', html)
+
+    def test_sheet_is_merged_in_cascade_order_and_versioned(self):
+        theme = serve.DeckHandler.theme_dir.name
+        version = json.loads(self.get("/css/compiled/versions.json")[2])[f"{theme}/large"]
+        status, headers, body = self.get(f"/css/compiled/{theme}/large.css?v={version}")
+        self.assertEqual(status, 200)
+        self.assertIn("immutable", headers["Cache-Control"])
+        self.assertEqual(headers["ETag"], f'"{version}"')
+        text = body.decode("utf-8")
+        markers = [f"/* theme/{theme}/tokens.css */", "/* fontsize/large.css */", "/* common/base.css */",
+                   "/* common/components.css */", "/* common/editor.css */"]
+        self.assertEqual(sorted(markers, key=text.index), markers)
+        self.assertEqual(self.get(f"/css/compiled/{theme}/large.css")[1]["Cache-Control"], "no-cache")
+        self.assertEqual(self.get(f"/css/compiled/{theme}/huge.css")[0], 404)
+        self.assertEqual(self.get("/css/compiled/nope/large.css")[0], 404)
+
+    def test_rebuilt_only_when_a_source_changes(self):
+        css_dir = Path(self._tmp.name) / "css"
+        for rel in ("theme/t/tokens.css", "fontsize/f.css", "common/base.css", "common/components.css",
+                    "common/editor.css"):
+            (css_dir / rel).parent.mkdir(parents=True, exist_ok=True)
+            (css_dir / rel).write_text(f"/* {rel} */\n.x {{ color: red; }}\n", encoding="utf-8")
+        compiler = serve.StylesheetCompiler(serve.AssetCache(), css_dir)
+        first = compiler.get("t", "f")
+        self.assertIs(compiler.get("t", "f"), first)
+        (css_dir / "common" / "editor.css").write_text(".y { color: blue; }\n", encoding="utf-8")
+        second = compiler.get("t", "f")
+        self.assertIsNot(second, first)
+        self.assertNotEqual(second.etag, first.etag)
+        self.assertTrue(second.data.rstrip().endswith(b".y{color:blue}"))
+        self.assertIsNone(compiler.get("t", "missing"))
+
+    def test_index_rerendered_only_when_a_sheet_source_changes(self):
+        css_dir = Path(self._tmp.name) / "css"
+        shutil.copytree(serve.CONTAINER / "css", css_dir)
+        compiler = serve.DeckHandler.stylesheets = serve.StylesheetCompiler(serve.DeckHandler.asset_cache, css_dir)
+        calls = []
+        compile_sheet = compiler.get
+        compiler.get = lambda theme, fontsize: calls.append((theme, fontsize)) or compile_sheet(theme, fontsize)
+        first = self.get("/")[2]
+        calls.clear()
+        self.get("/")
+        self.get("/css/compiled/versions.json")
+        self.assertEqual(calls, [])
+        # 源文件变化后重新渲染，版本号随之更新
+        with open(css_dir / "common" / "editor.css", "a", encoding="utf-8") as f:
+            f.write("\n.changed { color: red; }\n")
+        self.assertNotEqual(self.get("/")[2], first)
+        self.assertTrue(calls)
+
+
+class ThumbnailTests(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rendered = []
+
+        @contextmanager
+        def session():
+            def render(doc: str) -> bytes:
+                self.rendered.append(doc)
+                return b"RIFF\0\0\0\0WEBP" + str(len(self.rendered)).encode()
+            yield render
+
+        serve.DeckHandler.thumbnails.session = session
+
+    def cached_files(self) -> list:
+        return sorted(p.name for p in (Path(self._tmp.name) / ".thumbs").rglob("*.webp"))
+
+    def test_rendered_once_then_served_from_disk(self):
+        status, headers, body = self.get("/thumbs/ch01/01-slide.webp")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Type"], "image/webp")
+        self.assertTrue(body.startswith(b"RIFF"))
+        self.assertEqual(len(self.rendered), 1)
+        doc = self.rendered[0]
+        self.assertIn("<h2>Slide 1</h2>", doc)
+        self.assertIn(".part-ch01 h2 { color: red; }", doc)
+        self.assertIn(f'<base href="http://localhost:{self.port}/" />', doc)
+        status, again, body2 = self.get("/thumbs/ch01/01-slide.html.webp")
+        self.assertEqual((status, body2), (200, body))
+        self.assertEqual(len(self.rendered), 1)
+        self.assertEqual(self.get("/thumbs/ch01/01-slide.webp", {"If-None-Match": headers["ETag"]})[0], 304)
+
+    def test_slide_change_rerenders_and_drops_old_file(self):
+        self.get("/thumbs/ch01/01-slide.webp")
+        first = self.cached_files()
+        slide = self.target / "slides" / "ch01" / "01-slide.html"
+        slide.write_text(slide.read_text(encoding="utf-8").replace("First", "Changed"), encoding="utf-8")
+        self.assertEqual(self.get("/thumbs/ch01/01-slide.webp")[0], 200)
+        self.assertEqual(len(self.rendered), 2)
+        self.assertIn("Changed", self.rendered[1])
+        self.assertEqual(len(self.cached_files()), 1)
+        self.assertNotEqual(self.cached_files(), first)
+
+    def test_theme_is_part_of_the_key(self):
+        themes = sorted(serve.DeckHandler.theme_names)
+        for theme in themes[:2]:
+            self.assertEqual(self.get(f"/thumbs/ch01/01-slide.webp?theme={theme}")[0], 200)
+        self.assertEqual(len(self.rendered), 2)
+        self.assertIn(f'data-theme="{themes[1]}"', self.rendered[1])
+        self.assertEqual(self.get("/thumbs/ch01/01-slide.webp?theme=nope")[0], 404)
+        self.assertEqual(self.get("/thumbs/ch01/99-missing.webp")[0], 404)
+        self.assertEqual(self.get("/thumbs/../slides-config.webp")[0], 404)
+
+    def test_without_renderer_returns_501(self):
+        serve.DeckHandler.thumbnails.session = None
+        status, _, body = self.get("/thumbs/ch01/01-slide.webp")
+        self.assertEqual(status, 501)
+        self.assertIn("playwright", json.loads(body)["error"])
+
+
+class BundleTests(ServerTestCase):
+    def test_bundle_contains_slides_and_part_css(self):
+        status, headers, body = self.get("/bundle")
+        self.assertEqual(status, 200)
+        bundle = json.loads(body)
+        self.assertEqual((bundle["from"], bundle["to"], bundle["total"]), (0, 3, 3))
+        self.assertEqual([s["file"] for s in bundle["slides"]], ["01-slide.html", "02-slide.html", "03-slide.html"])
+        self.assertIn("<h2>Slide 2</h2>", bundle["slides"][1]["html"])
+        self.assertIn("color: red", bundle["css"]["ch01"])
+        self.assertEqual(headers["ETag"], f'"{bundle["version"]}"')
+
+    def test_range_and_versioning(self):
+        _, _, body = self.get("/bundle?from=1&to=2")
+        part = json.loads(body)
+        self.assertEqual([s["index"] for s in part["slides"]], [1])
+        _, headers, _ = self.get(f"/bundle?from=1&to=2&v={part['version']}")
+        self.assertIn("immutable", headers["Cache-Control"])
+        status, _, _ = self.get("/bundle?from=1&to=2", headers={"If-None-Match": f'"{part["version"]}"'})
+        self.assertEqual(status, 304)
+        # Editing a slide outside the range leaves the version alone; inside it bumps the version
+        (self.target / "slides" / "ch01" / "03-slide.html").write_text("<section class=\"slide\">x</section>", encoding="utf-8")
+        self.assertEqual(json.loads(self.get("/bundle?from=1&to=2")[2])["version"], part["version"])
+        (self.target / "slides" / "ch01" / "02-slide.html").write_text("<section class=\"slide\">y</section>", encoding="utf-8")
+        changed = json.loads(self.get("/bundle?from=1&to=2")[2])
+        self.assertNotEqual(changed["version"], part["version"])
+        self.assertEqual(changed["slides"][0]["html"], "<section class=\"slide\">y</section>")
+
+    def test_slides_index_lists_hashes_without_bodies(self):
+        _, _, body = self.get("/slides-index")
+        index = json.loads(body)
+        self.assertEqual(len(index["slides"]), 3)
+        self.assertNotIn("html", index["slides"][0])
+        self.assertNotIn("css", index)
+        full = json.loads(self.get("/bundle")[2])
+        self.assertEqual([s["hash"] for s in index["slides"]], [s["hash"] for s in full["slides"]])
+
+    def test_bad_range(self):
+        self.assertEqual(self.get("/bundle?from=x")[0], 400)
+
+
+class CompressionTests(ServerTestCase):
+    def test_gzip_negotiated_once_per_version(self):
+        raw = (serve.CONTAINER / "js" / "deck.js").read_bytes()
+        status, headers, body = self.get("/js/deck.js", {"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(body), raw)
+        self.assertLess(len(body), len(raw))
+        entry = serve.DeckHandler.asset_cache.get((serve.CONTAINER / "js" / "deck.js").resolve())
+        packed = entry.variants["gzip"]
+        self.get("/js/deck.js", {"Accept-Encoding": "gzip"})
+        self.assertIs(entry.variants["gzip"], packed)
+
+    def test_identity_and_distinct_etags(self):
+        _, plain, body = self.get("/js/deck.js", {"Accept-Encoding": "identity"})
+        self.assertNotIn("Content-Encoding", plain)
+        _, zipped, _ = self.get("/js/deck.js", {"Accept-Encoding": "gzip"})
+        self.assertNotEqual(plain["ETag"], zipped["ETag"])
+        status = self.get("/js/deck.js", {"Accept-Encoding": "gzip", "If-None-Match": zipped["ETag"]})[0]
+        self.assertEqual(status, 304)
+        _, refused, _ = self.get("/js/deck.js", {"Accept-Encoding": "gzip;q=0"})
+        self.assertNotIn("Content-Encoding", refused)
+
+    def test_small_files_not_compressed(self):
+        _, headers, _ = self.get("/style/ch01.css", {"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", headers)
+
+    def test_warm_precompresses_tree(self):
+        cache = serve.AssetCache()
+        files, raw, packed = cache.warm([serve.CONTAINER / "js", self.target / "slides"])
+        self.assertGreaterEqual(files, 5)
+        self.assertLess(packed, raw)
+        entry = cache.get((serve.CONTAINER / "js" / "editor.js").resolve())
+        self.assertIn("gzip", entry.variants)
+
+
+class SaveTests(ServerTestCase):
+    def test_all_edits_applied_in_one_write(self):
+        slide = self.target / "slides" / "ch01" / "01-slide.html"
+        status, res = self.post("/save", {
+            "domChanges": {"ch01/01-slide.html": {"appended": ['<div class="tip-box">tip</div>']}},
+            "textChanges": {"ch01/01-slide.html": {"div.slide-body > h2": "Renamed",
+                                                   "div.slide-body > p:nth-of-type(2)": "Later"}},
+            "deletions": {"ch01/01-slide.html": ["div.slide-body > p:nth-of-type(1)"]},
+        })
+        self.assertEqual(status, 200, res)
+        self.assertIn("1 个文件", res["message"])
+        self.assertEqual(slide.read_text(encoding="utf-8"),
+                         '<section class="slide">\n  <div class="slide-body">\n'
+                         '    <h2>Renamed</h2>\n    <p>Later</p>\n    <div class="tip-box">tip</div>\n'
+                         '  </div>\n</section>\n')
+        self.assertEqual(list(slide.parent.glob(".*.tmp")), [])
+
+    def test_atomic_write_keeps_mode_and_symlink(self):
+        real = self.target / "style" / "shared.css"
+        real.write_text("a {}\n", encoding="utf-8")
+        real.chmod(0o640)
+        link = self.target / "style" / "editor-overrides.css"
+        link.symlink_to("shared.css")
+        serve.atomic_write_text(link, "b {}\n")
+        self.assertTrue(link.is_symlink())
+        self.assertEqual(real.read_text(encoding="utf-8"), "b {}\n")
+        self.assertEqual(real.stat().st_mode & 0o777, 0o640)
+        self.assertEqual(list(real.parent.glob(".*.tmp")), [])
+
+    def test_invalid_slide_keys_are_skipped(self):
+        status, res = self.post("/save", {"textChanges": {"../slides-config.json": {"h2": "x"}, "nope": {"h2": "x"}}})
+        self.assertEqual(status, 200)
+        self.assertIn("0 个文件", res["message"])
+
+    def test_multi_slide_save_reports_per_file_timings(self):
+        status, res = self.post("/save", {"textChanges": {
+            f"ch01/{i:02d}-slide.html": {"div.slide-body > h2": f"T{i}"} for i in (1, 2, 3)}})
+        self.assertEqual(status, 200, res)
+        self.assertEqual([f["slideKey"] for f in res["files"]], [f"ch01/{i:02d}-slide.html" for i in (1, 2, 3)])
+        self.assertTrue(all(f["updated"] and f["ms"] >= 0 for f in res["files"]))
+        self.assertIn("<h2>T3</h2>", (self.target / "slides" / "ch01" / "03-slide.html").read_text(encoding="utf-8"))
+
+    def test_overlapping_saves_to_one_slide_serialize(self):
+        payload = {"domChanges": {"ch01/01-slide.html": {"appended": ['<div class="tip-box">x</div>']}}}
+        threads = [threading.Thread(target=self.post, args=("/save", payload)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        html = (self.target / "slides" / "ch01" / "01-slide.html").read_text(encoding="utf-8")
+        self.assertEqual(html.count("tip-box"), 8)
+
+    def test_file_locks_are_released_after_save(self):
+        slide = (self.target / "slides" / "ch01" / "01-slide.html").resolve()
+        held = serve.DeckHandler._file_lock(slide)
+        self.assertIs(serve.DeckHandler._file_lock(slide), held)
+        del held
+        self.post("/save", {"textChanges": {
+            f"ch01/{i:02d}-slide.html": {"div.slide-body > h2": f"T{i}"} for i in (1, 2, 3)}})
+        gc.collect()
+        self.assertNotIn(str(slide), serve.DeckHandler._file_locks)
+        self.assertEqual(len(serve.DeckHandler._file_locks), 0)
+
+
+class CssOverrideTests(ServerTestCase):
+    def rule(self, key, selector, **props):
+        return {"slideKey": key, "selector": selector, "props": props}
+
+    def test_deltas_merge_into_persistent_index(self):
+        css = self.target / "style" / "editor-overrides.css"
+        self.post("/save", {"cssRules": [self.rule("ch01/02-slide.html", "h2", color="#f00"),
+                                         self.rule("ch01/01-slide.html", "p", margin="0")]})
+        # A later save only carries the delta; earlier rules survive
+        self.post("/save", {"cssRules": [self.rule("ch01/01-slide.html", "p", padding="4px", margin=None)]})
+        text = css.read_text(encoding="utf-8")
+        self.assertLess(text.index("ch01/01-slide.html"), text.index("ch01/02-slide.html"))
+        self.assertIn("padding: 4px !important;", text)
+        self.assertNotIn("margin", text)
+        _, _, body = self.get("/overrides")
+        rules = json.loads(body)["rules"]
+        self.assertEqual(rules, [self.rule("ch01/01-slide.html", "p", padding="4px"),
+                                 self.rule("ch01/02-slide.html", "h2", color="#f00")])
+
+    def test_unchanged_delta_does_not_rewrite(self):
+        css = self.target / "style" / "editor-overrides.css"
+        payload = {"cssRules": [self.rule("ch01/01-slide.html", "h2", color="red")]}
+        self.post("/save", payload)
+        before = css.stat().st_mtime_ns
+        time.sleep(0.02)
+        self.post("/save", payload)
+        self.assertEqual(css.stat().st_mtime_ns, before)
+
+    def test_existing_file_is_loaded(self):
+        css = self.target / "style" / "editor-overrides.css"
+        css.write_text('/* x */\n[data-slide-key="ch01/03-slide.html"] div.card > p {\n  color: blue !important;\n}\n',
+                       encoding="utf-8")
+        store = serve.CssOverrideStore(css)
+        self.assertEqual(store.load(), 1)
+        store.apply([{"slideKey": "ch01/03-slide.html", "selector": "div.card > p", "props": None}])
+        self.assertEqual(store.rules(), [])
+        self.assertNotIn("blue", css.read_text(encoding="utf-8"))
+
+
+class SessionLogTests(ServerTestCase):
+    def entries(self, n, level="info"):
+        return [{"ts": "2026-01-01 00:00:00.000", "level": level, "action": f"a{i}"} for i in range(n)]
+
+    def test_append_rotate_and_levels(self):
+        status, res = self.post("/log", {"url": "u", "ua": "ua", "entries": self.entries(2)})
+        self.assertEqual(status, 200)
+        first = res["file"]
+        self.assertTrue(first.endswith(".jsonl"))
+        _, res = self.post("/log", {"entries": self.entries(3, "warn")})
+        self.assertEqual((res["file"], res["total"]), (first, 5))
+        self.assertEqual(res["levels"], {"info": 2, "warn": 3})
+        # Exceeds maxEntriesPerFile (5): rotates, counters restart
+        _, res = self.post("/log", {"entries": self.entries(1, "error")})
+        self.assertNotEqual(res["file"], first)
+        self.assertEqual((res["total"], res["levels"]), (1, {"error": 1}))
+        # Full save always opens a new file
+        _, full = self.post("/log", {"entries": self.entries(2), "full": True})
+        self.assertNotIn(full["file"], (first, res["file"]))
+
+    def test_jsonl_reads_back_as_legacy_shape(self):
+        self.post("/log", {"url": "http://x/#ch01/1", "ua": "UA", "entries": self.entries(3)})
+        path = next((self.target / "logs").glob("session-*.jsonl"))
+        lines = path.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(json.loads(lines[0])["format"], serve.LOG_FORMAT)
+        data = serve.read_session_log(path)
+        self.assertEqual(data["url"], "http://x/#ch01/1")
+        self.assertEqual(data["ua"], "UA")
+        self.assertEqual([e["action"] for e in data["entries"]], ["a0", "a1", "a2"])
+        out = serve.convert_session_log(path)
+        self.assertEqual(json.loads(out.read_text(encoding="utf-8")), data)
+
+    def test_resume_latest_file(self):
+        self.post("/log", {"entries": self.entries(4)})
+        self.post("/log", {"entries": self.entries(4)})  # rotates: same-second files get a -N suffix
+        self.post("/log", {"entries": self.entries(2)})   # rotates again; this is the newest file
+        store = serve.SessionLogStore(self.target / "logs", max_entries=5)
+        path, total, levels = store.append("", "", self.entries(1, "warn"))
+        self.assertEqual(total, 3)
+        self.assertEqual(levels, {"info": 2, "warn": 1})
+
+
+GRID_SLIDE = """<section class="slide">
+  <div class="slide-body">
+    <h2>Title</h2>
+    <div class="grid">
+      <div class="card"><h3>A</h3><p>alpha</p></div>
+      <div class="card"><h3>B</h3><p>beta</p></div>
+      <div class="card"><h3>C</h3><p>gamma</p></div>
+    </div>
+    <script>if (a < b) { x = "</div>"; }</script>
+  </div>
+</section>
+"""
+
+
+class KeepAliveTests(ServerTestCase):
+    workers = 2
+
+    def connect(self) -> http.client.HTTPConnection:
+        conn = http.client.HTTPConnection("localhost", self.port, timeout=5)
+        self.addCleanup(conn.close)
+        return conn
+
+    def test_requests_reuse_one_connection(self):
+        conn = self.connect()
+        for path in ("/slides/ch01/01-slide.html", "/bundle", "/slides-config.json"):
+            conn.request("GET", path)
+            res = conn.getresponse()
+            self.assertIsNotNone(res.getheader("Content-Length"))
+            res.read()
+            self.assertFalse(res.will_close)
+        # The same socket served all three requests
+        self.assertIsNotNone(conn.sock)
+
+    def test_idle_connections_do_not_hold_workers(self):
+        idle = []
+        for _ in range(self.workers * 3):
+            conn = self.connect()
+            conn.request("GET", "/slides-config.json")
+            conn.getresponse().read()
+            idle.append(conn)
+        start = time.monotonic()
+        status, _, _ = self.get("/slides/ch01/02-slide.html", timeout=3)
+        self.assertEqual(status, 200)
+        self.assertLess(time.monotonic() - start, 1.0)
+        # Parked connections still work afterwards
+        idle[0].request("GET", "/slides/ch01/03-slide.html")
+        self.assertEqual(idle[0].getresponse().status, 200)
+
+    def test_pipelined_requests(self):
+        sock = socket.create_connection(("localhost", self.port), timeout=5)
+        self.addCleanup(sock.close)
+        req = b"GET /slides-config.json HTTP/1.1\r\nHost: x\r\n\r\n"
+        sock.sendall(req * 2)
+        buf = b""
+        while buf.count(b"HTTP/1.1 200") < 2:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+        self.assertEqual(buf.count(b"HTTP/1.1 200"), 2)
+
+    def test_unknown_post_body_is_drained(self):
+        conn = self.connect()
+        conn.request("POST", "/nope", body=b'{"x": 1}', headers={"Content-Type": "application/json"})
+        res = conn.getresponse()
+        res.read()
+        self.assertEqual(res.status, 404)
+        conn.request("GET", "/slides-config.json")
+        self.assertEqual(conn.getresponse().status, 200)
+
+
+class RangeTests(ServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.blob = bytes(range(256)) * 40  # 10240 bytes
+        (self.target / "slides" / "ch01" / "clip.mp4").write_bytes(self.blob)
+
+    def check_ranges(self, path):
+        status, headers, body = self.get(path, {"Range": "bytes=100-199"})
+        self.assertEqual((status, body), (206, self.blob[100:200]))
+        self.assertEqual(headers["Content-Range"], f"bytes 100-199/{len(self.blob)}")
+        self.assertEqual(headers["Content-Length"], "100")
+        status, _, body = self.get(path, {"Range": "bytes=-10"})
+        self.assertEqual((status, body), (206, self.blob[-10:]))
+        status, _, body = self.get(path, {"Range": "bytes=10000-"})
+        self.assertEqual((status, body), (206, self.blob[10000:]))
+        status, headers, _ = self.get(path, {"Range": "bytes=20000-"})
+        self.assertEqual((status, headers["Content-Range"]), (416, f"bytes */{len(self.blob)}"))
+        _, headers, _ = self.get(path)
+        self.assertEqual(headers["Accept-Ranges"], "bytes")
+        etag = headers["ETag"]
+        status, _, body = self.get(path, {"Range": "bytes=0-9", "If-Range": etag})
+        self.assertEqual((status, body), (206, self.blob[:10]))
+        status, _, body = self.get(path, {"Range": "bytes=0-9", "If-Range": '"stale"'})
+        self.assertEqual((status, body), (200, self.blob))
+
+    def test_ranges_from_cache(self):
+        self.check_ranges("/slides/ch01/clip.mp4")
+
+    def test_ranges_streamed_beyond_cache_budget(self):
+        serve.DeckHandler.asset_cache = serve.AssetCache(max_bytes=4096)
+        self.check_ranges("/slides/ch01/clip.mp4")
+        self.assertEqual(serve.DeckHandler.asset_cache.stats()["misses"], 0)
+
+    def test_large_files_bypass_cache_and_warmup(self):
+        cache = serve.DeckHandler.asset_cache = serve.AssetCache(stream_threshold=8192)
+        status, _, body = self.get("/slides/ch01/clip.mp4")
+        self.assertEqual((status, body), (200, self.blob))
+        self.assertEqual(self.get("/slides/ch01/01-slide.html")[0], 200)
+        self.assertEqual(cache.stats()["entries"], 1)  # only the small slide
+        files, _, _ = cache.warm([self.target / "slides"])
+        self.assertEqual(files, 3)
+
+    def test_ranged_response_is_not_compressed(self):
+        status, headers, body = self.get("/slides/ch01/01-slide.html",
+                                         {"Range": "bytes=0-7", "Accept-Encoding": "gzip"})
+        self.assertEqual((status, body), (206, b"<section"))
+        self.assertNotIn("Content-Encoding", headers)
+
+
+class MetricsTests(ServerTestCase):
+    def metrics_json(self, until=lambda m: True) -> dict:
+        # 指标在响应写完之后才记录：轮询直到期望的计数出现
+        deadline = time.monotonic() + 2
+        while True:
+            status, headers, body = self.get("/metrics?format=json")
+            self.assertEqual(status, 200)
+            metrics = json.loads(body)
+            if until(metrics) or time.monotonic() > deadline:
+                return metrics
+
+    @staticmethod
+    def responses(m: dict) -> dict:
+        return {(r["labels"]["route"], r["labels"]["code"]): r["value"]
+                for r in m["counters"].get("deck_responses_total", [])}
+
+    def test_request_counters_and_histograms(self):
+        self.get("/slides/ch01/01-slide.html")
+        self.get("/slides/ch01/01-slide.html")
+        self.get("/css/nope.css")
+        m = self.metrics_json(lambda m: ("css", "404") in self.responses(m))
+        responses = {(r["labels"]["route"], r["labels"]["code"]): r["value"]
+                     for r in m["counters"]["deck_responses_total"]}
+        self.assertEqual(responses[("target", "200")], 2)
+        self.assertEqual(responses[("css", "404")], 1)
+        size = (self.target / "slides" / "ch01" / "01-slide.html").stat().st_size
+        sent = {r["labels"]["route"]: r["value"] for r in m["counters"]["deck_response_bytes_total"]}
+        self.assertEqual(sent["target"], 2 * size)
+        hist = {h["labels"]["route"]: h for h in m["histograms"]["deck_request_duration_seconds"]}
+        self.assertEqual(hist["target"]["count"], 2)
+        self.assertEqual(hist["target"]["buckets"]["+Inf"], 2)
+        self.assertEqual(m["gauges"]["deck_cache_hits"], 1)
+        self.assertEqual(m["gauges"]["deck_cache_hit_ratio"], 0.5)
+
+    def test_save_timings(self):
+        status, _ = self.post("/save", {
+            "cssRules": [{"slideKey": "ch01/01-slide.html", "selector": "h2", "props": {"color": "#f00"}}],
+            "deletions": {"ch01/02-slide.html": ["div.slide-body > p:nth-of-type(2)"]},
+        })
+        self.assertEqual(status, 200)
+        hist = self.metrics_json()["histograms"]
+        self.assertEqual(hist["deck_save_css_duration_seconds"][0]["count"], 1)
+        self.assertEqual(hist["deck_save_file_duration_seconds"][0]["count"], 1)
+
+    def test_prometheus_text(self):
+        self.get("/")
+        self.metrics_json(lambda m: ("index", "200") in self.responses(m))
+        status, headers, body = self.get("/metrics")
+        self.assertEqual(status, 200)
+        self.assertTrue(headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = body.decode("utf-8")
+        self.assertIn("# TYPE deck_request_duration_seconds histogram", text)
+        self.assertIn('deck_request_duration_seconds_bucket{route="index",le="+Inf"} 1', text)
+        self.assertIn('deck_responses_total{code="200",route="index"} 1', text)
+        self.assertIn("deck_sse_clients 0", text)
+
+    def test_malformed_request_line(self):
+        # 请求行无法解析：回 400，并计入固定的 invalid 路由（不能沿用同一连接上一个请求的 path）
+        for raw in (b"GARBAGE\r\n\r\n",
+                    b"GET /slides-config.json HTTP/1.1\r\nHost: localhost\r\n\r\nGET / HTTP/1.1 extra\r\n\r\n"):
+            with socket.create_connection(("localhost", self.port), timeout=5) as sock:
+                sock.sendall(raw)
+                buf = b""
+                while chunk := sock.recv(4096):
+                    buf += chunk
+            self.assertIn(b" 400 ", buf)
+        m = self.metrics_json(lambda m: self.responses(m).get(("invalid", "400")) == 2)
+        responses = self.responses(m)
+        self.assertEqual(responses[("invalid", "400")], 2)
+        self.assertEqual(responses[("target", "200")], 1)
+        self.assertNotIn(("index", "400"), responses)
+
+
+class MultiDeckTests(ServerTestCase):
+    watch = True
+
+    def setUp(self):
+        super().setUp()
+        self.other = make_deck(Path(self._tmp.name) / "v-02", n_slides=2)
+        serve.DeckHandler.decks = {d.name: d for d in serve.parse_mounts([str(self.target), f"v-02={self.other}"])}
+        self.first = next(name for name in serve.DeckHandler.decks if name != "v-02")
+
+    def test_parse_mounts(self):
+        self.assertEqual([d.name for d in serve.parse_mounts(["a/v-01"])], [""])
+        decks = serve.parse_mounts(["a/v-01", "b/v-01", "b/v-01"])
+        self.assertEqual([d.name for d in decks], ["v-01", "b-v-01", "b-v-01-2"])
+        with self.assertRaises(ValueError):
+            serve.parse_mounts(["css=a", "b"])
+        with self.assertRaises(ValueError):
+            serve.parse_mounts(["x=a", "x=b"])
+
+    def test_routes_are_scoped_per_deck(self):
+        status, _, body = self.get("/v-02/slides-config.json")
+        self.assertEqual((status, len(json.loads(body)["slides"])), (200, 2))
+        status, _, body = self.get(f"/{self.first}/slides-config.json")
+        self.assertEqual((status, len(json.loads(body)["slides"])), (200, 3))
+        self.assertEqual(self.get("/slides-config.json")[0], 404)
+        self.assertEqual(json.loads(self.get("/v-02/bundle")[2])["total"], 2)
+        self.assertEqual(json.loads(self.get(f"/{self.first}/bundle")[2])["total"], 3)
+        status, _, body = self.get("/v-02/css/common/base.css")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, (serve.CONTAINER / "css" / "common" / "base.css").read_bytes())
+
+    def test_root_lists_decks_and_mount_redirects(self):
+        status, _, body = self.get("/")
+        self.assertEqual(status, 200)
+        self.assertIn(b'href="v-02/"', body)
+        conn = http.client.HTTPConnection("localhost", self.port, timeout=5)
+        conn.request("GET", "/v-02?x=1")
+        res = conn.getresponse()
+        res.read()
+        conn.close()
+        self.assertEqual((res.status, res.getheader("Location")), (301, "/v-02/?x=1"))
+        status, _, body = self.get("/v-02/")
+        self.assertIn(b"window.__CONFIG", body)
+
+    def test_save_writes_into_the_mounted_deck(self):
+        status, res = self.post("/v-02/save", {
+            "cssRules": [{"slideKey": "ch01/01-slide.html", "selector": "h2", "props": {"color": "#f00"}}],
+            "textChanges": {"ch01/01-slide.html": {"div.slide-body > h2": "Mounted"}}})
+        self.assertEqual(status, 200, res)
+        self.assertIn("<h2>Mounted</h2>", (self.other / "slides" / "ch01" / "01-slide.html").read_text(encoding="utf-8"))
+        self.assertIn("<h2>Slide 1</h2>", (self.target / "slides" / "ch01" / "01-slide.html").read_text(encoding="utf-8"))
+        self.assertTrue((self.other / "style" / "editor-overrides.css").exists())
+        self.assertFalse((self.target / "style" / "editor-overrides.css").exists())
+        self.assertEqual(self.get(f"/{self.first}/overrides")[2], b'{"rules": [], "count": 0}')
+
+    def test_changes_are_broadcast_to_their_deck_only(self):
+        changed = [str(self.other / "slides" / "ch01" / "01-slide.html"), str(serve.CONTAINER / "js" / "deck.js")]
+        self.assertEqual(serve.DeckHandler._changed_by_deck(changed), {
+            self.first: ["js/deck.js"], "v-02": ["js/deck.js", "slides/ch01/01-slide.html"]})
+        serve.DeckHandler._start_watcher(serve.CONTAINER)
+        mine, theirs = self.open_sse_at(f"/{self.first}/events"), self.open_sse_at("/v-02/events")
+        try:
+            deadline = time.monotonic() + 2
+            while serve.DeckHandler.sse_hub.client_count() < 2 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            (self.other / "slides" / "ch01" / "02-slide.html").write_text("<p>x</p>", encoding="utf-8")
+            theirs.settimeout(3)
+            buf = b""
+            while b"event: slide-changed" not in buf:
+                buf += theirs.recv(4096)
+            mine.settimeout(0.3)
+            with self.assertRaises(socket.timeout):
+                mine.recv(4096)
+        finally:
+            mine.close()
+            theirs.close()
+
+    def open_sse_at(self, path: str) -> socket.socket:
+        sock = socket.create_connection(("localhost", self.port), timeout=5)
+        sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        buf = b""
+        while b"data: connected" not in buf:
+            buf += sock.recv(4096)
+        return sock
+
+
+class SlideDocumentTests(unittest.TestCase):
+    def test_untouched_document_round_trips(self):
+        doc = serve.SlideDocument(GRID_SLIDE)
+        self.assertFalse(doc.changed)
+        self.assertEqual(doc.serialize(), GRID_SLIDE)
+
+    def test_selectors_resolve_against_tree(self):
+        doc = serve.SlideDocument(GRID_SLIDE)
+        sel = "div.slide-body > div.grid > div.card:nth-of-type(2) > p"
+        self.assertTrue(doc.set_inner_html(sel, "<b>BETA</b>"))
+        self.assertIsNone(doc.find("div.slide-body > div.grid > div.card:nth-of-type(9)"))
+        out = doc.serialize()
+        self.assertIn("<p>alpha</p>", out)
+        self.assertIn("<p><b>BETA</b></p>", out)
+
+    def test_sequential_deletions_and_reorder(self):
+        doc = serve.SlideDocument(GRID_SLIDE)
+        self.assertTrue(doc.reorder("div.slide-body > div.grid", ["Cgamma", "Aalpha", "Bbeta"]))
+        # Editor paths are computed after each removal, so indexes refer to the updated tree
+        self.assertTrue(doc.delete("div.slide-body > div.grid > div.card:nth-of-type(1)"))
+        self.assertTrue(doc.delete("div.slide-body > div.grid > div.card:nth-of-type(2)"))
+        out = doc.serialize()
+        self.assertNotIn("gamma", out)
+        self.assertNotIn("beta", out)
+        self.assertIn('    <div class="grid">\n      <div class="card"><h3>A</h3>', out)
+
+    def test_append_into_slide_body(self):
+        doc = serve.SlideDocument(GRID_SLIDE)
+        doc.append('<div class="tip-box" style="color:red">new</div>')
+        out = doc.serialize()
+        self.assertIn('</script>\n    <div class="tip-box">new</div>\n  </div>\n</section>', out)
+
+
+class ConcurrencyTests(ServerTestCase):
+    watch = True
+    workers = 2
+
+    def test_sse_clients_do_not_hold_workers(self):
+        # More SSE tabs than workers: with a blocking SSE loop this would deadlock.
+        tabs = [self.open_sse() for _ in range(self.workers * 3)]
+        try:
+            start = time.monotonic()
+            status, _, _ = self.get("/slides/ch01/01-slide.html", timeout=3)
+            self.assertEqual(status, 200)
+            self.assertLess(time.monotonic() - start, 2.0)
+            deadline = time.monotonic() + 2
+            while serve.DeckHandler.sse_hub.client_count() < len(tabs) and time.monotonic() < deadline:
+                time.sleep(0.02)
+            self.assertEqual(serve.DeckHandler.sse_hub.client_count(), len(tabs))
+        finally:
+            for s in tabs:
+                s.close()
+
+    def test_broadcast_reaches_parked_clients(self):
+        sock = self.open_sse()
+        try:
+            deadline = time.monotonic() + 2
+            while serve.DeckHandler.sse_hub.client_count() < 1 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            serve.DeckHandler._broadcast_reload(["slides/ch01/01-slide.html"])
+            buf = b""
+            while b"slides/ch01/01-slide.html" not in buf:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                buf += chunk
+            self.assertIn(b"event: slide-changed", buf)
+        finally:
+            sock.close()
+
+    def test_closed_clients_are_reaped(self):
+        sock = self.open_sse()
+        deadline = time.monotonic() + 2
+        while serve.DeckHandler.sse_hub.client_count() < 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        sock.close()
+        deadline = time.monotonic() + 2
+        while serve.DeckHandler.sse_hub.client_count() > 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(serve.DeckHandler.sse_hub.client_count(), 0)
+
+
+class WatcherTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = make_deck(Path(self._tmp.name))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _drain(self, watcher, first_timeout=2.0):
+        changed = watcher.wait(first_timeout)
+        while True:
+            more = watcher.wait(0.2)
+            if not more:
+                return changed
+            changed |= more
+
+    def test_inotify_reports_changed_paths(self):
+        try:
+            watcher = serve.InotifyWatcher([self.root])
+        except OSError as e:
+            self.skipTest(f"inotify unavailable: {e}")
+        try:
+            slide = self.root / "slides" / "ch01" / "01-slide.html"
+            slide.write_text("<section class=\"slide\">x</section>", encoding="utf-8")
+            (self.root / "notes.txt").write_text("ignored", encoding="utf-8")
+            self.assertEqual(self._drain(watcher), {str(slide)})
+
+            new_dir = self.root / "slides" / "ch02"
+            new_dir.mkdir()
+            time.sleep(0.05)
+            (new_dir / "01.html").write_text("<section></section>", encoding="utf-8")
+            self.assertIn(str(new_dir / "01.html"), self._drain(watcher))
+            self.assertEqual(watcher.wait(0.05), set())
+        finally:
+            watcher.close()
+
+    def test_polling_fallback(self):
+        watcher = serve.PollingWatcher([self.root], interval=0.05)
+        css = self.root / "style" / "ch01.css"
+        time.sleep(0.01)
+        css.write_text("h2 { color: blue; }", encoding="utf-8")
+        self.assertEqual(watcher.wait(0.05), {str(css)})
+        self.assertEqual(watcher.wait(0.05), set())
+
+
+class WatchBroadcastTests(ServerTestCase):
+    watch = True
+
+    def test_hot_reload_event_classification(self):
+        events = serve.DeckHandler._hot_reload_events(
+            ["css/common/base.css", "slides-config.json", "slides/ch02/03-x.html", "style/ch02.css"])
+        self.assertEqual(events, [
+            ("config-changed", {"paths": ["slides-config.json"]}),
+            ("css-changed", {"paths": ["css/common/base.css", "style/ch02.css"]}),
+            ("slide-changed", {"part": "ch02", "file": "03-x.html", "path": "slides/ch02/03-x.html"}),
+        ])
+        self.assertEqual(serve.DeckHandler._hot_reload_events(["js/deck.js", "style/a.css"]),
+                         [("reload", {"paths": ["js/deck.js", "style/a.css"]})])
+
+    def test_index_injects_typed_listener(self):
+        _, _, body = self.get("/")
+        self.assertIn(b'on("slide-changed","reloadSlide")', body)
+
+    def test_burst_is_debounced_into_one_event(self):
+        serve.DeckHandler._start_watcher(serve.CONTAINER)
+        sock = self.open_sse()
+        try:
+            deadline = time.monotonic() + 2
+            while serve.DeckHandler.sse_hub.client_count() < 1 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            for i in range(3):
+                (self.target / "slides" / "ch01" / f"0{i + 1}-slide.html").write_text(f"<p>{i}</p>", encoding="utf-8")
+            sock.settimeout(3)
+            buf = b""
+            while buf.count(b"event: ") < 3:
+                buf += sock.recv(4096)
+            sock.settimeout(0.5)
+            try:
+                buf += sock.recv(4096)
+            except socket.timeout:
+                pass
+            events = [block.split(b"\n") for block in buf.split(b"\n\n") if block.startswith(b"event: ")]
+            self.assertEqual([e[0] for e in events], [b"event: slide-changed"] * 3)
+            files = [json.loads(e[1][len(b"data: "):])["file"] for e in events]
+            self.assertEqual(files, [f"0{i + 1}-slide.html" for i in range(3)])
+        finally:
+            sock.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
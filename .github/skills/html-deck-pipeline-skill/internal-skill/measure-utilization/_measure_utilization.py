@@ -1,11 +1,17 @@
 """Measure per-slide space utilization of a merged deck HTML file.
 
 Uses Playwright headless Chromium to render each slide and grid-sample
-via elementFromPoint to determine what fraction of the slide area is
-occupied by meaningful content (text, backgrounds, borders, etc.).
+it to determine what fraction of the slide area is occupied by meaningful
+content (text, backgrounds, borders, etc.).
+
+By default (--layout sequential) one slide is shown per animation frame.
+--layout batch (with --sampler rects) lays out every slide at once, stacked at
+the size of the reference slide, and measures all of them after a single
+layout pass; the points sampler always runs sequentially because
+elementFromPoint only sees the viewport.
 
 Usage:
-    python _measure_utilization.py <path/to/deck.html> [--threshold 30] [--parts parts.json] [--json]
+    python _measure_utilization.py <path/to/deck.html> [--threshold 30] [--parts parts.json] [--grid 40x80] [--json]
 """
 
 from __future__ import annotations
@@ -17,104 +23,240 @@ from pathlib import Path
 from typing import Any
 
 DEFAULT_THRESHOLD = 30.0  # slides below this utilization % are flagged as sparse
+DEFAULT_GRID = (40, 40)  # columns x rows of sample points per slide
+SAMPLERS = ("rects", "points")
+DEFAULT_SAMPLER = "points"
+LAYOUTS = ("batch", "sequential")
+DEFAULT_LAYOUT = "sequential"
+
+# Batch layout: every slide shown at once as a fixed-size block in normal flow, sized to the
+# untransformed reference slide; auto-scale transforms and the enter animation are dropped.
+BATCH_CSS = """
+.slide {
+  display: flex !important; flex-direction: column !important; flex: none !important;
+  position: relative !important; inset: auto !important; margin: 0 !important;
+  width: var(--measure-slide-w) !important; height: var(--measure-slide-h) !important;
+  max-width: none !important; max-height: none !important;
+  transform: none !important; animation: none !important; opacity: 1 !important;
+}
+"""
 
 
-def build_measure_js() -> str:
-    """Return the JS string (IIFE) that runs inside the browser page."""
-    return """
-    (async () => {
-      const allSlides = document.querySelectorAll('.slide');
-      const results = [];
-
-      const layoutTags = new Set(['DIV', 'SECTION', 'MAIN', 'ARTICLE', 'HEADER', 'FOOTER', 'NAV', 'UL', 'OL', 'SPAN']);
-
-      function isContentEl(el) {
-        if (!el || el.nodeType !== 1) return false;
-        const tag = el.tagName;
-        const cs = getComputedStyle(el);
-
+def parse_grid(text: str) -> tuple[int, int]:
+    """Parse a --grid value: "40" -> (40, 40); "40x80" -> 40 columns x 80 rows."""
+    cols, _, rows = text.lower().partition("x")
+    grid = (int(cols), int(rows or cols))
+    if min(grid) < 1:
+        raise argparse.ArgumentTypeError(f"invalid grid: {text}")
+    return grid
+
+
+# Sampling engines, shared by build_measure_js(). Both count grid-cell centres that land on a
+# content-bearing element (or a descendant of one) below the slide:
+#   rects  - classify every element once (memo), then paint the client rects of all hit-testable
+#            elements into a coverage bitmap in paint order (1 = covered, 0 = not), so a cell ends up
+#            with the value of the topmost element over it; one getComputedStyle per element
+#            instead of one per sample point and ancestor. Paint order is a nested stacking key:
+#            a positioned / z-indexed box paints its subtree together, above the box itself
+#   points - the original elementFromPoint probe + ancestor walk for every cell (kept for comparison)
+SAMPLER_JS = """
+      const LAYOUT_TAGS = new Set([
+        'DIV', 'SECTION', 'MAIN', 'ARTICLE', 'HEADER', 'FOOTER', 'NAV', 'UL', 'OL', 'SPAN'
+      ]);
+      const CONTENT_TAGS = new Set([
+        'H1','H2','H3','H4','H5','H6','P','TABLE','IMG','SVG','CODE','PRE',
+        'BLOCKQUOTE','HR','BUTTON','INPUT','TEXTAREA','SELECT','STRONG','EM'
+      ]);
+
+      function isContentEl(el, cs) {
         const bg = cs.backgroundColor;
         const hasBg = bg && bg !== 'rgba(0, 0, 0, 0)' && bg !== 'transparent';
         const hasBorder = (parseFloat(cs.borderWidth) || 0) > 0;
         const hasText = el.children.length === 0 && el.textContent.trim().length > 0;
-        const contentTags = new Set(['H1', 'H2', 'H3', 'H4', 'H5', 'H6', 'P', 'TABLE', 'IMG', 'SVG', 'CODE', 'PRE', 'BLOCKQUOTE', 'HR', 'BUTTON', 'INPUT', 'TEXTAREA', 'SELECT', 'STRONG', 'EM']);
-        const isContentTag = contentTags.has(tag);
-
-        return hasBg || hasBorder || (hasText && !layoutTags.has(tag)) || isContentTag;
+        return hasBg || hasBorder || (hasText && !LAYOUT_TAGS.has(el.tagName)) || CONTENT_TAGS.has(el.tagName);
       }
 
-      for (let i = 0; i < allSlides.length; i++) {
-        const slide = allSlides[i];
-
-        // Show only this slide
-        allSlides.forEach(s => { s.style.display = 'none'; s.classList.remove('active'); });
-        slide.style.display = 'flex';
-        slide.classList.add('active');
-
-        // Force reflow + wait for paint
-        slide.getBoundingClientRect();
-        await new Promise(r => requestAnimationFrame(r));
-
-        const slideRect = slide.getBoundingClientRect();
-        const slideArea = slideRect.width * slideRect.height;
+      function sampleRects(slide, box, cols, rows) {
+        // element -> { covered: it or an ancestor below the slide is content, hit: receives hit-testing,
+        //              stack: paint key its descendants start from, paint: its own paint key,
+        //              clip: [l, t, r, b] from overflow ancestors }
+        const memo = new Map([[slide, { covered: false, hit: true, stack: [], paint: [], clip: [box.left, box.top, box.right, box.bottom] }]]);
+        let ordinal = 0;  // classify() reaches elements in document order
+        function classify(el) {
+          let info = memo.get(el);
+          if (info) return info;
+          const parent = classify(el.parentElement);
+          const cs = getComputedStyle(el);
+          let clip = parent.clip;
+          if (cs.overflowX !== 'visible' || cs.overflowY !== 'visible') {
+            const r = el.getBoundingClientRect();
+            clip = [Math.max(clip[0], r.left), Math.max(clip[1], r.top), Math.min(clip[2], r.right), Math.min(clip[3], r.bottom)];
+          }
+          // Approximate stacking: a positioned / z-indexed box opens a level [-1 below the flow or 1 + z above
+          // it, document ordinal] that its whole subtree paints in; its own box goes first (-2), under
+          // negative-z children
+          const z = parseInt(cs.zIndex, 10) || 0;
+          const stacked = cs.position !== 'static' || z !== 0;
+          ordinal++;
+          const stack = stacked ? [...parent.stack, z < 0 ? -1 : 1 + z, ordinal] : parent.stack;
+          info = {
+            covered: parent.covered || isContentEl(el, cs),
+            hit: cs.visibility === 'visible' && cs.pointerEvents !== 'none',
+            stack,
+            paint: stacked ? [...stack, -2] : stack,
+            clip,
+          };
+          memo.set(el, info);
+          return info;
+        }
 
-        if (slideArea === 0) {
-          results.push({ index: i, title: 'EMPTY_RECT', utilization: 0, slideW: 0, slideH: 0, slideArea: 0 });
-          continue;
+        const cellW = box.width / cols;
+        const cellH = box.height / rows;
+        const bitmap = new Uint8Array(cols * rows);
+        // first / one-past-last cell whose centre lies in [lo, hi)
+        const span = (lo, hi, origin, cell, n) => [
+          Math.max(0, Math.ceil((lo - origin) / cell - 0.5)),
+          Math.min(n, Math.ceil((hi - origin) / cell - 0.5)),
+        ];
+        const painted = Array.from(slide.querySelectorAll('*')).filter(el => classify(el).hit);
+        // Lexicographic; a missing level counts as the flow (0). Stable: document order within equal keys
+        const byPaint = (a, b) => {
+          for (let i = 0; i < Math.max(a.length, b.length); i++) {
+            const d = (a[i] || 0) - (b[i] || 0);
+            if (d) return d;
+          }
+          return 0;
+        };
+        painted.sort((a, b) => byPaint(memo.get(a).paint, memo.get(b).paint));
+        for (const el of painted) {
+          const info = memo.get(el);
+          const [cl, ct, cr, cb] = info.clip;
+          for (const r of el.getClientRects()) {
+            const [c0, c1] = span(Math.max(r.left, cl), Math.min(r.right, cr), box.left, cellW, cols);
+            const [r0, r1] = span(Math.max(r.top, ct), Math.min(r.bottom, cb), box.top, cellH, rows);
+            for (let row = r0; row < r1; row++) {
+              if (c0 < c1) bitmap.fill(info.covered ? 1 : 0, row * cols + c0, row * cols + c1);
+            }
+          }
         }
+        let hits = 0;
+        for (let i = 0; i < bitmap.length; i++) hits += bitmap[i];
+        return hits / bitmap.length * 100;
+      }
 
-        const gridSize = 40;
-        const cellW = slideRect.width / gridSize;
-        const cellH = slideRect.height / gridSize;
+      function samplePoints(slide, box, cols, rows) {
+        const cellW = box.width / cols;
+        const cellH = box.height / rows;
         let contentPoints = 0;
-        let totalPoints = 0;
-
-        for (let row = 0; row < gridSize; row++) {
-          for (let col = 0; col < gridSize; col++) {
-            const x = slideRect.left + col * cellW + cellW / 2;
-            const y = slideRect.top + row * cellH + cellH / 2;
-            totalPoints++;
-
-            const el = document.elementFromPoint(x, y);
-            // Walk up the DOM to find the first content-bearing ancestor
-            let cursor = el;
-            let found = false;
+        for (let row = 0; row < rows; row++) {
+          for (let col = 0; col < cols; col++) {
+            let cursor = document.elementFromPoint(box.left + (col + 0.5) * cellW, box.top + (row + 0.5) * cellH);
             while (cursor && cursor !== slide && cursor !== document.body && cursor !== document.documentElement) {
-              if (isContentEl(cursor)) { found = true; break; }
+              if (isContentEl(cursor, getComputedStyle(cursor))) { contentPoints++; break; }
               cursor = cursor.parentElement;
             }
-            if (found) contentPoints++;
           }
         }
+        return contentPoints / (cols * rows) * 100;
+      }
+
+      function measureSlide(slide, cols, rows, sampler) {
+        const box = slide.getBoundingClientRect();
+        const slideArea = box.width * box.height;
+        if (slideArea === 0) {
+          return { utilization: 0, slideW: 0, slideH: 0, slideArea: 0 };
+        }
+        const utilization = (sampler === 'points' ? samplePoints : sampleRects)(slide, box, cols, rows);
+        return {
+          slideW: Math.round(box.width),
+          slideH: Math.round(box.height),
+          slideArea: Math.round(slideArea),
+          utilization: Math.round(utilization * 10) / 10
+        };
+      }
+"""
 
-        const utilization = totalPoints > 0 ? (contentPoints / totalPoints * 100) : 0;
 
+def build_measure_js(
+    grid: tuple[int, int] = DEFAULT_GRID, sampler: str = DEFAULT_SAMPLER, layout: str = DEFAULT_LAYOUT
+) -> str:
+    """Return the JS string (IIFE) that runs inside the browser page."""
+    cols, rows = grid
+    if layout == "batch" and sampler == "rects":
+        measure_all = BATCH_MEASURE_JS
+    else:
+        measure_all = SEQUENTIAL_MEASURE_JS
+    return """
+    (async () => {
+      const allSlides = Array.from(document.querySelectorAll('.slide'));
+      const results = [];
+""" + SAMPLER_JS + f"""
+      const cols = {cols}, rows = {rows}, sampler = {json.dumps(sampler)}, batchCss = {json.dumps(BATCH_CSS)};
+
+      function record(i, slide, data) {{
+        if (data.slideArea === 0) {{
+          results.push({{ index: i, title: 'EMPTY_RECT', ...data }});
+          return;
+        }}
         const h2 = slide.querySelector('h2');
         const title = h2 ? h2.textContent.trim().substring(0, 60) : (slide.getAttribute('aria-labelledby') || 'no-title');
+        results.push({{ index: i, title, ...data }});
+      }}
+""" + measure_all + """
+      return results;
+    })()
+    """
 
-        results.push({
-          index: i,
-          title,
-          slideW: Math.round(slideRect.width),
-          slideH: Math.round(slideRect.height),
-          slideArea: Math.round(slideArea),
-          utilization: Math.round(utilization * 10) / 10
-        });
 
-        // Restore
+# All slides laid out together: one style injection, one reflow, then read-only rect sampling per slide
+BATCH_MEASURE_JS = """
+      const active = allSlides.filter(s => s.classList.contains('active'));
+      const ref = active[0] || allSlides[0];
+      const host = ref && ref.parentElement;
+      const w = (ref && ref.offsetWidth) || (host && host.clientWidth) || window.innerWidth;
+      const h = (ref && ref.offsetHeight) || (host && host.clientHeight) || window.innerHeight;
+
+      const style = document.createElement('style');
+      style.textContent = batchCss;
+      document.documentElement.style.setProperty('--measure-slide-w', w + 'px');
+      document.documentElement.style.setProperty('--measure-slide-h', h + 'px');
+      document.head.appendChild(style);
+      allSlides.forEach(s => s.classList.add('active'));
+      await document.fonts.ready;
+      document.body.offsetHeight;  // the single layout pass
+
+      allSlides.forEach((slide, i) => record(i, slide, measureSlide(slide, cols, rows, sampler)));
+
+      // Restore
+      style.remove();
+      document.documentElement.style.removeProperty('--measure-slide-w');
+      document.documentElement.style.removeProperty('--measure-slide-h');
+      allSlides.forEach(s => { if (!active.includes(s)) s.classList.remove('active'); });
+"""
+
+# One slide visible at a time, one animation frame each (required by the points sampler)
+SEQUENTIAL_MEASURE_JS = """
+      const display = allSlides.map(s => s.style.display);
+      const active = allSlides.map(s => s.classList.contains('active'));
+      allSlides.forEach(s => { s.style.display = 'none'; s.classList.remove('active'); });
+      for (let i = 0; i < allSlides.length; i++) {
+        const slide = allSlides[i];
+        slide.style.display = 'flex';
+        slide.classList.add('active');
+
+        // Force reflow + wait for paint
+        slide.getBoundingClientRect();
+        await new Promise(r => requestAnimationFrame(r));
+
+        record(i, slide, measureSlide(slide, cols, rows, sampler));
+
         slide.style.display = 'none';
         slide.classList.remove('active');
       }
 
-      // Restore first slide as active
-      if (allSlides.length > 0) {
-        allSlides[0].style.display = 'flex';
-        allSlides[0].classList.add('active');
-      }
-
-      return results;
-    })()
-    """
+      // Restore
+      allSlides.forEach((s, i) => { s.style.display = display[i]; s.classList.toggle('active', active[i]); });
+"""
 
 
 def load_parts(parts_path: str | Path | None) -> list[tuple[str, int, int]]:
@@ -134,6 +276,9 @@ def measure(
     html_path: str | Path,
     threshold: float = DEFAULT_THRESHOLD,
     parts: list[tuple[str, int, int]] | None = None,
+    grid: tuple[int, int] = DEFAULT_GRID,
+    sampler: str = DEFAULT_SAMPLER,
+    layout: str = DEFAULT_LAYOUT,
 ) -> list[dict[str, Any]]:
     """Open *html_path* in headless Chromium and return per-slide utilization data."""
     from playwright.sync_api import sync_playwright
@@ -152,7 +297,7 @@ def measure(
         # Wait for JS navigation to initialize
         page.wait_for_timeout(500)
 
-        js_code = build_measure_js()
+        js_code = build_measure_js(grid, sampler, layout)
         raw: list[dict[str, Any]] = page.evaluate(js_code)
 
         browser.close()
@@ -227,12 +372,28 @@ def main() -> None:
         type=str, default=None,
         help="Optional JSON file defining slide parts: [{\"name\": \"...\", \"start\": N, \"end\": M}, ...]",
     )
+    parser.add_argument(
+        "--grid",
+        type=parse_grid, default=DEFAULT_GRID, metavar="COLSxROWS",
+        help="Sample grid, e.g. 40 or 40x80 for tall slides (default: 40x40)",
+    )
+    parser.add_argument(
+        "--sampler",
+        choices=SAMPLERS, default=DEFAULT_SAMPLER,
+        help="rects: rasterize element rects (fast); points: elementFromPoint per cell (default: points)",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=LAYOUTS, default=DEFAULT_LAYOUT,
+        help="batch: lay out all slides at once and measure in one pass; "
+             "sequential: one slide per frame (always used with --sampler points) (default: sequential)",
+    )
     args = parser.parse_args()
 
     parts = load_parts(args.parts) if args.parts else None
 
     try:
-        results = measure(args.html, args.threshold, parts)
+        results = measure(args.html, args.threshold, parts, args.grid, args.sampler, args.layout)
     except FileNotFoundError as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
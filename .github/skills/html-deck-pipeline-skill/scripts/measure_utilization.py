@@ -2,127 +2,476 @@
 
 Connects to a running deck server (started by serve.py) and measures
 each slide's content utilization via Playwright headless Chromium.
+Slides are split across --workers browser contexts (one renderer process
+each) that pull indices from a shared queue; results are merged in slide order.
+
+Raw results are cached on disk (--cache, default .utilization-cache.json),
+keyed by the slide's content hash plus everything else that affects its
+layout: theme, fontsize, compiled stylesheet, part CSS, editor overrides,
+deck.js, viewport and the sampler code. Only slides whose key changed are
+re-rendered; the threshold is applied afterwards, so changing it never
+invalidates the cache.
+
+Matrix mode: --theme / --fontsize (ids from css/config.yaml, or "all") and
+--viewport take several values. Every combination is measured in the same
+browser; pages switch theme and fontsize in place via __deckAPI.setTheme /
+setFontSize and resize their viewport, and only layouts with uncached slides
+are rendered. The report then becomes one table with a row per layout.
 
 Usage:
-    python scripts/measure_utilization.py http://localhost:8080 [--threshold 30]
+    python scripts/measure_utilization.py http://localhost:8080 [--threshold 30] [--workers 4]
     python scripts/measure_utilization.py http://localhost:8080 --json > report.json
+    python scripts/measure_utilization.py http://localhost:8080 --no-cache
+    python scripts/measure_utilization.py http://localhost:8080 --theme all --fontsize all --viewport 1280x720 1920x1080
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
+import hashlib
 import json
+import os
 import sys
-from typing import Any
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, NamedTuple
+from urllib.parse import urldefrag, urljoin
 
 DEFAULT_URL = "http://localhost:8080"
 DEFAULT_THRESHOLD = 30.0  # slides below this utilization % are flagged as sparse
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_VIEWPORT = (1280, 720)
+DEFAULT_GRID = (40, 40)  # columns x rows of sample points per slide
+SAMPLERS = ("rects", "points")
+DEFAULT_SAMPLER = "points"
+DEFAULT_CACHE = Path(".utilization-cache.json")
+CACHE_FORMAT = 1  # bump when the cached payload changes shape
+CACHE_ENTRIES = 5000  # least recently used entries beyond this are dropped on save
+
+# Switch theme and fontsize in place; resolves once the compiled stylesheet has loaded
+SET_LAYOUT_JS = """
+async ([theme, fontsize]) => {
+  await window.__deckAPI.setTheme(theme);
+  await window.__deckAPI.setFontSize(fontsize);
+  await document.fonts.ready;
+}
+"""
 
+# Navigate via deck.js and wait until the slide is rendered (goToSlide resolves after load + auto-scale)
+GOTO_SLIDE_JS = """
+async (i) => {
+  await window.__deckAPI.goToSlide(i);
+  await document.fonts.ready;
+}
+"""
 
-def build_measure_js() -> str:
-    """Return JS IIFE that samples the currently active slide."""
-    return """
-    (() => {
-      const slide = document.querySelector('.slide.active');
-      if (!slide) return null;
 
-      const layoutTags = new Set([
+class Layout(NamedTuple):
+    """One cell of the measurement matrix."""
+
+    theme: str
+    fontsize: str
+    viewport: tuple[int, int]
+
+    @property
+    def label(self) -> str:
+        return f"{self.theme}/{self.fontsize}/{self.viewport[0]}x{self.viewport[1]}"
+
+
+def parse_grid(text: str) -> tuple[int, int]:
+    """Parse a --grid value: "40" -> (40, 40); "40x80" -> 40 columns x 80 rows."""
+    cols, _, rows = text.lower().partition("x")
+    grid = (int(cols), int(rows or cols))
+    if min(grid) < 1:
+        raise argparse.ArgumentTypeError(f"invalid grid: {text}")
+    return grid
+
+
+def parse_viewport(text: str) -> tuple[int, int]:
+    """Parse a --viewport value: "1920x1080" -> (1920, 1080)."""
+    width, sep, height = text.lower().partition("x")
+    try:
+        viewport = (int(width), int(height))
+    except ValueError:
+        viewport = (0, 0)
+    if not sep or min(viewport) < 1:
+        raise argparse.ArgumentTypeError(f"invalid viewport: {text}")
+    return viewport
+
+
+# Sampling engines, shared by build_measure_js(). Both count grid-cell centres that land on a
+# content-bearing element (or a descendant of one) below the slide:
+#   rects  - classify every element once (memo), then paint the client rects of all hit-testable
+#            elements into a coverage bitmap in paint order (1 = covered, 0 = not), so a cell ends up
+#            with the value of the topmost element over it; one getComputedStyle per element
+#            instead of one per sample point and ancestor. Paint order is a nested stacking key:
+#            a positioned / z-indexed box paints its subtree together, above the box itself
+#   points - the original elementFromPoint probe + ancestor walk for every cell (kept for comparison)
+SAMPLER_JS = """
+      const LAYOUT_TAGS = new Set([
         'DIV', 'SECTION', 'MAIN', 'ARTICLE', 'HEADER', 'FOOTER', 'NAV', 'UL', 'OL', 'SPAN'
       ]);
+      const CONTENT_TAGS = new Set([
+        'H1','H2','H3','H4','H5','H6','P','TABLE','IMG','SVG','CODE','PRE',
+        'BLOCKQUOTE','HR','BUTTON','INPUT','TEXTAREA','SELECT','STRONG','EM',
+        'A','LI','DT','DD','FIGCAPTION','CANVAS'
+      ]);
 
-      function isContentEl(el) {
-        if (!el || el.nodeType !== 1) return false;
-        const tag = el.tagName;
-        const cs = getComputedStyle(el);
+      function isContentEl(el, cs) {
         const bg = cs.backgroundColor;
         const hasBg = bg && bg !== 'rgba(0, 0, 0, 0)' && bg !== 'transparent';
         const hasBorder = (parseFloat(cs.borderWidth) || 0) > 0;
         const hasText = el.children.length === 0 && el.textContent.trim().length > 0;
-        const contentTags = new Set([
-          'H1','H2','H3','H4','H5','H6','P','TABLE','IMG','SVG','CODE','PRE',
-          'BLOCKQUOTE','HR','BUTTON','INPUT','TEXTAREA','SELECT','STRONG','EM',
-          'A','LI','DT','DD','FIGCAPTION','CANVAS'
-        ]);
-        return hasBg || hasBorder || (hasText && !layoutTags.has(tag)) || contentTags.has(tag);
+        return hasBg || hasBorder || (hasText && !LAYOUT_TAGS.has(el.tagName)) || CONTENT_TAGS.has(el.tagName);
       }
 
-      const slideRect = slide.getBoundingClientRect();
-      const slideArea = slideRect.width * slideRect.height;
-      if (slideArea === 0) {
-        return { utilization: 0, slideW: 0, slideH: 0, slideArea: 0, title: '' };
+      function sampleRects(slide, box, cols, rows) {
+        // element -> { covered: it or an ancestor below the slide is content, hit: receives hit-testing,
+        //              stack: paint key its descendants start from, paint: its own paint key,
+        //              clip: [l, t, r, b] from overflow ancestors }
+        const memo = new Map([[slide, { covered: false, hit: true, stack: [], paint: [], clip: [box.left, box.top, box.right, box.bottom] }]]);
+        let ordinal = 0;  // classify() reaches elements in document order
+        function classify(el) {
+          let info = memo.get(el);
+          if (info) return info;
+          const parent = classify(el.parentElement);
+          const cs = getComputedStyle(el);
+          let clip = parent.clip;
+          if (cs.overflowX !== 'visible' || cs.overflowY !== 'visible') {
+            const r = el.getBoundingClientRect();
+            clip = [Math.max(clip[0], r.left), Math.max(clip[1], r.top), Math.min(clip[2], r.right), Math.min(clip[3], r.bottom)];
+          }
+          // Approximate stacking: a positioned / z-indexed box opens a level [-1 below the flow or 1 + z above
+          // it, document ordinal] that its whole subtree paints in; its own box goes first (-2), under
+          // negative-z children
+          const z = parseInt(cs.zIndex, 10) || 0;
+          const stacked = cs.position !== 'static' || z !== 0;
+          ordinal++;
+          const stack = stacked ? [...parent.stack, z < 0 ? -1 : 1 + z, ordinal] : parent.stack;
+          info = {
+            covered: parent.covered || isContentEl(el, cs),
+            hit: cs.visibility === 'visible' && cs.pointerEvents !== 'none',
+            stack,
+            paint: stacked ? [...stack, -2] : stack,
+            clip,
+          };
+          memo.set(el, info);
+          return info;
+        }
+
+        const cellW = box.width / cols;
+        const cellH = box.height / rows;
+        const bitmap = new Uint8Array(cols * rows);
+        // first / one-past-last cell whose centre lies in [lo, hi)
+        const span = (lo, hi, origin, cell, n) => [
+          Math.max(0, Math.ceil((lo - origin) / cell - 0.5)),
+          Math.min(n, Math.ceil((hi - origin) / cell - 0.5)),
+        ];
+        const painted = Array.from(slide.querySelectorAll('*')).filter(el => classify(el).hit);
+        // Lexicographic; a missing level counts as the flow (0). Stable: document order within equal keys
+        const byPaint = (a, b) => {
+          for (let i = 0; i < Math.max(a.length, b.length); i++) {
+            const d = (a[i] || 0) - (b[i] || 0);
+            if (d) return d;
+          }
+          return 0;
+        };
+        painted.sort((a, b) => byPaint(memo.get(a).paint, memo.get(b).paint));
+        for (const el of painted) {
+          const info = memo.get(el);
+          const [cl, ct, cr, cb] = info.clip;
+          for (const r of el.getClientRects()) {
+            const [c0, c1] = span(Math.max(r.left, cl), Math.min(r.right, cr), box.left, cellW, cols);
+            const [r0, r1] = span(Math.max(r.top, ct), Math.min(r.bottom, cb), box.top, cellH, rows);
+            for (let row = r0; row < r1; row++) {
+              if (c0 < c1) bitmap.fill(info.covered ? 1 : 0, row * cols + c0, row * cols + c1);
+            }
+          }
+        }
+        let hits = 0;
+        for (let i = 0; i < bitmap.length; i++) hits += bitmap[i];
+        return hits / bitmap.length * 100;
       }
 
-      const gridSize = 40;
-      const cellW = slideRect.width / gridSize;
-      const cellH = slideRect.height / gridSize;
-      let contentPoints = 0;
-      let totalPoints = 0;
-
-      for (let row = 0; row < gridSize; row++) {
-        for (let col = 0; col < gridSize; col++) {
-          const x = slideRect.left + col * cellW + cellW / 2;
-          const y = slideRect.top + row * cellH + cellH / 2;
-          totalPoints++;
-          const el = document.elementFromPoint(x, y);
-          let cursor = el;
-          let found = false;
-          while (cursor && cursor !== slide && cursor !== document.body && cursor !== document.documentElement) {
-            if (isContentEl(cursor)) { found = true; break; }
-            cursor = cursor.parentElement;
+      function samplePoints(slide, box, cols, rows) {
+        const cellW = box.width / cols;
+        const cellH = box.height / rows;
+        let contentPoints = 0;
+        for (let row = 0; row < rows; row++) {
+          for (let col = 0; col < cols; col++) {
+            let cursor = document.elementFromPoint(box.left + (col + 0.5) * cellW, box.top + (row + 0.5) * cellH);
+            while (cursor && cursor !== slide && cursor !== document.body && cursor !== document.documentElement) {
+              if (isContentEl(cursor, getComputedStyle(cursor))) { contentPoints++; break; }
+              cursor = cursor.parentElement;
+            }
           }
-          if (found) contentPoints++;
         }
+        return contentPoints / (cols * rows) * 100;
       }
 
-      const utilization = totalPoints > 0 ? (contentPoints / totalPoints * 100) : 0;
+      function measureSlide(slide, cols, rows, sampler) {
+        const box = slide.getBoundingClientRect();
+        const slideArea = box.width * box.height;
+        if (slideArea === 0) {
+          return { utilization: 0, slideW: 0, slideH: 0, slideArea: 0 };
+        }
+        const utilization = (sampler === 'points' ? samplePoints : sampleRects)(slide, box, cols, rows);
+        return {
+          slideW: Math.round(box.width),
+          slideH: Math.round(box.height),
+          slideArea: Math.round(slideArea),
+          utilization: Math.round(utilization * 10) / 10
+        };
+      }
+"""
+
+
+def build_measure_js(grid: tuple[int, int] = DEFAULT_GRID, sampler: str = DEFAULT_SAMPLER) -> str:
+    """Return JS IIFE that samples the currently active slide on a cols x rows grid."""
+    cols, rows = grid
+    return """
+    (() => {
+      const slide = document.querySelector('.slide.active');
+      if (!slide) return null;
+""" + SAMPLER_JS + f"""
+      const data = measureSlide(slide, {cols}, {rows}, {json.dumps(sampler)});
       const h2 = slide.querySelector('h2');
-      const title = h2 ? h2.textContent.trim().substring(0, 60) : '';
-
-      return {
-        slideW: Math.round(slideRect.width),
-        slideH: Math.round(slideRect.height),
-        slideArea: Math.round(slideArea),
-        utilization: Math.round(utilization * 10) / 10,
-        title
-      };
-    })()
+      data.title = h2 ? h2.textContent.trim().substring(0, 60) : '';
+      return data;
+    }})()
     """
 
 
-def measure(url: str, threshold: float = DEFAULT_THRESHOLD) -> list[dict[str, Any]]:
-    """Open *url* in headless Chromium, navigate slides via deck.js, return per-slide data."""
-    from playwright.sync_api import sync_playwright
+def _fetch(url: str, path: str) -> tuple[bytes, str | None]:
+    """GET *path* relative to the deck page *url*, return (body, ETag)."""
+    with urllib.request.urlopen(urljoin(urldefrag(url)[0], path), timeout=30) as r:
+        return r.read(), r.headers.get("ETag")
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page(viewport={"width": 1280, "height": 720})
-        page.goto(url, wait_until="networkidle")
-        page.wait_for_timeout(500)
 
-        # Fetch config to get slide list and part info
-        config: dict[str, Any] = page.evaluate(
-            "() => fetch('slides-config.json').then(r => r.json())"
-        )
-        slides: list[dict[str, Any]] = config.get("slides", [])
-        parts: dict[str, str] = config.get("parts", {})
+def _content_id(url: str, path: str) -> str:
+    """Version of a deck file: its ETag, a hash of the body without one, "-" when missing."""
+    try:
+        body, etag = _fetch(url, path)
+    except urllib.error.HTTPError:
+        return "-"
+    return etag.strip('"') if etag else hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def _default_id(items: list[dict[str, Any]], fallback: str) -> str:
+    """Same pick as deck.js defaultThemeId()/defaultFontsizeId() in a fresh browser context."""
+    for item in items:
+        if item.get("default"):
+            return item["id"]
+    return items[0]["id"] if items else fallback
+
 
-        results: list[dict[str, Any]] = []
-        js_code = build_measure_js()
+def load_deck_settings(url: str) -> dict[str, Any]:
+    """css/config.yaml of the deck server ({themes: [...], fontsizes: [...]}), {} when unavailable."""
+    import yaml
 
+    try:
+        return yaml.safe_load(_fetch(url, "css/config.yaml")[0]) or {}
+    except (urllib.error.HTTPError, yaml.YAMLError):
+        return {}
+
+
+def _pick(requested: list[str] | None, items: list[dict[str, Any]], fallback: str, kind: str) -> list[str]:
+    """Resolve --theme / --fontsize values: None -> the default, "all" -> every configured id."""
+    ids = [item["id"] for item in items]
+    if not requested:
+        return [_default_id(items, fallback)]
+    if "all" in requested:
+        return ids or [fallback]
+    unknown = [r for r in requested if r not in ids]
+    if unknown:
+        raise SystemExit(f"Error: unknown {kind}: {', '.join(unknown)} (available: {', '.join(ids)})")
+    return list(dict.fromkeys(requested))
+
+
+def plan_layouts(
+    settings: dict[str, Any],
+    themes: list[str] | None = None,
+    fontsizes: list[str] | None = None,
+    viewports: list[tuple[int, int]] | None = None,
+) -> list[Layout]:
+    """Cartesian product of the selected viewports, themes and fontsizes (viewport outermost)."""
+    return [
+        Layout(theme, fontsize, viewport)
+        for viewport in dict.fromkeys(viewports or [DEFAULT_VIEWPORT])
+        for theme in _pick(themes, settings.get("themes") or [], "dark-theme-2", "theme")
+        for fontsize in _pick(fontsizes, settings.get("fontsizes") or [], "standard", "fontsize")
+    ]
+
+
+def deck_fingerprint(url: str, config: dict[str, Any]) -> dict[str, Any] | None:
+    """Layout-independent inputs of the cache keys, or None when the server lacks serve.py's /slides-index or compiled CSS."""
+    try:
+        index = json.loads(_fetch(url, "slides-index")[0])
+        versions = json.loads(_fetch(url, "css/compiled/versions.json")[0])
+    except (urllib.error.HTTPError, ValueError):
+        return None
+    slides: list[dict[str, Any]] = config.get("slides", [])
+    hashes = [s.get("hash") for s in index.get("slides", [])]
+    if len(hashes) != len(slides):
+        return None
+    return {
+        "hashes": hashes,
+        "versions": versions,
+        "deck_js": _content_id(url, "js/deck.js"),
+        "overrides": _content_id(url, "style/editor-overrides.css"),
+        "part_css": {p: _content_id(url, f"style/{p}.css") for p in {s.get("part", "") for s in slides}},
+    }
+
+
+def slide_keys(fingerprint: dict[str, Any], config: dict[str, Any], layout: Layout, js_code: str) -> list[str]:
+    """Cache key per slide for one layout."""
+    shared = [
+        CACHE_FORMAT,
+        hashlib.blake2b(js_code.encode(), digest_size=12).hexdigest(),
+        fingerprint["deck_js"],
+        layout.viewport,
+        layout.theme,
+        layout.fontsize,
+        fingerprint["versions"].get(f"{layout.theme}/{layout.fontsize}", "-"),
+        fingerprint["overrides"],
+    ]
+    part_css = fingerprint["part_css"]
+    return [
+        hashlib.blake2b(
+            json.dumps([*shared, part_css[s.get("part", "")], h]).encode(), digest_size=16
+        ).hexdigest()
+        for s, h in zip(config.get("slides", []), fingerprint["hashes"])
+    ]
+
+
+def load_cache(path: Path) -> dict[str, Any]:
+    """Read the result cache; a missing, corrupt or outdated file starts empty."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("format") != CACHE_FORMAT:
+        return {}
+    return data.get("entries", {})
+
+
+def save_cache(path: Path, entries: dict[str, Any]) -> None:
+    """Write the cache atomically, keeping the CACHE_ENTRIES most recently used entries."""
+    keep = sorted(entries.items(), key=lambda kv: kv[1].get("used", 0), reverse=True)[:CACHE_ENTRIES]
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"format": CACHE_FORMAT, "entries": dict(keep)}), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+async def _open_deck(browser: Any, url: str) -> Any:
+    """Open *url* in a fresh browser context and wait for deck.js to finish booting."""
+    width, height = DEFAULT_VIEWPORT
+    context = await browser.new_context(viewport={"width": width, "height": height})
+    page = await context.new_page()
+    await page.goto(url, wait_until="networkidle")
+    await page.wait_for_function("() => window.__deckAPI && typeof window.__deckAPI.goToSlide === 'function'")
+    return page
+
+
+async def _measure_async(
+    url: str, workers: int, js_code: str, jobs: list[tuple[Layout, list[int]]]
+) -> dict[Layout, dict[int, dict[str, Any]]]:
+    """Measure the given slide indices of each layout; one browser, layouts applied in place one after another."""
+    from playwright.async_api import async_playwright
+
+    raw: dict[Layout, dict[int, dict[str, Any]]] = {}
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            n = min(workers, max(len(indices) for _, indices in jobs))
+            pages = await asyncio.gather(*(_open_deck(browser, url) for _ in range(n)))
+
+            for layout, indices in jobs:
+                width, height = layout.viewport
+
+                async def apply(page: Any) -> None:
+                    await page.set_viewport_size({"width": width, "height": height})
+                    await page.evaluate(SET_LAYOUT_JS, [layout.theme, layout.fontsize])
+
+                await asyncio.gather(*(apply(page) for page in pages))
+
+                queue: asyncio.Queue[int] = asyncio.Queue()
+                for i in indices:
+                    queue.put_nowait(i)
+                results: dict[int, dict[str, Any]] = raw.setdefault(layout, {})
+
+                async def worker(page: Any) -> None:
+                    while not queue.empty():
+                        i = queue.get_nowait()
+                        await page.evaluate(GOTO_SLIDE_JS, i)
+                        results[i] = await page.evaluate(js_code)
+
+                await asyncio.gather(*(worker(page) for page in pages))
+        finally:
+            await browser.close()
+    return raw
+
+
+def measure(
+    url: str,
+    threshold: float = DEFAULT_THRESHOLD,
+    workers: int = DEFAULT_WORKERS,
+    grid: tuple[int, int] = DEFAULT_GRID,
+    sampler: str = DEFAULT_SAMPLER,
+    cache: Path | None = DEFAULT_CACHE,
+    layouts: list[Layout] | None = None,
+) -> list[dict[str, Any]]:
+    """Measure every slide of the deck at *url* in each of *layouts*, return per-slide data.
+
+    Results are ordered by layout, then slide index. *layouts* defaults to the
+    deck's default theme and fontsize at DEFAULT_VIEWPORT. Slides found in
+    *cache* are taken from it; the rest are rendered in one headless Chromium
+    with *workers* parallel contexts. cache=None measures everything.
+    """
+    config: dict[str, Any] = json.loads(_fetch(url, "slides-config.json")[0])
+    slides: list[dict[str, Any]] = config.get("slides", [])
+    parts: dict[str, str] = config.get("parts", {})
+    js_code = build_measure_js(grid, sampler)
+    if layouts is None:
+        layouts = plan_layouts(load_deck_settings(url))
+
+    fingerprint = deck_fingerprint(url, config) if cache is not None else None
+    if cache is not None and fingerprint is None:
+        print("Warning: server has no /slides-index or compiled CSS; measuring without cache", file=sys.stderr)
+    entries = load_cache(cache) if fingerprint is not None else {}
+    keys: dict[Layout, list[str]] = {}
+    raw: dict[Layout, dict[int, dict[str, Any]]] = {}
+    for layout in layouts:
+        raw[layout] = {}
+        if fingerprint is not None:
+            keys[layout] = slide_keys(fingerprint, config, layout, js_code)
+            for i, key in enumerate(keys[layout]):
+                if key in entries:
+                    raw[layout][i] = entries[key]["data"]
+    jobs = [(layout, [i for i in range(len(slides)) if i not in raw[layout]]) for layout in layouts]
+    jobs = [(layout, todo) for layout, todo in jobs if todo]
+    if jobs:
+        for layout, fresh in asyncio.run(_measure_async(url, max(1, workers), js_code, jobs)).items():
+            raw[layout].update(fresh)
+
+    if fingerprint is not None:
+        now = time.time()
+        for layout, layout_keys in keys.items():
+            for i, key in enumerate(layout_keys):
+                if raw[layout].get(i) is not None:
+                    entries[key] = {"data": raw[layout][i], "used": now}
+        save_cache(cache, entries)
+        measured = sum(len(todo) for _, todo in jobs)
+        print(f"Measured {measured} slide(s) in {len(jobs)} layout(s), "
+              f"{len(slides) * len(layouts) - measured} from cache", file=sys.stderr)
+
+    results: list[dict[str, Any]] = []
+    for layout in layouts:
         for i, slide_info in enumerate(slides):
-            # Navigate via deck.js goToSlide (falls back to direct DOM if unavailable)
-            page.evaluate(
-                f"""
-                () => {{
-                  if (typeof goToSlide === 'function') {{
-                    goToSlide({i});
-                  }}
-                }}
-                """
-            )
-            page.wait_for_timeout(200)
-
-            data: dict[str, Any] | None = page.evaluate(js_code)
+            data = raw[layout].get(i)
             if data is None:
                 data = {"utilization": 0, "slideW": 0, "slideH": 0, "slideArea": 0, "title": "ERROR"}
 
@@ -135,14 +484,16 @@ def measure(url: str, threshold: float = DEFAULT_THRESHOLD) -> list[dict[str, An
                 "part_name": part_name,
                 "file": slide_info.get("file", ""),
                 "title": data.get("title") or slide_info.get("title", "untitled"),
+                "theme": layout.theme,
+                "fontsize": layout.fontsize,
+                "viewport": f"{layout.viewport[0]}x{layout.viewport[1]}",
+                "sampler": sampler,
                 "slideW": data.get("slideW", 0),
                 "slideH": data.get("slideH", 0),
                 "utilization": data.get("utilization", 0),
                 "sparse": data.get("utilization", 0) < threshold,
             })
 
-        browser.close()
-
     return results
 
 
@@ -180,6 +531,41 @@ def report(results: list[dict[str, Any]], threshold: float) -> str:
     return "\n".join(lines)
 
 
+def matrix_report(results: list[dict[str, Any]], threshold: float) -> str:
+    """Format multi-layout results: one summary row per layout, then every slide sparse in any layout."""
+    layouts: dict[str, list[dict[str, Any]]] = {}
+    for r in results:
+        layouts.setdefault(f"{r['theme']}/{r['fontsize']}/{r['viewport']}", []).append(r)
+    width = max(len("Layout"), *(len(label) for label in layouts))
+
+    samplers = sorted({r["sampler"] for r in results})
+
+    lines: list[str] = []
+    lines.append(f"Sampler: {', '.join(samplers)}")
+    lines.append(f"{'Layout':<{width}} | {'Avg':>5} | {'Min':>5} | Sparse")
+    lines.append("-" * (width + 26))
+    for label, items in layouts.items():
+        avg_util = sum(r["utilization"] for r in items) / len(items)
+        min_util = min(r["utilization"] for r in items)
+        sparse_count = sum(1 for r in items if r["sparse"])
+        lines.append(f"{label:<{width}} | {avg_util:>4.1f}% | {min_util:>4.1f}% | {sparse_count}/{len(items)}")
+
+    by_slide: dict[int, list[dict[str, Any]]] = {}
+    for r in results:
+        if r["sparse"]:
+            by_slide.setdefault(r["index"], []).append(r)
+    lines.append("")
+    lines.append(f"Slides below {threshold:.0f}% in any layout: {len(by_slide)}/{len(results) // len(layouts)}")
+    for index, items in sorted(by_slide.items(), key=lambda kv: min(r["utilization"] for r in kv[1])):
+        worst = min(items, key=lambda r: r["utilization"])
+        lines.append(
+            f" {index:>2} | {worst['utilization']:>4.1f}% | {len(items):>2}/{len(layouts)} layouts "
+            f"| {worst['part_name']:<12} | {worst['title'][:50]}"
+        )
+
+    return "\n".join(lines)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Measure slide space utilization")
     parser.add_argument(
@@ -190,11 +576,44 @@ def main() -> None:
         "--threshold", "-t", type=float, default=DEFAULT_THRESHOLD,
         help="Utilization %% threshold for flagging (default: 30)"
     )
+    parser.add_argument(
+        "--workers", "-w", type=int, default=DEFAULT_WORKERS,
+        help=f"Parallel browser contexts, one renderer process each (default: {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--grid", type=parse_grid, default=DEFAULT_GRID, metavar="COLSxROWS",
+        help="Sample grid, e.g. 40 or 40x80 for tall slides (default: 40x40)"
+    )
+    parser.add_argument(
+        "--sampler", choices=SAMPLERS, default=DEFAULT_SAMPLER,
+        help="rects: rasterize element rects (fast); points: elementFromPoint per cell (default: points)"
+    )
+    parser.add_argument(
+        "--cache", type=Path, default=DEFAULT_CACHE, metavar="FILE",
+        help=f"Result cache file (default: {DEFAULT_CACHE})"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Re-measure every slide and leave the cache untouched")
+    parser.add_argument(
+        "--theme", nargs="+", metavar="ID",
+        help="Theme id(s) from css/config.yaml, or 'all' (default: the deck's default theme)"
+    )
+    parser.add_argument(
+        "--fontsize", nargs="+", metavar="ID",
+        help="Fontsize id(s) from css/config.yaml, or 'all' (default: the deck's default fontsize)"
+    )
+    parser.add_argument(
+        "--viewport", nargs="+", type=parse_viewport, metavar="WxH",
+        help="Viewport size(s), e.g. 1280x720 1920x1080 (default: 1280x720)"
+    )
     parser.add_argument("--json", action="store_true", help="Output raw JSON instead of report")
     args = parser.parse_args()
 
     try:
-        results = measure(args.url, args.threshold)
+        layouts = plan_layouts(load_deck_settings(args.url), args.theme, args.fontsize, args.viewport)
+        results = measure(
+            args.url, args.threshold, args.workers, args.grid, args.sampler,
+            None if args.no_cache else args.cache, layouts,
+        )
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         print(
@@ -210,7 +629,7 @@ def main() -> None:
         import io
         if sys.stdout.encoding != "utf-8":
             sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
-        print(report(results, args.threshold))
+        print(report(results, args.threshold) if len(layouts) == 1 else matrix_report(results, args.threshold))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,319 @@
+"""把讲稿导出为单文件 HTML（与页面「导出 HTML」按钮结果相同），无需浏览器或 serve.py。
+
+直接从磁盘读取 slides-config.json、css/config.yaml 中的主题 / 字号、章节样式（style/<part>.css）与
+编辑器覆盖样式（style/editor-overrides.css），按 deck.js `exportToSingleHTML` 的结构逐段写入输出文件：
+CSS 与 slide 一次只读一个，整份文档不在内存中拼接。多个讲稿 × 主题 × 字号由线程池并行导出。
+
+用法:
+  python export.py <target_dir>... [-o <out_dir>|<file>.html] [--theme <id>|all] [--fontsize <id>|all] [--jobs 4]
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from html import escape
+from pathlib import Path
+from string import Template
+
+from serve import CONTAINER, default_fontsize, default_theme, load_deck_config, read_slides_config
+
+# 与 deck.js 的 SHARED_CSS / THEME_CSS 保持一致
+SHARED_CSS = ("css/common/base.css", "css/common/components.css")
+THEME_CSS = ("tokens.css",)
+OVERRIDES_CSS = "style/editor-overrides.css"
+COPY_CHUNK = 64 * 1024
+SLIDE_ACTIVE_RE = re.compile(r'class="slide\s+active"')
+UNSAFE_NAME_RE = re.compile(r'[/\\:*?"<>|]')
+
+# 导出文档外壳，逐字对应 deck.js exportToSingleHTML 中的模板；CSS 写在 HEAD 与 MIDDLE 之间，slide 写在 MIDDLE 与 TAIL 之间
+HEAD = Template("""\
+<!doctype html>
+<html lang="zh-CN" data-theme="${theme}" data-font-size="${fontsize}">
+<head>
+  <meta charset="utf-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>${title}</title>
+  <style>
+""")
+
+MIDDLE = Template("""\
+  </style>
+  <style>
+    /* Export mode: hide shell chrome, show all slides as stack */
+    #part-nav, #deck-progress, #kbd-hint, #export-btn, #theme-select, #pptx-btn, #fontsize-select, #editor-toggle-btn { display: none; }
+    #deck-shell { display: block; height: 100vh; overflow: hidden; padding: 0; }
+    .deck { max-width: none; border-radius: 0; box-shadow: none; }
+    .slide { display: none; }
+    .slide.active { display: flex; flex-direction: column; }
+    /* Export selects: fixed position bottom-right */
+    #export-theme-select, #export-fontsize-select {
+      position: fixed; bottom: 1rem; z-index: 999;
+      padding: 0.35rem 0.6rem;
+      border: 1px solid var(--accent);
+      border-radius: 999px;
+      background: var(--accent-soft);
+      color: var(--accent);
+      font-size: 0.82rem; font-weight: 700;
+      cursor: pointer;
+      font-family: var(--font-main);
+      appearance: none; -webkit-appearance: none;
+      outline: none;
+    }
+    #export-theme-select { right: 1rem; }
+    #export-fontsize-select { right: 6.5rem; }
+    #export-theme-select option, #export-fontsize-select option { background: var(--bg); color: var(--text); }
+  </style>
+</head>
+<body>
+  <select id="export-theme-select" title="切换主题">
+            ${theme_opts}
+  </select>
+  <select id="export-fontsize-select" title="切换字号">
+            ${fontsize_opts}
+  </select>
+  <main id="deck-shell" class="part-ch01" aria-label="${title}">
+    <div class="deck" id="deck" role="region" aria-label="幻灯片">
+""")
+
+TAIL = Template("""\
+    </div>
+  </main>
+  <script>
+    (() => {
+      /* Theme & Fontsize */
+      const THEME_KEY = 'deck-theme';
+      const FONTSIZE_KEY = 'deck-fontsize';
+      const THEME_NAMES = ${theme_names};
+      const FONTSIZE_NAMES = ${fontsize_names};
+      const DEFAULT_THEME = '${default_theme}';
+      const DEFAULT_FONTSIZE = '${default_fontsize}';
+
+      const themeSel = document.getElementById('export-theme-select');
+      const fontsizeSel = document.getElementById('export-fontsize-select');
+
+      function getTheme() {
+        try { const v = localStorage.getItem(THEME_KEY); if (v && THEME_NAMES.includes(v)) return v; } catch(e) {}
+        return DEFAULT_THEME;
+      }
+      function getFontsize() {
+        try { const v = localStorage.getItem(FONTSIZE_KEY); if (v && FONTSIZE_NAMES.includes(v)) return v; } catch(e) {}
+        return DEFAULT_FONTSIZE;
+      }
+      function applyTheme(t) { document.documentElement.setAttribute('data-theme', t); if (themeSel) themeSel.value = t; }
+      function applyFontsize(fs) { document.documentElement.setAttribute('data-font-size', fs); if (fontsizeSel) fontsizeSel.value = fs; }
+      applyTheme(getTheme());
+      applyFontsize(getFontsize());
+      if (themeSel) themeSel.addEventListener('change', () => { try { localStorage.setItem(THEME_KEY, themeSel.value); } catch(e) {} applyTheme(themeSel.value); });
+      if (fontsizeSel) fontsizeSel.addEventListener('change', () => { try { localStorage.setItem(FONTSIZE_KEY, fontsizeSel.value); } catch(e) {} applyFontsize(fontsizeSel.value); });
+
+      /* Slides */
+      const slides = Array.from(document.querySelectorAll('.slide'));
+      let idx = 0;
+      function show(i) {
+        slides.forEach((el, j) => el.classList.toggle('active', j === i));
+        slides[i]?.classList.add('active');
+        // Auto-scale
+        const el = slides[i];
+        if (!el) return;
+        el.style.transform = '';
+        el.style.transformOrigin = '';
+        const sh = el.scrollHeight;
+        const ch = el.clientHeight;
+        if (sh > ch) {
+          el.style.transform = 'scale(' + ((ch - 1) / sh) + ')';
+          el.style.transformOrigin = 'top center';
+        }
+        idx = i;
+      }
+      function next() { if (idx < slides.length - 1) show(idx + 1); }
+      function prev() { if (idx > 0) show(idx - 1); }
+      document.addEventListener('keydown', e => {
+        if (e.target.tagName === 'INPUT' || e.target.tagName === 'TEXTAREA' || e.target.isContentEditable) return;
+        if (e.key === 'ArrowRight' || e.key === 'ArrowDown' || e.key === ' ') { e.preventDefault(); next(); }
+        else if (e.key === 'ArrowLeft' || e.key === 'ArrowUp') { e.preventDefault(); prev(); }
+      });
+      window.addEventListener('resize', () => {
+        const el = slides[idx];
+        if (!el) return;
+        el.style.transform = '';
+        const sh = el.scrollHeight;
+        const ch = el.clientHeight;
+        if (sh > ch) {
+          el.style.transform = 'scale(' + ((ch - 1) / sh) + ')';
+          el.style.transformOrigin = 'top center';
+        }
+      });
+      show(0);
+    })();
+  </script>
+</body>
+</html>
+""")
+
+
+@dataclass
+class ExportJob:
+    target_dir: Path
+    theme: str
+    fontsize: str
+    out_path: Path
+
+
+def export_name(title: str) -> str:
+    """与浏览器导出的默认文件名一致：标题中的非法字符替换为 -。"""
+    return UNSAFE_NAME_RE.sub("-", title)
+
+
+def css_sources(target_dir: Path, theme: str, fontsize: str, part_order: list) -> list:
+    """按 deck.js 的顺序列出 (URL, 磁盘路径)：公共 → 主题 → 字号 → 各章节。"""
+    css_dir = CONTAINER / "css"
+    sources = [(url, CONTAINER / url) for url in SHARED_CSS]
+    sources += [(f"css/theme/{theme}/{name}", css_dir / "theme" / theme / name) for name in THEME_CSS]
+    sources.append((f"css/fontsize/{fontsize}.css", css_dir / "fontsize" / f"{fontsize}.css"))
+    sources += [(f"style/{part}.css", target_dir / "style" / f"{part}.css") for part in part_order]
+    return sources
+
+
+def copy_file(out, path: Path, missing: str) -> None:
+    """把文本文件分块复制到 out；文件不存在时写入占位注释（与浏览器导出一致）。"""
+    try:
+        src = open(path, encoding="utf-8", newline="")
+    except OSError:
+        out.write(missing)
+        return
+    with src:
+        shutil.copyfileobj(src, out, COPY_CHUNK)
+
+
+def activate_slide(html: str, first: bool) -> str:
+    html = SLIDE_ACTIVE_RE.sub('class="slide active"', html, count=1)
+    if first:
+        html = html.replace('class="slide"', 'class="slide active"', 1)
+    return html
+
+
+def export_deck(job: ExportJob, deck_config: dict) -> int:
+    """导出一个 (讲稿, 主题, 字号) 组合，返回 slide 数。先写临时文件，完成后原子替换。"""
+    slides_config = read_slides_config(job.target_dir)
+    if slides_config is None:
+        raise FileNotFoundError(f"缺少 slides-config.json: {job.target_dir}")
+    slides = slides_config.get("slides", [])
+    part_order = slides_config.get("partOrder") or list(slides_config.get("parts", {}))
+    title = escape(slides_config.get("title") or "HTML Deck")
+    themes = deck_config.get("themes", [])
+    fontsizes = deck_config.get("fontsizes", [])
+    fields = {
+        "title": title,
+        "theme": job.theme,
+        "fontsize": job.fontsize,
+        "theme_opts": "\n            ".join(f'<option value="{t["id"]}">{t["label"]}</option>' for t in themes),
+        "fontsize_opts": "\n            ".join(f'<option value="{f["id"]}">{f["label"]}</option>' for f in fontsizes),
+        "theme_names": json.dumps([t["id"] for t in themes]),
+        "fontsize_names": json.dumps([f["id"] for f in fontsizes]),
+        "default_theme": default_theme(deck_config),
+        "default_fontsize": default_fontsize(deck_config),
+    }
+
+    job.out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = job.out_path.with_name(f".{job.out_path.name}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="") as out:
+            out.write(HEAD.substitute(fields))
+            for url, path in css_sources(job.target_dir, job.theme, job.fontsize, part_order):
+                copy_file(out, path, f"/* {url} not found */")
+                out.write("\n")
+            copy_file(out, job.target_dir / OVERRIDES_CSS, "")
+            out.write("\n")
+            out.write(MIDDLE.substitute(fields))
+            for i, s in enumerate(slides):
+                path = job.target_dir / "slides" / s.get("part", "") / s.get("file", "")
+                try:
+                    html = activate_slide(path.read_text(encoding="utf-8"), i == 0)
+                except OSError:
+                    html = f"<!-- {s.get('file', '')} load failed -->"
+                out.write(html)
+                out.write("\n")
+            out.write(TAIL.substitute(fields))
+        os.replace(tmp, job.out_path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return len(slides)
+
+
+def plan_jobs(targets: list, out_dir: Path | None, themes: list, fontsizes: list) -> list:
+    """展开 讲稿 × 主题 × 字号；只有一个主题 / 字号时文件名与浏览器导出相同，否则追加后缀区分。"""
+    jobs = []
+    for target in targets:
+        slides_config = read_slides_config(target) or {}
+        stem = export_name(slides_config.get("title") or "HTML Deck")
+        if out_dir is not None and len(targets) > 1:
+            stem = f"{target.name}-{stem}"
+        for theme in themes:
+            for fontsize in fontsizes:
+                suffix = (f"-{theme}" if len(themes) > 1 else "") + (f"-{fontsize}" if len(fontsizes) > 1 else "")
+                jobs.append(ExportJob(target, theme, fontsize, (out_dir or target) / f"{stem}{suffix}-export.html"))
+    return jobs
+
+
+def pick(requested: list | None, available: list, default: str, kind: str) -> list:
+    if not requested:
+        return [default]
+    if "all" in requested:
+        return available
+    unknown = [r for r in requested if r not in available]
+    if unknown:
+        raise SystemExit(f"错误：未知{kind}: {', '.join(unknown)}（可用：{', '.join(available)}）")
+    return list(dict.fromkeys(requested))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="把讲稿导出为单文件 HTML（无需浏览器）")
+    parser.add_argument("targets", nargs="*", default=["."], metavar="target",
+                        help="目标目录（包含 slides-config.json 和 slides/），可给出多个")
+    parser.add_argument("-o", "--out", default=None,
+                        help="输出目录（默认：写入各自的目标目录）；只导出一个文件时也可直接给出 .html 路径")
+    parser.add_argument("--theme", nargs="+", default=None, help="主题 id，可给出多个或 all（默认从 config.yaml 读取）")
+    parser.add_argument("--fontsize", nargs="+", default=None, help="字号 id，可给出多个或 all（默认从 config.yaml 读取）")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 4, help="并行导出的线程数")
+    args = parser.parse_args()
+
+    deck_config = load_deck_config()
+    themes = pick(args.theme, [t["id"] for t in deck_config.get("themes", [])], default_theme(deck_config), "主题")
+    fontsizes = pick(args.fontsize, [f["id"] for f in deck_config.get("fontsizes", [])],
+                     default_fontsize(deck_config), "字号")
+    targets = [Path(t).resolve() for t in args.targets]
+    missing = [t for t in targets if not (t / "slides-config.json").is_file()]
+    if missing:
+        raise SystemExit("错误：目标目录缺少 slides-config.json: " + ", ".join(map(str, missing)))
+
+    out = Path(args.out).resolve() if args.out else None
+    single_file = out is not None and out.suffix == ".html"
+    jobs = plan_jobs(targets, out.parent if single_file else out, themes, fontsizes)
+    if single_file:
+        if len(jobs) > 1:
+            raise SystemExit(f"错误：将导出 {len(jobs)} 个文件，-o 需为目录")
+        jobs[0].out_path = out
+    t0 = time.perf_counter()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [(job, pool.submit(export_deck, job, deck_config)) for job in jobs]
+        for job, future in futures:
+            try:
+                n = future.result()
+            except Exception as exc:
+                failed += 1
+                print(f"  ✗ {job.out_path}: {exc}")
+                continue
+            print(f"  ✓ {job.out_path}（{n} 页，{job.out_path.stat().st_size / 1024:.0f} KB）")
+    print(f"导出完成：{len(jobs) - failed}/{len(jobs)} 个文件，{time.perf_counter() - t0:.2f}s")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
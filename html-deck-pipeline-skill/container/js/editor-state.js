@@ -20,7 +20,10 @@
     modifications: new Map(),
     domModifications: new Map(),
     textChanges: new Map(),
-    deletions: new Map()
+    deletions: new Map(),
+
+    savedOverrides: new Map(),    // slideKey → Map<selector, Set<prop>> already in editor-overrides.css
+    clearedOverrides: new Map()   // slideKey → Map<selector, Set<prop>> saved props reset in the UI
   };
 
   // Constants
@@ -19,6 +19,7 @@
     const sm = S.modifications.get(key);
     if (!sm.has(path)) sm.set(path, new Map());
     sm.get(path).set(prop, value);
+    unclearOverride(key, path, prop);
   }
 
   function removeMod(key, path, prop) {
@@ -31,6 +32,46 @@
     if (em.size === 0) sm.delete(path);
   }
 
+  /* ---- Saved overrides (style/editor-overrides.css) ---- */
+
+  async function loadSavedOverrides() {
+    try {
+      const res = await fetch('overrides');
+      if (!res.ok) return;
+      const data = await res.json();
+      S.savedOverrides.clear();
+      (data.rules || []).forEach(rule => {
+        if (!S.savedOverrides.has(rule.slideKey)) S.savedOverrides.set(rule.slideKey, new Map());
+        S.savedOverrides.get(rule.slideKey).set(rule.selector, new Set(Object.keys(rule.props || {})));
+      });
+    } catch (err) {
+      L.warn('读取已保存样式失败', err.message);
+    }
+  }
+
+  // Record saved props cleared in the UI (props omitted: every saved prop of the rule), so the
+  // next save deletes them from editor-overrides.css. Returns what was newly marked, for undo.
+  function clearOverride(key, path, props) {
+    const saved = key && path && S.savedOverrides.has(key) && S.savedOverrides.get(key).get(path);
+    if (!saved) return [];
+    if (!S.clearedOverrides.has(key)) S.clearedOverrides.set(key, new Map());
+    const sc = S.clearedOverrides.get(key);
+    if (!sc.has(path)) sc.set(path, new Set());
+    const cleared = sc.get(path);
+    const marked = (props || Array.from(saved)).filter(p => saved.has(p) && !cleared.has(p));
+    marked.forEach(p => cleared.add(p));
+    return marked;
+  }
+
+  function unclearOverride(key, path, prop) {
+    const sc = S.clearedOverrides.get(key);
+    const cleared = sc && sc.get(path);
+    if (!cleared) return;
+    cleared.delete(prop);
+    if (cleared.size === 0) sc.delete(path);
+    if (sc.size === 0) S.clearedOverrides.delete(key);
+  }
+
   function rerenderIfSelected(el) {
     if (S.selectedEl === el) renderPanel(el);
   }
@@ -130,7 +171,7 @@
       const existing = document.getElementById('editor-exit-dialog');
       if (existing) existing.remove();
 
-      const cssN = S.modifications.size;
+      const cssN = S.modifications.size + S.clearedOverrides.size;
       const domN = S.domModifications.size;
       const txtN = S.textChanges.size;
       const delN = S.deletions.size;
@@ -1016,13 +1057,14 @@
     props.forEach(p => { oldValues[p] = el.style.getPropertyValue(p); });
     props.forEach(p => el.style.removeProperty(p));
     if (key && path) props.forEach(p => removeMod(key, path, p));
+    const cleared = clearOverride(key, path, props);
 
     // Record undo
     if (U) {
       U.push(
         '重置 ' + groupName,
-        () => { props.forEach(p => { el.style.removeProperty(p); removeMod(key, path, p); }); rerenderIfSelected(el); },
-        () => { Object.entries(oldValues).forEach(([p, v]) => { if (v) { el.style.setProperty(p, v); storeMod(key, path, p, v); } }); rerenderIfSelected(el); }
+        () => { props.forEach(p => { el.style.removeProperty(p); removeMod(key, path, p); }); clearOverride(key, path, cleared); rerenderIfSelected(el); },
+        () => { cleared.forEach(p => unclearOverride(key, path, p)); Object.entries(oldValues).forEach(([p, v]) => { if (v) { el.style.setProperty(p, v); storeMod(key, path, p, v); } }); rerenderIfSelected(el); }
       );
     }
 
@@ -1051,13 +1093,14 @@
     if (key && path) {
       if (S.modifications.has(key)) S.modifications.get(key).delete(path);
     }
+    const cleared = clearOverride(key, path);
 
     // Record undo
     if (U) {
       U.push(
         '重置元素',
-        () => { props.forEach(p => el.style.removeProperty(p)); oldCustomVars.forEach(v => el.style.removeProperty(v.name)); if (key && path) { if (S.modifications.has(key)) S.modifications.get(key).delete(path); } rerenderIfSelected(el); },
-        () => { Object.entries(oldValues).forEach(([p, v]) => { if (v) { el.style.setProperty(p, v); storeMod(key, path, p, v); } }); oldCustomVars.forEach(v => el.style.setProperty(v.name, v.value)); rerenderIfSelected(el); }
+        () => { props.forEach(p => el.style.removeProperty(p)); oldCustomVars.forEach(v => el.style.removeProperty(v.name)); if (key && path) { if (S.modifications.has(key)) S.modifications.get(key).delete(path); } clearOverride(key, path, cleared); rerenderIfSelected(el); },
+        () => { cleared.forEach(p => unclearOverride(key, path, p)); Object.entries(oldValues).forEach(([p, v]) => { if (v) { el.style.setProperty(p, v); storeMod(key, path, p, v); } }); oldCustomVars.forEach(v => el.style.setProperty(v.name, v.value)); rerenderIfSelected(el); }
       );
     }
 
@@ -1851,6 +1894,17 @@
         cssRules.push(rule);
       }
     }
+    // Saved props reset in the UI: null deletes them from editor-overrides.css
+    for (const [slideKey, slideCleared] of S.clearedOverrides) {
+      for (const [path, props] of slideCleared) {
+        let rule = cssRules.find(r => r.slideKey === slideKey && r.selector === path);
+        if (!rule) {
+          rule = { slideKey: slideKey, selector: path, props: {} };
+          cssRules.push(rule);
+        }
+        props.forEach(prop => { if (!(prop in rule.props)) rule.props[prop] = null; });
+      }
+    }
 
     // DOM changes: appended elements + reordering
     const domChanges = {};
@@ -1890,6 +1944,7 @@
     if (S.domModifications.size > 0) return true;
     if (S.textChanges.size > 0) return true;
     if (S.deletions.size > 0) return true;
+    if (S.clearedOverrides.size > 0) return true;
     return false;
   }
 
@@ -1897,8 +1952,8 @@
     const payload = buildSavePayload();
     const cssN = payload.cssRules.length;
     const domN = Object.keys(payload.domChanges).length;
-    const txtN = Object.keys(payload.S.textChanges).length;
-    const delN = Object.keys(payload.S.deletions).length;
+    const txtN = Object.keys(payload.textChanges).length;
+    const delN = Object.keys(payload.deletions).length;
     if (!cssN && !domN && !txtN && !delN) {
       showSaveStatus('没有需要保存的修改');
       return;
@@ -1906,7 +1961,7 @@
 
     L.info('保存到文件', `CSS:${cssN} DOM:${domN} Text:${txtN} Del:${delN}`);
     try {
-      const res = await fetch('/save', {
+      const res = await fetch('save', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(payload)
@@ -1919,6 +1974,8 @@
         S.domModifications.clear();
         S.textChanges.clear();
         S.deletions.clear();
+        S.clearedOverrides.clear();
+        loadSavedOverrides();
       } else {
         const err = await res.json().catch(() => ({ error: 'Unknown error' }));
         showSaveStatus('❌ 保存失败: ' + (err.error || res.status));
@@ -1953,6 +2010,7 @@
   function bootstrap() {
     if (window.__deckAPI) {
       init();
+      loadSavedOverrides();
       // Hook into deck's slide-loaded callback to restore S.modifications
       const origOnSlideLoaded = window.__deckAPI.onSlideLoaded;
       window.__deckAPI.onSlideLoaded = function() {
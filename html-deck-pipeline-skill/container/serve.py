@@ -4,24 +4,104 @@
 主题和字号配置从 css/config.yaml 读取。
 
 用法:
-  python serve.py <target_dir> [--theme dark-theme-2] [--port 8080] [--no-browser] [--watch]
+  python serve.py <target_dir> [--theme dark-theme-2] [--port 8080] [--no-browser] [--watch] [--workers 32]
+  python serve.py <dir1> <dir2> [name=dir3 ...]   # 多讲稿：每个目标挂在 /<名称>/ 下，共享一个进程与缓存
 """
 
 import argparse
+import base64
+import ctypes
+import ctypes.util
+import datetime
+import gzip
+import hashlib
 import json
+import mimetypes
 import os
+import queue
 import re
+import select
+import selectors
+import shutil
+import socket
+import struct
+import sys
 import threading
 import time
+import weakref
 import webbrowser
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from html import escape
 from html.parser import HTMLParser
-from http.server import SimpleHTTPRequestHandler, HTTPServer
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote
 
 import yaml
 
+try:  # 可选依赖：安装 brotli 后额外提供 br 编码，否则只用 gzip
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:  # 可选依赖：安装 playwright（及其 chromium）后 /thumbs 才能渲染缩略图
+    from playwright.sync_api import sync_playwright
+except ImportError:  # pragma: no cover
+    sync_playwright = None
+
 CONTAINER = Path(__file__).resolve().parent
 CONFIG_PATH = CONTAINER / "css" / "config.yaml"
+CLIENT_CONFIG_PATH = CONTAINER / "config.json"
+LOGS_DIR = CONTAINER / "logs"
+LOG_FORMAT = "deck-session-log/1"
+DEFAULT_LOG_MAX_ENTRIES = 2000
+DEFAULT_WORKERS = 32
+SAVE_WORKERS = 8
+BUNDLE_CACHE_ENTRIES = 16
+SSE_KEEPALIVE_SECS = 30.0
+KEEPALIVE_IDLE_SECS = 15.0
+REQUEST_TIMEOUT_SECS = 30.0
+DEFAULT_CACHE_MB = 64
+DEFAULT_SENDFILE_MB = 4
+MIN_COMPRESS_BYTES = 256
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/yaml")
+ENCODERS = {"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+if brotli is not None:
+    ENCODERS["br"] = lambda data: brotli.compress(data, quality=11)
+ENCODING_PREFERENCE = ("br", "gzip")
+WATCH_SUFFIXES = (".html", ".css", ".js", ".yaml", ".json")
+WATCH_POLL_SECS = 1.0
+WATCH_DEBOUNCE_SECS = 0.05
+CONFIG_FILES = ("slides-config.json", "css/config.yaml")
+RANGE_NOT_SATISFIABLE = "unsatisfiable"
+THUMBS_DIR = CONTAINER / ".cache" / "thumbs"  # 不在监视范围内，写缩略图不会触发热更新
+THUMB_WORKERS = 2
+THUMB_WIDTH = 480
+THUMB_VIEWPORT = {"width": 1280, "height": 720}
+THUMB_QUALITY = 80
+THUMB_WAIT_SECS = 15.0
+CSS_TOKEN_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+CSS_PUNCT_RE = re.compile(r"\s*([{};,>])\s*|:\s+")
+COMMON_CSS = ("base.css", "components.css", "editor.css")  # 与 index.html 中 <link> 的顺序一致
+SKELETON_LINK_RE = re.compile(
+    r'[ \t]*<link rel="stylesheet" href="css/(?:theme/[^/"]+/tokens|fontsize/[^/"]+|common/(?:base|components|editor))\.css"\s*/?>\n?')
+RESERVED_MOUNTS = ("css", "js", "events", "log", "metrics")  # 多讲稿模式下不能用作挂载名称的首段路径
+HOT_RELOAD_SCRIPT = (
+    '\n  <script>(()=>{'
+    'const s=new EventSource("events");'
+    'const full=()=>{s.close();location.reload()};'
+    'const on=(t,m)=>s.addEventListener(t,e=>{const a=window.__deckAPI;'
+    'a&&a[m]?a[m](JSON.parse(e.data)):full()});'
+    's.addEventListener("reload",full);'
+    'on("css-changed","reloadCss");'
+    'on("slide-changed","reloadSlide");'
+    'on("config-changed","reloadConfig");'
+    '})();</script>\n'
+)
 
 
 def load_deck_config() -> dict:
@@ -30,6 +110,14 @@ def load_deck_config() -> dict:
         return yaml.safe_load(f)
 
 
+def load_client_config() -> dict:
+    """读取 container/config.json（注入给前端的 window.__CONFIG），不存在或损坏时返回 {}。"""
+    try:
+        return json.loads(CLIENT_CONFIG_PATH.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
 def default_theme(config: dict) -> str:
     for t in config.get("themes", []):
         if t.get("default"):
@@ -44,103 +132,1856 @@ def default_fontsize(config: dict) -> str:
     return config["fontsizes"][0]["id"] if config.get("fontsizes") else "standard"
 
 
+@dataclass
+class CachedAsset:
+    """一个已缓存的静态文件版本。"""
+
+    path: Path
+    data: bytes
+    mtime_ns: int
+    size: int
+    etag: str
+    last_modified: str
+    content_type: str
+    variants: dict = field(default_factory=dict)  # encoding -> 压缩字节（None 表示不值得压缩）
+
+    @property
+    def compressible(self) -> bool:
+        return self.size >= MIN_COMPRESS_BYTES and self.content_type.startswith(COMPRESSIBLE_TYPES)
+
+    @property
+    def weight(self) -> int:
+        return self.size + sum(len(v) for v in self.variants.values() if v)
+
+
+class AssetCache:
+    """静态文件字节的 LRU 缓存，键为解析后的绝对路径。
+
+    每次命中前用 (mtime_ns, size) 校验文件是否变化，变化即重读，编辑后立即可见；
+    总字节数超过预算时按最久未使用淘汰。压缩版本挂在对应的文件版本上，每个版本每种编码只压缩一次。
+    大于 stream_threshold（或缓存预算）的文件不经过本缓存，由调用方从文件描述符流式发送。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_MB * 1024 * 1024,
+                 stream_threshold: int = DEFAULT_SENDFILE_MB * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.stream_threshold = stream_threshold
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path: Path) -> CachedAsset:
+        """返回 file_path 的当前版本；文件不存在时抛出 OSError。"""
+        key = str(file_path)
+        st = file_path.stat()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        with open(file_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+        mime_type, _ = mimetypes.guess_type(key)
+        entry = CachedAsset(
+            path=file_path,
+            data=data,
+            mtime_ns=st.st_mtime_ns,
+            size=len(data),
+            etag='"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"',
+            last_modified=formatdate(st.st_mtime, usegmt=True),
+            content_type=mime_type or "application/octet-stream",
+        )
+        self._store(key, entry)
+        return entry
+
+    def streams(self, size: int) -> bool:
+        """该大小的文件是否走流式（sendfile）路径而不读入内存。"""
+        return size > min(self.stream_threshold, self.max_bytes)
+
+    def invalidate(self, file_path: Path | None = None) -> None:
+        """丢弃单个文件（或全部）的缓存。"""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(str(file_path), None)
+            if entry is not None:
+                self._bytes -= entry.weight
+
+    def variant(self, entry: CachedAsset, encoding: str) -> bytes | None:
+        """返回 entry 的 encoding 压缩版本，首次请求时压缩并缓存；不可压缩或压缩无收益时返回 None。"""
+        if encoding not in ENCODERS or not entry.compressible:
+            return None
+        with self._lock:
+            if encoding in entry.variants:
+                return entry.variants[encoding]
+        body = ENCODERS[encoding](entry.data)
+        if len(body) >= entry.size:
+            body = None
+        with self._lock:
+            if encoding in entry.variants:  # 其他线程已先完成
+                return entry.variants[encoding]
+            entry.variants[encoding] = body
+            if body and self._entries.get(str(entry.path)) is entry:
+                self._bytes += len(body)
+                self._evict()
+        return body
+
+    def warm(self, roots: list) -> tuple:
+        """预读并预压缩 roots 下的全部文件，返回 (文件数, 原始字节, 压缩后字节)。"""
+        files = raw = packed = 0
+        for root in roots:
+            paths = [root] if root.is_file() else sorted(root.rglob("*"))
+            for f in paths:
+                if not f.is_file() or {"logs", "__pycache__"} & set(f.parts):
+                    continue
+                if self.streams(f.stat().st_size):
+                    continue  # 大文件始终流式发送，预热不读入
+                try:
+                    entry = self.get(f.resolve())
+                except OSError:
+                    continue
+                files += 1
+                raw += entry.size
+                best = entry.size
+                for encoding in ENCODERS:
+                    body = self.variant(entry, encoding)
+                    if body is not None:
+                        best = min(best, len(body))
+                packed += best
+        return files, raw, packed
+
+    def _store(self, key: str, entry: CachedAsset) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.weight
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.weight
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.weight
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "maxBytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+
+def minify_css(text: str) -> str:
+    """去掉注释、折叠空白并删除标点两侧的空白；字符串字面量原样保留。"""
+    def squeeze(chunk: str) -> str:
+        return CSS_PUNCT_RE.sub(lambda m: m.group(1) or ":", " ".join(chunk.split())).replace(";}", "}")
+
+    out, chunk, pos = [], [], 0
+    for m in CSS_TOKEN_RE.finditer(text):
+        chunk.append(text[pos:m.start()])
+        if m.group(1):  # 字符串：先压缩之前累积的片段，字符串本身不动
+            out += [squeeze("".join(chunk)), m.group(1)]
+            chunk = []
+        else:  # 注释按一个空白处理
+            chunk.append(" ")
+        pos = m.end()
+    chunk.append(text[pos:])
+    out.append(squeeze("".join(chunk)))
+    return "".join(out).strip()
+
+
+class StylesheetCompiler:
+    """按 (主题, 字号) 合并并压缩骨架样式：主题 tokens.css → 字号 → css/common/*.css，与 index.html 的顺序一致。
+
+    源文件经 AssetCache 读取（mtime+size 校验），只有组成文件的内容哈希变化时才重新合并；
+    结果是一个 CachedAsset，其 ETag 即版本号，压缩版本同样挂在上面只生成一次。
+    """
+
+    def __init__(self, cache: AssetCache, css_dir: Path = CONTAINER / "css") -> None:
+        self.cache = cache
+        self.css_dir = css_dir
+        self._lock = threading.Lock()
+        self._compiled: dict = {}  # (主题, 字号) → (组成文件 ETag 元组, CachedAsset)
+        self._versions: tuple | None = None  # (stamp(), versions() 结果)
+
+    def sources(self, theme: str, fontsize: str) -> list:
+        return [self.css_dir / "theme" / theme / "tokens.css", self.css_dir / "fontsize" / f"{fontsize}.css",
+                *(self.css_dir / "common" / name for name in COMMON_CSS)]
+
+    def get(self, theme: str, fontsize: str) -> CachedAsset | None:
+        """返回 (theme, fontsize) 的合并样式表；源文件缺失时返回 None。"""
+        try:
+            parts = [self.cache.get(path.resolve()) for path in self.sources(theme, fontsize)]
+        except OSError:
+            return None
+        components = tuple(a.etag for a in parts)
+        key = (theme, fontsize)
+        with self._lock:
+            cached = self._compiled.get(key)
+            if cached is not None and cached[0] == components:
+                return cached[1]
+
+        text = "\n".join(f"/* {a.path.relative_to(self.css_dir.resolve()).as_posix()} */\n"
+                         f"{minify_css(a.data.decode('utf-8'))}" for a in parts)
+        data = (text + "\n").encode("utf-8")
+        newest = max(parts, key=lambda a: a.mtime_ns)
+        version = hashlib.blake2b("".join(components).encode(), digest_size=12).hexdigest()
+        asset = CachedAsset(
+            path=self.css_dir / "compiled" / theme / f"{fontsize}.css",
+            data=data,
+            mtime_ns=newest.mtime_ns,
+            size=len(data),
+            etag=f'"{version}"',
+            last_modified=newest.last_modified,
+            content_type="text/css; charset=utf-8",
+        )
+        with self._lock:
+            self._compiled[key] = (components, asset)
+        return asset
+
+    def stamp(self, themes, fontsizes) -> tuple:
+        """全部组合涉及的源文件（去重，每个 stat 一次）的 (mtime_ns, size)；任一源文件变化，结果即变化。"""
+        paths = dict.fromkeys(path for theme in sorted(themes) for fontsize in sorted(fontsizes)
+                              for path in self.sources(theme, fontsize))
+        stamps = []
+        for path in paths:
+            try:
+                st = path.stat()
+                stamps.append((str(path), st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append((str(path), None, None))
+        return tuple(stamps)
+
+    def versions(self, themes, fontsizes, stamp: tuple | None = None) -> dict:
+        """{"主题/字号": 版本} — 注入页面，客户端据此拼出可长期缓存的 URL。源文件未变化时直接复用上次的结果。"""
+        stamp = self.stamp(themes, fontsizes) if stamp is None else stamp
+        cached = self._versions
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        result = {}
+        for theme in sorted(themes):
+            for fontsize in sorted(fontsizes):
+                asset = self.get(theme, fontsize)
+                if asset is not None:
+                    result[f"{theme}/{fontsize}"] = asset.etag.strip('"')
+        self._versions = (stamp, result)
+        return result
+
+
+@contextmanager
+def playwright_session():
+    """一个线程独占的无头 Chromium，产出 render(doc) → WebP 字节；截图经 CDP 直接编码为 WebP 并按缩略图宽度缩放。"""
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        try:
+            page = browser.new_page(viewport=THUMB_VIEWPORT)
+            cdp = page.context.new_cdp_session(page)
+
+            def render(doc: str) -> bytes:
+                page.set_content(doc, wait_until="networkidle")
+                box = page.locator(".deck").bounding_box() or {"x": 0, "y": 0, **THUMB_VIEWPORT}
+                shot = cdp.send("Page.captureScreenshot", {
+                    "format": "webp",
+                    "quality": THUMB_QUALITY,
+                    "clip": {**box, "scale": THUMB_WIDTH / box["width"]},
+                })
+                return base64.b64decode(shot["data"])
+
+            yield render
+        finally:
+            browser.close()
+
+
+class ThumbnailRenderer:
+    """slide 缩略图的磁盘缓存与后台渲染池。
+
+    文件按内容键命名（`<键>.webp`，键由 slide、合并样式表、章节样式与覆盖样式的 ETag 推出），源文件或 CSS
+    变化即换键；同一槽位（讲稿, slide, 主题, 字号）换键后删除旧文件。渲染线程在第一次提交时才启动，
+    每个线程持有自己的浏览器（Playwright 同步 API 不能跨线程共享）；同一键的并发请求共享一个 Future。
+    """
+
+    def __init__(self, cache_dir: Path = THUMBS_DIR, workers: int = THUMB_WORKERS, session=None) -> None:
+        self.cache_dir = cache_dir
+        self.workers = max(1, workers)
+        self.session = session or (playwright_session if sync_playwright is not None else None)
+        self.error: str | None = None  # 浏览器启动失败后记录原因，之后的提交直接失败
+        self.rendered = 0
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._pending: dict = {}  # 键 → Future
+        self._latest: dict = {}   # 槽位 → 最近的键
+        self._lock = threading.Lock()
+        self._threads: list = []
+
+    @property
+    def available(self) -> bool:
+        return self.session is not None and self.error is None
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.webp"
+
+    def lookup(self, slot: tuple, key: str) -> Path | None:
+        """已渲染过则返回缓存文件。"""
+        path = self.path_for(key)
+        if not path.is_file():
+            return None
+        self._supersede(slot, key)
+        return path
+
+    def submit(self, slot: tuple, key: str, doc: str) -> Future:
+        """排队渲染，返回完成时给出缓存文件路径的 Future。"""
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            if not self.available:
+                future.set_exception(RuntimeError(self.error or "未安装 playwright"))
+                return future
+            self._pending[key] = future
+            if not self._threads:
+                self._threads = [threading.Thread(target=self._run, name=f"thumbs-{i}", daemon=True)
+                                 for i in range(self.workers)]
+                for t in self._threads:
+                    t.start()
+        self._queue.put((slot, key, doc, future))
+        return future
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def _supersede(self, slot: tuple, key: str) -> None:
+        with self._lock:
+            old = self._latest.get(slot)
+            self._latest[slot] = key
+        if old is not None and old != key:
+            self.path_for(old).unlink(missing_ok=True)
+
+    def _finish(self, key: str, future: Future, path: Path | None = None, error: Exception | None = None) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+            if error is None:
+                self.rendered += 1
+            else:
+                self.failed += 1
+        if error is None:
+            future.set_result(path)
+        else:
+            future.set_exception(error)
+
+    def _run(self) -> None:
+        try:
+            with self.session() as render:
+                while True:
+                    job = self._queue.get()
+                    if job is None:
+                        return
+                    slot, key, doc, future = job
+                    try:
+                        data = render(doc)
+                        path = self.path_for(key)
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+                        tmp.write_bytes(data)
+                        tmp.replace(path)
+                        self._supersede(slot, key)
+                    except Exception as e:
+                        self._finish(key, future, error=e)
+                    else:
+                        self._finish(key, future, path)
+        except Exception as e:  # 浏览器无法启动（如未执行 playwright install chromium）
+            with self._lock:
+                self.error = f"{type(e).__name__}: {e}"
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    return
+                if job is not None:
+                    self._finish(job[1], job[3], error=RuntimeError(self.error))
+
+
+class SSEHub:
+    """SSE 长连接的事件循环：连接握手后从工作线程摘出，由单个线程统一保活、广播和回收。
+
+    工作线程只负责发送响应头，随后调用 attach() 把 socket 交给本循环并立即返回线程池，
+    因此任意多个打开的浏览器标签页都不会占用 worker。每个连接属于一个频道（所挂载讲稿的名称），
+    广播可以只发给某个讲稿的标签页。
+    """
+
+    def __init__(self, keepalive: float = SSE_KEEPALIVE_SECS) -> None:
+        self.keepalive = keepalive
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._incoming: list = []
+        self._outgoing: list = []
+        self._clients: dict = {}  # socket → 频道
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="deck-sse", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """停止事件循环并断开所有客户端。"""
+        self._closed = True
+        self._wake()
+
+    def attach(self, sock: socket.socket, channel: str = "") -> None:
+        """接管一个已完成 SSE 握手的连接。"""
+        with self._lock:
+            self._incoming.append((sock, channel))
+        self._wake()
+
+    def broadcast(self, data: bytes, channel: str | None = None) -> None:
+        """异步推送一条消息（不阻塞调用方）；channel 为 None 时发给所有客户端，否则只发给该频道。"""
+        with self._lock:
+            self._outgoing.append((data, channel))
+        self._wake()
+
+    def client_count(self) -> int:
+        with self._lock:
+            return len(self._clients) + len(self._incoming)
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except (OSError, ValueError):
+            pass
+
+    def _drop(self, sock: socket.socket) -> None:
+        self._clients.pop(sock, None)
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _send_all(self, data: bytes, channel: str | None = None) -> None:
+        for sock, sock_channel in list(self._clients.items()):
+            if channel is not None and sock_channel != channel:
+                continue
+            try:
+                sock.sendall(data)
+            except OSError:
+                self._drop(sock)
+
+    def _run(self) -> None:
+        next_ping = time.monotonic() + self.keepalive
+        while not self._closed:
+            timeout = max(0.0, next_ping - time.monotonic())
+            for key, _ in self._selector.select(timeout):
+                sock = key.fileobj
+                if sock is self._wake_r:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, InterruptedError):
+                        pass
+                    continue
+                # 客户端在 SSE 流上不会再发数据；可读即表示对端关闭（或发来可忽略的字节）
+                try:
+                    if not sock.recv(4096):
+                        self._drop(sock)
+                except OSError:
+                    self._drop(sock)
+
+            with self._lock:
+                incoming, self._incoming = self._incoming, []
+                outgoing, self._outgoing = self._outgoing, []
+            for sock, channel in incoming:
+                sock.settimeout(2.0)
+                self._clients[sock] = channel
+                self._selector.register(sock, selectors.EVENT_READ)
+            for data, channel in outgoing:
+                self._send_all(data, channel)
+
+            if time.monotonic() >= next_ping:
+                self._send_all(b": keepalive\n\n")
+                next_ping = time.monotonic() + self.keepalive
+
+        for sock in list(self._clients):
+            self._drop(sock)
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+
+class KeepAliveHub:
+    """HTTP/1.1 空闲长连接的停车场：请求处理完后连接交回这里等待下一个请求，不占用 worker。
+
+    连接可读（下一个请求到达或对端关闭）时通过 resume 回调重新提交到线程池；
+    空闲超过 idle 秒的连接直接关闭。
+    """
+
+    def __init__(self, resume, idle: float = KEEPALIVE_IDLE_SECS) -> None:
+        self.resume = resume
+        self.idle = idle
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._incoming: list = []
+        self._parked: dict = {}  # socket → (client_address, 过期时间)
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="deck-keepalive", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake()
+
+    def park(self, sock: socket.socket, client_address) -> None:
+        with self._lock:
+            self._incoming.append((sock, client_address))
+        self._wake()
+
+    def parked_count(self) -> int:
+        with self._lock:
+            return len(self._parked) + len(self._incoming)
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except (OSError, ValueError):
+            pass
+
+    def _release(self, sock: socket.socket):
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        with self._lock:
+            return self._parked.pop(sock, (None, 0))[0]
+
+    @staticmethod
+    def _close(sock: socket.socket) -> None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    def _run(self) -> None:
+        while not self._closed:
+            with self._lock:
+                deadlines = [d for _, d in self._parked.values()]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            for key, _ in self._selector.select(timeout):
+                sock = key.fileobj
+                if sock is self._wake_r:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, InterruptedError):
+                        pass
+                    continue
+                self.resume(sock, self._release(sock))
+
+            with self._lock:
+                incoming, self._incoming = self._incoming, []
+            deadline = time.monotonic() + self.idle
+            for sock, addr in incoming:
+                try:
+                    self._selector.register(sock, selectors.EVENT_READ)
+                except (ValueError, OSError):  # 已被关闭
+                    continue
+                with self._lock:
+                    self._parked[sock] = (addr, deadline)
+
+            now = time.monotonic()
+            with self._lock:
+                expired = [sock for sock, (_, d) in self._parked.items() if d <= now]
+            for sock in expired:
+                self._release(sock)
+                self._close(sock)
+
+        with self._lock:
+            parked = list(self._parked)
+        for sock in parked:
+            self._release(sock)
+            self._close(sock)
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+
+class SessionLogStore:
+    """POST /log 的追加式 JSON Lines 存储（logs/session-<时间戳>.jsonl）。
+
+    首行为头记录 {"format", "url", "ua", "created"}，其后每行一条日志。当前文件的条目数和
+    各级别计数保存在内存中，每次追加只写新条目（O(batch)），超过 max_entries 时轮转到新文件。
+    旧的整文件 JSON 形状可用 read_session_log() / --log-to-json 还原。
+    """
+
+    def __init__(self, logs_dir: Path, max_entries: int = DEFAULT_LOG_MAX_ENTRIES) -> None:
+        self.logs_dir = logs_dir
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._path: Path | None = None
+        self._count = 0
+        self._levels: dict = {}
+        self._resumed = False
+
+    def append(self, url: str, ua: str, entries: list, full: bool = False) -> tuple:
+        """追加一批日志，返回 (文件路径, 当前文件条目数, 级别计数)。full=True 时总是写入新文件。"""
+        with self._lock:
+            if not self._resumed:
+                self._resume()
+            if full or self._path is None or self._count + len(entries) > self.max_entries:
+                self._rotate(url, ua)
+            if entries:
+                with open(self._path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries))
+            self._count += len(entries)
+            for e in entries:
+                lv = e.get("level", "debug") if isinstance(e, dict) else "debug"
+                self._levels[lv] = self._levels.get(lv, 0) + 1
+            return self._path, self._count, dict(self._levels)
+
+    def _resume(self) -> None:
+        """启动后首次写入时接续最新的 .jsonl 文件（文件名含时间戳，按名排序即可，只读一次）。"""
+        self._resumed = True
+        existing = self.logs_dir.glob("session-*.jsonl") if self.logs_dir.is_dir() else []
+        # session-<日期>-<时间>[-<序号>].jsonl：按 (日期, 时间, 序号) 排序
+        existing = sorted(existing, key=lambda p: [int(x) if x.isdigit() else 0 for x in p.stem.split("-")[1:]])
+        if not existing:
+            return
+        try:
+            data = read_session_log(existing[-1])
+        except (OSError, ValueError):
+            return
+        self._path = existing[-1]
+        self._count = len(data["entries"])
+        self._levels = {}
+        for e in data["entries"]:
+            lv = e.get("level", "debug") if isinstance(e, dict) else "debug"
+            self._levels[lv] = self._levels.get(lv, 0) + 1
+
+    def _rotate(self, url: str, ua: str) -> None:
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        now = datetime.datetime.now()
+        stem = f"session-{now.strftime('%Y%m%d-%H%M%S')}"
+        path = self.logs_dir / f"{stem}.jsonl"
+        n = 1
+        while path.exists():
+            path = self.logs_dir / f"{stem}-{n}.jsonl"
+            n += 1
+        header = {"format": LOG_FORMAT, "url": url, "ua": ua, "created": now.isoformat(timespec="seconds")}
+        path.write_text(json.dumps(header, ensure_ascii=False) + "\n", encoding="utf-8")
+        self._path = path
+        self._count = 0
+        self._levels = {}
+
+
+def read_session_log(path: Path) -> dict:
+    """读取会话日志（.jsonl 或旧版 .json），统一返回 {"url", "ua", "entries"}。"""
+    if path.suffix == ".json":
+        return json.loads(path.read_text(encoding="utf-8"))
+    url = ua = ""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 进程中断时可能留下半行
+            if i == 0 and isinstance(rec, dict) and rec.get("format") == LOG_FORMAT:
+                url, ua = rec.get("url", ""), rec.get("ua", "")
+            else:
+                entries.append(rec)
+    return {"url": url, "ua": ua, "entries": entries}
+
+
+def convert_session_log(path: Path) -> Path:
+    """把 .jsonl 会话日志转换为旧版整文件 JSON（同名 .json），返回输出路径。"""
+    out = path.with_suffix(".json")
+    out.write_text(json.dumps(read_session_log(path), ensure_ascii=False, indent=2), encoding="utf-8")
+    return out
+
+
+class Metrics:
+    """进程内指标：按路由的请求耗时直方图、状态码与字节计数，以及保存 / 文件监视等内部阶段的耗时。
+
+    GET /metrics 以 Prometheus 文本格式导出，GET /metrics?format=json 导出 JSON。
+    """
+
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    HELP = {
+        "deck_request_duration_seconds": "请求处理耗时（按路由）",
+        "deck_responses_total": "响应数（按路由与状态码）",
+        "deck_response_bytes_total": "响应体字节数（按路由，取 Content-Length）",
+        "deck_save_file_duration_seconds": "POST /save 中单个 slide 的补丁耗时（含等待文件锁）",
+        "deck_save_css_duration_seconds": "POST /save 中 CSS 覆盖样式合并与写入耗时",
+        "deck_watch_scan_duration_seconds": "文件监视后端一次扫描 / 读取事件的耗时",
+        "deck_watch_batch_duration_seconds": "从检测到变化到推送热更新事件的耗时（含去抖）",
+    }
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hist: dict = {}      # (名称, 标签元组) → [各桶计数..., +Inf 计数, 总和]
+        self._counters: dict = {}  # (名称, 标签元组) → 数值
+        self.started = time.time()
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            h = self._hist.get(key)
+            if h is None:
+                h = self._hist[key] = [0] * (len(self.BUCKETS) + 1) + [0.0]
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    h[i] += 1
+                    break
+            else:
+                h[len(self.BUCKETS)] += 1
+            h[-1] += seconds
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self, gauges: dict | None = None) -> dict:
+        """JSON 形式：直方图给出 count / sum / 各桶累计计数。"""
+        with self._lock:
+            hist = {k: list(v) for k, v in self._hist.items()}
+            counters = dict(self._counters)
+        out: dict = {"uptimeSeconds": round(time.time() - self.started, 3), "gauges": gauges or {},
+                     "counters": {}, "histograms": {}}
+        for (name, labels), value in sorted(counters.items()):
+            out["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), h in sorted(hist.items()):
+            cumulative, running = {}, 0
+            for bound, n in zip(self.BUCKETS, h):
+                running += n
+                cumulative[str(bound)] = running
+            count = running + h[len(self.BUCKETS)]
+            cumulative["+Inf"] = count
+            out["histograms"].setdefault(name, []).append({
+                "labels": dict(labels), "count": count, "sum": round(h[-1], 6),
+                "mean": round(h[-1] / count, 6) if count else 0.0, "buckets": cumulative})
+        return out
+
+    def prometheus(self, gauges: dict | None = None) -> str:
+        snap = self.snapshot(gauges)
+        lines = []
+
+        def fmt_labels(labels: dict, extra: tuple = ()) -> str:
+            items = [*labels.items(), *extra]
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        for name, value in sorted(snap["gauges"].items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        for name, series in snap["counters"].items():
+            if name in self.HELP:
+                lines.append(f"# HELP {name} {self.HELP[name]}")
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(f"{name}{fmt_labels(s['labels'])} {s['value']}" for s in series)
+        for name, series in snap["histograms"].items():
+            if name in self.HELP:
+                lines.append(f"# HELP {name} {self.HELP[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for s in series:
+                for bound, n in s["buckets"].items():
+                    lines.append(f"{name}_bucket{fmt_labels(s['labels'], (('le', bound),))} {n}")
+                lines.append(f"{name}_sum{fmt_labels(s['labels'])} {s['sum']}")
+                lines.append(f"{name}_count{fmt_labels(s['labels'])} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class PollingWatcher:
+    """轮询后端：定期 rglob + stat 对比 mtime，适用于任何平台（inotify 不可用时的回退）。"""
+
+    name = "poll"
+
+    def __init__(self, dirs: list, interval: float = WATCH_POLL_SECS) -> None:
+        self.dirs = dirs
+        self.interval = interval
+        self.last_scan_secs = 0.0
+        self._mtimes = self._collect()
+
+    def _collect(self) -> dict:
+        mtimes = {}
+        for wd in self.dirs:
+            for f in wd.rglob("*"):
+                if f.suffix in WATCH_SUFFIXES and f.is_file():
+                    mtimes[str(f)] = f.stat().st_mtime_ns
+        return mtimes
+
+    def wait(self, timeout: float | None) -> set:
+        """阻塞最多 timeout 秒（None 表示一个轮询周期），返回发生变化的文件路径集合。"""
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        started = time.perf_counter()
+        cur = self._collect()
+        self.last_scan_secs = time.perf_counter() - started
+        old, self._mtimes = self._mtimes, cur
+        return {p for p in cur.keys() | old.keys() if cur.get(p) != old.get(p)}
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify 后端（ctypes 调用 libc，无第三方依赖）：事件驱动，空闲时零 CPU。
+
+    递归为每个子目录注册 watch；新建/移入的子目录自动补注册。事件队列溢出时返回全部监视根目录，
+    由调用方按“全部变化”处理。
+    """
+
+    name = "inotify"
+
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, dirs: list) -> None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify 仅在 Linux 上可用")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.dirs = dirs
+        self.last_scan_secs = 0.0
+        self._wd: dict = {}
+        try:
+            for d in dirs:
+                self._add_tree(d)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_tree(self, root: Path) -> list:
+        """为 root 及其全部子目录注册 watch，返回树中已存在的受监视文件（新目录移入时用）。"""
+        found = []
+        for dirpath, _, filenames in os.walk(root):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), self.MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch 失败: {dirpath}")
+            self._wd[wd] = dirpath
+            found.extend(os.path.join(dirpath, f) for f in filenames if f.endswith(WATCH_SUFFIXES))
+        return found
+
+    def wait(self, timeout: float | None) -> set:
+        """阻塞最多 timeout 秒（None 表示无限等待），返回发生变化的文件路径集合。"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        started = time.perf_counter()
+        changed = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _, name_len = self._EVENT.unpack_from(buf, offset)
+                offset += self._EVENT.size
+                name = buf[offset:offset + name_len].rstrip(b"\0").decode("utf-8", "surrogateescape")
+                offset += name_len
+                if mask & self.IN_Q_OVERFLOW:
+                    changed.update(str(d) for d in self.dirs)
+                    continue
+                if mask & self.IN_IGNORED:
+                    self._wd.pop(wd, None)
+                    continue
+                parent = self._wd.get(wd)
+                if parent is None or not name:
+                    continue
+                path = os.path.join(parent, name)
+                if mask & self.IN_ISDIR:
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        try:
+                            changed.update(self._add_tree(Path(path)))
+                        except OSError:
+                            pass
+                elif name.endswith(WATCH_SUFFIXES):
+                    changed.add(path)
+        self.last_scan_secs = time.perf_counter() - started
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(dirs: list, backend: str = "auto"):
+    """创建文件监视后端：auto 优先 inotify，不可用时回退轮询。"""
+    if backend in ("auto", "inotify"):
+        try:
+            return InotifyWatcher(dirs)
+        except (OSError, AttributeError) as e:
+            if backend == "inotify":
+                raise
+            print(f"  [watch] inotify 不可用（{e}），回退为轮询")
+    return PollingWatcher(dirs)
+
+
+VOID_TAGS = frozenset({"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"})
+SELECTOR_STEP_RE = re.compile(r"^([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)(?::nth-of-type\((\d+)\))?$")
+
+
+class SlideElement:
+    """slide 文档树的元素节点。保留原始开/闭标签文本，children 为 str（原文片段）与子元素混排。"""
+
+    __slots__ = ("tag", "attrs", "classes", "open_src", "close_src", "children", "parent")
+
+    def __init__(self, tag: str, attrs: list, open_src: str, parent=None) -> None:
+        self.tag = tag
+        self.attrs = dict(attrs)
+        self.classes = set((self.attrs.get("class") or "").split())
+        self.open_src = open_src
+        self.close_src = ""
+        self.children: list = []
+        self.parent = parent
+
+    def elements(self) -> list:
+        return [c for c in self.children if isinstance(c, SlideElement)]
+
+    def iter(self):
+        """深度优先遍历所有后代元素（文档顺序）。"""
+        stack = list(reversed(self.elements()))
+        while stack:
+            el = stack.pop()
+            yield el
+            stack.extend(reversed(el.elements()))
+
+    def serialize(self, out: list) -> None:
+        out.append(self.open_src)
+        for c in self.children:
+            if isinstance(c, SlideElement):
+                c.serialize(out)
+            else:
+                out.append(c)
+        out.append(self.close_src)
+
+    def outer_html(self) -> str:
+        out: list = []
+        self.serialize(out)
+        return "".join(out)
+
+
+class _SlideTreeBuilder(HTMLParser):
+    """一次扫描建树：只记录元素边界，标签之间的原文按片段原样保存，未改动部分序列化后逐字节不变。"""
+
+    def __init__(self, html: str) -> None:
+        super().__init__(convert_charrefs=True)
+        self.html = html
+        self.line_starts = [0] + [m.end() for m in re.finditer("\n", html)]
+        self.root = SlideElement("#document", [], "")
+        self.stack = [self.root]
+        self.cursor = 0
+
+    def _offset(self) -> int:
+        line, col = self.getpos()
+        return self.line_starts[line - 1] + col
+
+    def _flush(self, upto: int) -> None:
+        if upto > self.cursor:
+            self.stack[-1].children.append(self.html[self.cursor:upto])
+            self.cursor = upto
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        start = self._offset()
+        self._flush(start)
+        src = self.get_starttag_text()
+        el = SlideElement(tag, attrs, src, self.stack[-1])
+        self.stack[-1].children.append(el)
+        self.cursor = start + len(src)
+        if tag not in VOID_TAGS:
+            self.stack.append(el)
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        start = self._offset()
+        self._flush(start)
+        src = self.get_starttag_text()
+        self.stack[-1].children.append(SlideElement(tag, attrs, src, self.stack[-1]))
+        self.cursor = start + len(src)
+
+    def handle_endtag(self, tag: str) -> None:
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth].tag == tag:
+                break
+        else:
+            return  # 孤立的闭标签：留在原文片段中
+        start = self._offset()
+        self._flush(start)
+        end = self.html.find(">", start) + 1 or len(self.html)
+        self.stack[depth].close_src = self.html[start:end]
+        del self.stack[depth:]  # 其间未闭合的元素视为隐式闭合
+        self.cursor = end
+
+    def build(self) -> SlideElement:
+        self.feed(self.html)
+        self.close()
+        self._flush(len(self.html))
+        return self.root
+
+
+class SlideDocument:
+    """POST /save 的单页补丁引擎：解析一次、在树上按选择器应用全部修改、最后序列化一次。
+
+    选择器为编辑器 computePath() 生成的 `tag.cls:nth-of-type(n) > ...`，相对 `.slide` 解析，
+    每一步只看当前节点的直接子元素，因此每次定位的代价与路径上的兄弟数成正比，而不是整篇文档。
+    修改按 追加 → 重排 → 文本 → 删除 的顺序依次作用于同一棵树（与编辑器恢复修改的顺序一致）。
+    """
+
+    def __init__(self, html: str) -> None:
+        self.root = _SlideTreeBuilder(html).build()
+        self.slide = next((el for el in self.root.iter() if "slide" in el.classes), self.root)
+        self.changed = False
+
+    def serialize(self) -> str:
+        out: list = []
+        for c in self.root.children:
+            if isinstance(c, SlideElement):
+                c.serialize(out)
+            else:
+                out.append(c)
+        return "".join(out)
+
+    # ---- 选择器 ----
+
+    @staticmethod
+    def _parse_selector(selector: str) -> list | None:
+        steps = []
+        for part in selector.split(">"):
+            m = SELECTOR_STEP_RE.match(part.strip())
+            if not m or not (m.group(1) or m.group(2)):
+                return None
+            tag = (m.group(1) or "").lower()
+            classes = set(m.group(2).split(".")[1:])
+            steps.append((tag, classes, int(m.group(3)) if m.group(3) else None))
+        return steps
+
+    @staticmethod
+    def _step_matches(el: SlideElement, step: tuple) -> bool:
+        tag, classes, nth = step
+        if tag and el.tag != tag:
+            return False
+        if not classes <= el.classes:
+            return False
+        if nth is not None:
+            same = [c for c in el.parent.elements() if c.tag == el.tag]
+            return len(same) >= nth and same[nth - 1] is el
+        return True
+
+    @staticmethod
+    def _walk(el: SlideElement, steps: list) -> SlideElement | None:
+        for tag, classes, nth in steps:
+            seen: dict = {}
+            for c in el.elements():
+                k = seen[c.tag] = seen.get(c.tag, 0) + 1
+                if (not tag or c.tag == tag) and classes <= c.classes and (nth is None or k == nth):
+                    el = c
+                    break
+            else:
+                return None
+        return el
+
+    def find(self, selector: str) -> SlideElement | None:
+        """按子元素链解析选择器；首步不是 .slide 的直接子元素时退回后代查找（同 querySelector）。"""
+        steps = self._parse_selector(selector)
+        if not steps:
+            return None
+        found = self._walk(self.slide, steps)
+        if found is not None:
+            return found
+        for el in self.slide.iter():
+            if self._step_matches(el, steps[0]):
+                found = self._walk(el, steps[1:])
+                if found is not None:
+                    return found
+        return None
+
+    # ---- 修改 ----
+
+    def append(self, template: str) -> None:
+        """在 .slide-body（没有则 .slide）末尾追加元素，沿用已有子元素的缩进。"""
+        body = next((el for el in self.slide.iter() if "slide-body" in el.classes), self.slide)
+        template = re.sub(r'\s*style="[^"]*"', "", template).strip()
+        kids = body.children
+        tail = ""
+        if kids and isinstance(kids[-1], str):
+            stripped = kids[-1].rstrip()
+            tail = kids[-1][len(stripped):]
+            kids[-1] = stripped
+            if not stripped:
+                kids.pop()
+        first = kids[0] if kids and isinstance(kids[0], str) else ""
+        indent = first[first.rfind("\n"):] if "\n" in first and not first.strip() else "\n"
+        kids.extend([indent + template, tail])
+        self.changed = True
+
+    def reorder(self, parent_selector: str, fingerprints: list) -> bool:
+        """按文本指纹（同编辑器：textContent 折叠空白后前 60 字）重排容器内的 div 子元素，保留原有空白排版。"""
+        parent = self.find(parent_selector)
+        if parent is None:
+            # 兼容旧行为：退回到第一个带有最内层 class 的 div
+            classes = [p.split(".")[-1].split(":")[0] for p in parent_selector.split(" > ") if "." in p]
+            if classes:
+                parent = next((el for el in self.slide.iter() if el.tag == "div" and classes[-1] in el.classes), None)
+        if parent is None:
+            print(f"  [save] 未找到容器 {parent_selector}")
+            return False
+        slots = [i for i, c in enumerate(parent.children) if isinstance(c, SlideElement) and c.tag == "div"]
+        if len(slots) < 2:
+            return False
+        if len(slots) != len(fingerprints):
+            print(f"  [save] 子元素数({len(slots)}) ≠ 指纹数({len(fingerprints)})，跳过重排")
+            return False
+        by_fp = {}
+        for i in slots:
+            text = re.sub(r"<[^>]+>", "", parent.children[i].outer_html())
+            by_fp[re.sub(r"\s+", " ", text).strip()[:60]] = parent.children[i]
+        if any(fp not in by_fp for fp in fingerprints):
+            print(f"  [save] 指纹不匹配，跳过重排")
+            return False
+        for i, fp in zip(slots, fingerprints):
+            parent.children[i] = by_fp[fp]
+        self.changed = True
+        return True
+
+    def set_inner_html(self, selector: str, new_html: str) -> bool:
+        el = self.find(selector)
+        if el is None or el.tag in VOID_TAGS:
+            return False
+        el.children = [new_html]
+        self.changed = True
+        return True
+
+    def delete(self, selector: str) -> bool:
+        """删除元素及其后的空白（同一父元素内的后续删除按删除后的 nth-of-type 解析）。"""
+        el = self.find(selector)
+        if el is None:
+            return False
+        kids = el.parent.children
+        i = next(i for i, c in enumerate(kids) if c is el)
+        del kids[i]
+        if i < len(kids) and isinstance(kids[i], str):
+            kids[i] = kids[i].lstrip(" \t\r\n")
+        self.changed = True
+        return True
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """写入同目录临时文件后 os.replace，读者与监视器不会看到写了一半的文件。
+
+    先解析符号链接，替换的是链接指向的文件（链接本身保留）；原文件的权限位复制到新文件上。
+    """
+    path = path.resolve()
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(text, encoding="utf-8")
+        if path.exists():
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+OVERRIDE_RULE_RE = re.compile(r'\[data-slide-key="([^"]+)"\]\s+([^{}]+?)\s*\{([^}]*)\}')
+OVERRIDE_DECL_RE = re.compile(r"([-\w]+)\s*:\s*([^;]+?)\s*(?:!important)?\s*;")
+
+
+class CssOverrideStore:
+    """style/editor-overrides.css 的持久化索引：(slideKey, selector) → {属性: 值}。
+
+    启动时从现有文件读入一次；POST /save 只需发送增量（值为 null / "" 删除属性，props 为 null
+    删除整条规则），合并进索引后按 slideKey、selector 排序确定性重写，内容未变化时不写文件。
+    文件被外部修改（mtime/size 变化）时下次访问前重新读入。
+    """
+
+    HEADER = "/* Editor CSS Overrides — auto-generated */"
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._rules: dict = {}  # (slideKey, selector) → dict(props)
+        self._stamp: tuple | None = None
+        self._text = ""
+
+    def _file_stamp(self) -> tuple | None:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _sync(self) -> None:
+        stamp = self._file_stamp()
+        if self._stamp is not None and stamp == self._stamp:
+            return
+        self._rules = {}
+        self._text = ""
+        if stamp is not None:
+            self._text = self.path.read_text(encoding="utf-8")
+            for m in OVERRIDE_RULE_RE.finditer(self._text):
+                props = dict(OVERRIDE_DECL_RE.findall(m.group(3)))
+                if props:
+                    self._rules.setdefault((m.group(1), m.group(2).strip()), {}).update(props)
+        self._stamp = stamp
+
+    def load(self) -> int:
+        with self._lock:
+            self._stamp = None
+            self._sync()
+            return len(self._rules)
+
+    def rules(self) -> list:
+        with self._lock:
+            self._sync()
+            return [{"slideKey": k, "selector": sel, "props": dict(props)}
+                    for (k, sel), props in sorted(self._rules.items())]
+
+    def apply(self, deltas: list) -> tuple:
+        """合并增量规则，必要时重写文件。返回 (是否写入, 当前规则数)。"""
+        with self._lock:
+            self._sync()
+            for rule in deltas:
+                key = (rule.get("slideKey", ""), (rule.get("selector") or "").strip())
+                if not key[0] or not key[1]:
+                    continue
+                props = rule.get("props")
+                if props is None:
+                    self._rules.pop(key, None)
+                    continue
+                current = self._rules.setdefault(key, {})
+                for prop, value in props.items():
+                    if value is None or value == "":
+                        current.pop(prop, None)
+                    else:
+                        current[prop] = str(value)
+                if not current:
+                    del self._rules[key]
+            text = self.render()
+            if text == self._text:
+                return False, len(self._rules)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(self.path, text)
+            self._text = text
+            self._stamp = self._file_stamp()
+            return True, len(self._rules)
+
+    def render(self) -> str:
+        lines = [self.HEADER]
+        last_key = None
+        for (slide_key, selector), props in sorted(self._rules.items()):
+            if slide_key != last_key:
+                lines.append(f"\n/* {slide_key} */")
+                last_key = slide_key
+            decls = "".join(f"  {p}: {v} !important;\n" for p, v in props.items())
+            lines.append(f'[data-slide-key="{slide_key}"] {selector} {{\n{decls}}}')
+        lines.append("")
+        return "\n".join(lines)
+
+
+@dataclass
+class Deck:
+    """一个挂载的讲稿（目标目录）及其独立状态。
+
+    讲稿只持有自己的目录与覆盖样式索引；静态文件缓存、打包缓存、SSE 事件循环、保存线程池
+    与文件监视由 DeckHandler 在所有讲稿间共享，挂载几十个讲稿也只多占用这些小对象。
+    """
+
+    target_dir: Path
+    name: str = ""  # URL 前缀 /<name>/；"" 表示挂在根路径（单讲稿模式）
+    override_store: CssOverrideStore | None = None
+
+    def __post_init__(self) -> None:
+        self.target_dir = Path(self.target_dir).resolve()
+
+    @property
+    def prefix(self) -> str:
+        return f"/{self.name}" if self.name else ""
+
+    def overrides(self) -> CssOverrideStore:
+        if self.override_store is None:
+            self.override_store = CssOverrideStore(self.target_dir / "style" / "editor-overrides.css")
+        return self.override_store
+
+
+def parse_mounts(specs: list) -> list:
+    """命令行目标 → Deck 列表。
+
+    单个目标（未写名称）挂在根路径，与以前相同；多个目标各挂在 /<名称>/ 下。名称取 `名称=目录`
+    中的名称，否则取目录名；目录名重复时加上级目录名（如 topic-v-01），仍重复则追加序号。
+    """
+    if len(specs) == 1 and "=" not in specs[0]:
+        return [Deck(Path(specs[0]))]
+    decks, names = [], set()
+    for spec in specs:
+        name, sep, path = spec.partition("=")
+        if not sep:
+            name, path = "", spec
+        target = Path(path).resolve()
+        if name:
+            name = name.strip("/")
+            if name in names:
+                raise ValueError(f"挂载名称重复: {name}")
+        else:
+            name = target.name if target.name not in names else f"{target.parent.name}-{target.name}"
+            base, n = name, 2
+            while name in names:
+                name, n = f"{base}-{n}", n + 1
+        if not name or "/" in name or name in RESERVED_MOUNTS:
+            raise ValueError(f"无效的挂载名称: {name or spec}（不能为空、含 / 或使用 {', '.join(RESERVED_MOUNTS)}）")
+        names.add(name)
+        decks.append(Deck(target, name))
+    return decks
+
+
 class DeckHandler(SimpleHTTPRequestHandler):
-    """将 /slides-config.json、/slides/*、/style/* 路由到 target_dir；/css/* 路由到对应目录；其余从 container/ 提供。"""
+    """将 /slides-config.json、/slides/*、/style/* 路由到所挂载讲稿的目标目录；/css/* 路由到对应目录；其余从 container/ 提供。
 
-    target_dir: Path | None = None
+    多讲稿模式下每个讲稿挂在 /<名称>/ 下：请求先按首段路径找到 Deck 并去掉前缀，之后的路由与单讲稿相同。
+    """
+
+    protocol_version = "HTTP/1.1"  # 长连接：每个响应都带 Content-Length（SSE 除外，其连接由 SSEHub 接管）
+    timeout = REQUEST_TIMEOUT_SECS  # 单个请求读写的超时；空闲长连接由 DeckServer 的 KeepAliveHub 计时
+    decks: dict = {}  # 挂载名称 → Deck；单讲稿模式只有 "" 一项
+    deck: Deck | None = None  # 当前请求所属的讲稿（每个请求在 do_GET / do_POST 中解析）
     theme_dir: Path | None = None
     deck_config: dict | None = None
     theme_names: set = set()
     fontsize_names: set = set()
     watch_mode: bool = False
-    _sse_clients: list = []
+    sse_hub: SSEHub | None = None
+    asset_cache: AssetCache = AssetCache()
+    stylesheets: StylesheetCompiler = StylesheetCompiler(asset_cache)
+    compress: bool = True
+    log_store: SessionLogStore | None = None
+    metrics: Metrics = Metrics()
+    thumbnails: ThumbnailRenderer = ThumbnailRenderer()
+    _index_cache: tuple | None = None  # (源文件 mtime/size 键, 渲染结果)
+    _index_lock = threading.Lock()
     _watch_thread: threading.Thread | None = None
-    _watch_mtimes: dict = {}
+    _watcher = None
+    _save_pool: ThreadPoolExecutor | None = None
+    _bundle_cache: OrderedDict = OrderedDict()  # (讲稿名, from, to, 含正文) → (组成文件 ETag 元组, CachedAsset)
+    _bundle_lock = threading.Lock()
+    # 解析后路径 → Lock：同一文件的保存串行，不同文件并行；弱引用，没有保存持有时条目随锁释放
+    _file_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+    _file_locks_guard = threading.Lock()
+
+    def handle(self) -> None:
+        """处理连接上已到达的请求；长连接空闲后交还 DeckServer 停车，worker 不阻塞等待下一个请求。"""
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            if not self._request_buffered():
+                self.server.keep_alive(self.request, self.client_address)
+                return
+            self.handle_one_request()
+
+    def handle_one_request(self) -> None:
+        self._started = None
+        self._status = None
+        self._sent_bytes = 0
+        vars(self).pop("path", None)  # 长连接上一个请求的 path 不能算到本请求头上
+        super().handle_one_request()
+        if self._started is not None and self._status is not None:
+            path = getattr(self, "path", None)  # 请求行无法解析时（400）没有 path
+            route = "invalid" if path is None else self._route_of(self._mount_for(path.split("?")[0])[1])
+            self.metrics.observe("deck_request_duration_seconds", time.perf_counter() - self._started, route=route)
+            self.metrics.inc("deck_responses_total", route=route, code=self._status)
+            self.metrics.inc("deck_response_bytes_total", self._sent_bytes, route=route)
+
+    def parse_request(self) -> bool:
+        self._started = time.perf_counter()  # 请求行已读到：从这里开始计时，不含长连接的空闲等待
+        return super().parse_request()
+
+    def send_response(self, code: int, message: str | None = None) -> None:
+        self._status = code
+        super().send_response(code, message)
+
+    def send_header(self, keyword: str, value: str) -> None:
+        if keyword == "Content-Length":
+            self._sent_bytes = int(value)
+        super().send_header(keyword, value)
+
+    @staticmethod
+    def _route_of(path: str) -> str:
+        """指标用的路由分类。"""
+        if path in ("/", "/index.html"):
+            return "index"
+        if path in ("/events", "/bundle", "/slides-index", "/overrides", "/metrics", "/save", "/log"):
+            return path[1:]
+        if path == "/slides-config.json" or path.startswith(("/slides/", "/style/")):
+            return "target"
+        if path.startswith("/css/"):
+            return "css"
+        if path.startswith("/thumbs/"):
+            return "thumbs"
+        return "container"
+
+    def _request_buffered(self) -> bool:
+        """rfile 缓冲区里是否已有下一个请求的字节（流水线请求）；不阻塞。"""
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    @classmethod
+    def _mount_for(cls, path: str) -> tuple:
+        """URL 路径 → (所属 Deck 或 None, 去掉挂载前缀后的路径)。
+
+        "/v-01/slides/x.html" → (v-01, "/slides/x.html")；"/v-01" → (v-01, "")，由调用方重定向到 "/v-01/"。
+        首段不是挂载名称时归根路径讲稿（单讲稿模式），多讲稿模式下为 None。
+        """
+        name, sep, rest = path[1:].partition("/")
+        deck = cls.decks.get(unquote(name)) if name else None
+        if deck is not None:
+            return deck, sep + rest
+        return cls.decks.get(""), path
 
     def do_GET(self) -> None:
-        path = self.path.split("?")[0]
+        self.deck, path = self._mount_for(self.path.split("?")[0])
+
+        if path == "":
+            # 页面里的资源都是相对路径，挂载点必须以 / 结尾
+            query = self.path.partition("?")[2]
+            self.send_response(301)
+            self.send_header("Location", quote(self.deck.prefix) + "/" + (f"?{query}" if query else ""))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if self.deck is None and path in ("/", "/index.html") and self.decks:
+            self._serve_deck_list()
+            return
 
         if path == "/events" and self.watch_mode:
             self._handle_sse()
             return
 
-        if path.startswith("/css/") and self.theme_dir is not None:
-            parts = path[len("/css/"):].split("/", 1)
-
-            if parts[0] == "common":
-                self._serve_from(CONTAINER / "css" / "common", path, strip_prefix="css/common/")
-
-            elif parts[0] == "theme" and len(parts) > 1:
-                theme_parts = parts[1].split("/", 1)
-                if theme_parts[0] in self.theme_names:
-                    theme_dir = CONTAINER / "css" / "theme" / theme_parts[0]
-                    self._serve_from(theme_dir, path, strip_prefix=f"css/theme/{theme_parts[0]}/")
-                else:
-                    self.send_error(404)
-
-            elif parts[0] == "fontsize" and len(parts) > 1:
-                file = parts[1]
-                if file.rsplit(".", 1)[0] in self.fontsize_names:
-                    self._serve_from(CONTAINER / "css" / "fontsize", path, strip_prefix="css/fontsize/")
-                else:
-                    self.send_error(404)
-
-            elif parts[0] in self.theme_names:
-                # Legacy: /css/<theme>/<file>
-                theme_dir = CONTAINER / "css" / "theme" / parts[0]
-                self._serve_from(theme_dir, path, strip_prefix=f"css/{parts[0]}/")
+        if path.startswith("/css/compiled/") and self.theme_dir is not None:
+            self._serve_compiled_css(path[len("/css/compiled/"):])
 
-            elif path == "/css/config.yaml":
-                self._serve_from(CONTAINER / "css", path, strip_prefix="css/")
+        elif path == "/bundle" and self.deck is not None:
+            self._serve_bundle()
 
+        elif path == "/slides-index" and self.deck is not None:
+            asset = self._bundle(self.deck, include_html=False)
+            if asset is None:
+                self.send_error(404)
             else:
-                self._serve_from(self.theme_dir, path, strip_prefix="css/")
+                self._send_asset(asset)
 
-        elif path == "/slides-config.json" or path.startswith("/slides/") or path.startswith("/style/"):
-            if self.target_dir is not None:
-                self._serve_from(self.target_dir, path)
-            else:
-                self.send_error(404)
+        elif path.startswith("/thumbs/") and self.deck is not None and self.theme_dir is not None:
+            self._serve_thumbnail(path[len("/thumbs/"):])
 
-        else:
+        elif path == "/metrics":
+            self._serve_metrics()
+
+        elif path == "/overrides" and self.deck is not None:
+            rules = self.deck.overrides().rules()
+            self._send_json(200, {"rules": rules, "count": len(rules)})
+
+        elif path in ("/", "/index.html"):
             # Inject config into index.html
-            if path in ("/", "/index.html"):
-                self._serve_index_with_config()
+            self._serve_index_with_config()
+
+        else:
+            route = self._static_route(path, self.deck)
+            if route is None:
+                self.send_error(404)
             else:
-                self._serve_from(CONTAINER, path)
+                self._serve_from(route[0], path, strip_prefix=route[1])
+
+    @classmethod
+    def _static_route(cls, path: str, deck: Deck | None) -> tuple | None:
+        """静态文件路由：URL 路径 → (根目录, 需去掉的路径前缀)；不对应任何目录时返回 None。
+
+        do_GET 与 build.py 共用这套规则，静态构建与开发服务器解析出的是同一批文件。
+        """
+        if path.startswith("/css/") and cls.theme_dir is not None:
+            parts = path[len("/css/"):].split("/", 1)
+            if parts[0] == "common":
+                return CONTAINER / "css" / "common", "css/common/"
+            if parts[0] == "theme" and len(parts) > 1:
+                theme = parts[1].split("/", 1)[0]
+                if theme not in cls.theme_names:
+                    return None
+                return CONTAINER / "css" / "theme" / theme, f"css/theme/{theme}/"
+            if parts[0] == "fontsize" and len(parts) > 1:
+                if parts[1].rsplit(".", 1)[0] not in cls.fontsize_names:
+                    return None
+                return CONTAINER / "css" / "fontsize", "css/fontsize/"
+            if parts[0] in cls.theme_names:
+                # Legacy: /css/<theme>/<file>
+                return CONTAINER / "css" / "theme" / parts[0], f"css/{parts[0]}/"
+            if path == "/css/config.yaml":
+                return CONTAINER / "css", "css/"
+            return cls.theme_dir, "css/"
+        if path == "/slides-config.json" or path.startswith("/slides/") or path.startswith("/style/"):
+            return (deck.target_dir, "") if deck is not None else None
+        return CONTAINER, ""
+
+    def _serve_compiled_css(self, rel: str) -> None:
+        """GET /css/compiled/<主题>/<字号>.css[?v=版本] 或 /css/compiled/versions.json。"""
+        if rel == "versions.json":
+            self._send_json(200, self.stylesheets.versions(self.theme_names, self.fontsize_names))
+            return
+        theme, _, file = rel.partition("/")
+        fontsize = file[:-len(".css")] if file.endswith(".css") else ""
+        asset = None
+        if theme in self.theme_names and fontsize in self.fontsize_names:
+            asset = self.stylesheets.get(theme, fontsize)
+        if asset is None:
+            self.send_error(404)
+            return
+        immutable = parse_qs(self.path.partition("?")[2]).get("v", [""])[0] == asset.etag.strip('"')
+        self._send_asset(asset, "public, max-age=31536000, immutable" if immutable else "no-cache")
 
     def _serve_index_with_config(self) -> None:
-        """Serve index.html with injected __CONFIG from config.json."""
-        idx_path = CONTAINER / "index.html"
-        if not idx_path.is_file():
+        """Serve index.html with injected __CONFIG from config.json (rendered once, cached by source mtimes)."""
+        asset = self._rendered_index()
+        if asset is None:
             self.send_error(404)
             return
-        html = idx_path.read_text(encoding="utf-8")
+        self._send_asset(asset)
+
+    @classmethod
+    def _rendered_index(cls) -> CachedAsset | None:
+        """返回注入后的 index.html；仅当 index.html / config.json 或合并样式表某个源文件的 mtime / 大小变化时重新渲染。
 
+        骨架样式的 5 个 <link> 替换为一个合并样式表（`--theme` 与默认字号），并把全部组合的版本号注入
+        `window.__CONFIG.stylesheets`，deck.js 切换主题 / 字号时只需请求一个可长期缓存的 URL。
+        """
+        idx_path = CONTAINER / "index.html"
         config_path = CONTAINER / "config.json"
-        if config_path.is_file():
-            config_json = config_path.read_text(encoding="utf-8").strip()
-            config_script = f"\n  <script>window.__CONFIG = {config_json};</script>\n"
-            html = html.replace("</head>", config_script + "</head>")
-
-        # Inject SSE hot-reload script when --watch is active
-        if self.watch_mode:
-            reload_script = (
-                '\n  <script>(()=>{'
-                'const s=new EventSource("/events");'
-                's.onmessage=()=>{s.close();location.reload()};'
-                '})();</script>\n'
+        try:
+            idx_st = idx_path.stat()
+        except OSError:
+            return None
+        try:
+            cfg_st = config_path.stat()
+            cfg_key = (cfg_st.st_mtime_ns, cfg_st.st_size)
+        except OSError:
+            cfg_st, cfg_key = None, None
+        # 只 stat 源文件；版本号（需要逐组合读取 / 合并）仅在真正重新渲染时计算
+        css_stamp = cls.stylesheets.stamp(cls.theme_names, cls.fontsize_names)
+        theme = cls.theme_dir.name if cls.theme_dir is not None else default_theme(cls.deck_config or {})
+        sheet = f"{theme}/{default_fontsize(cls.deck_config or {})}"
+        key = (idx_st.st_mtime_ns, idx_st.st_size, cfg_key, cls.watch_mode, sheet, css_stamp)
+
+        with cls._index_lock:
+            if cls._index_cache is not None and cls._index_cache[0] == key:
+                return cls._index_cache[1]
+
+            versions = cls.stylesheets.versions(cls.theme_names, cls.fontsize_names, css_stamp)
+            html = idx_path.read_text(encoding="utf-8")
+            if cfg_st is not None:
+                config_json = config_path.read_text(encoding="utf-8").strip()
+                config_script = f"\n  <script>window.__CONFIG = {config_json};</script>\n"
+                html = html.replace("</head>", config_script + "</head>")
+
+            if sheet in versions:
+                compiled = f'  <link rel="stylesheet" id="deck-css" href="css/compiled/{sheet}.css?v={versions[sheet]}" />\n'
+                html = SKELETON_LINK_RE.sub("", SKELETON_LINK_RE.sub(compiled, html, count=1))
+                html = html.replace("</head>", f"  <script>(window.__CONFIG = window.__CONFIG || {{}}).stylesheets = "
+                                                f"{json.dumps(versions)};</script>\n</head>")
+
+            # Inject SSE hot-reload script when --watch is active
+            if cls.watch_mode:
+                html = html.replace("</head>", HOT_RELOAD_SCRIPT + "</head>")
+
+            data = html.encode("utf-8")
+            mtime = max(idx_st.st_mtime, cfg_st.st_mtime if cfg_st is not None else 0)
+            asset = CachedAsset(
+                path=idx_path,
+                data=data,
+                mtime_ns=max(idx_st.st_mtime_ns, cfg_key[0] if cfg_key else 0),
+                size=len(data),
+                etag='"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"',
+                last_modified=formatdate(mtime, usegmt=True),
+                content_type="text/html; charset=utf-8",
             )
-            html = html.replace("</head>", reload_script + "</head>")
+            cls._index_cache = (key, asset)
+            return asset
 
-        data = html.encode("utf-8")
+    def _serve_deck_list(self) -> None:
+        """多讲稿模式的根页面：列出全部挂载的讲稿。"""
+        items = []
+        for name, deck in sorted(self.decks.items()):
+            try:
+                config = json.loads(self.asset_cache.get(deck.target_dir / "slides-config.json").data)
+            except (OSError, ValueError):
+                config = {}
+            title = config.get("title") or name
+            items.append(f'    <li><a href="{escape(quote(name))}/">{escape(title)}</a> '
+                         f'<code>/{escape(name)}/</code> · {len(config.get("slides", []))} 页</li>')
+        body = ('<!DOCTYPE html>\n<html lang="zh-CN">\n<head><meta charset="utf-8"><title>HTML Deck</title></head>\n'
+                '<body>\n  <h1>讲稿</h1>\n  <ul>\n' + "\n".join(items) + '\n  </ul>\n</body>\n</html>\n').encode("utf-8")
         self.send_response(200)
         self.send_header("Content-Type", "text/html; charset=utf-8")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Cache-Control", "public, max-age=3600")
-        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
-        self.wfile.write(data)
+        self.wfile.write(body)
+
+    def _serve_metrics(self) -> None:
+        """GET /metrics（Prometheus 文本格式）或 /metrics?format=json。"""
+        cache = self.asset_cache.stats()
+        lookups = cache["hits"] + cache["misses"]
+        gauges = {
+            "deck_cache_entries": cache["entries"],
+            "deck_cache_bytes": cache["bytes"],
+            "deck_cache_max_bytes": cache["maxBytes"],
+            "deck_cache_hits": cache["hits"],
+            "deck_cache_misses": cache["misses"],
+            "deck_cache_hit_ratio": round(cache["hits"] / lookups, 4) if lookups else 0.0,
+            "deck_bundle_cache_entries": len(self._bundle_cache),
+            "deck_mounts": len(self.decks),
+            "deck_sse_clients": self.sse_hub.client_count() if self.sse_hub is not None else 0,
+            "deck_keepalive_idle_connections": self.server.idle_connections() if isinstance(self.server, DeckServer) else 0,
+            "deck_thumbnails_rendered": self.thumbnails.rendered,
+            "deck_thumbnails_failed": self.thumbnails.failed,
+            "deck_thumbnails_pending": self.thumbnails.pending_count(),
+        }
+        if parse_qs(self.path.partition("?")[2]).get("format", [""])[0] == "json":
+            self._send_json(200, self.metrics.snapshot(gauges))
+            return
+        body = self.metrics.prometheus(gauges).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve_thumbnail(self, rel: str) -> None:
+        """GET /thumbs/<part>/<file>.webp[?theme=&fontsize=] — 命中磁盘缓存直接返回，否则交给渲染池并等待结果。"""
+        query = parse_qs(self.path.partition("?")[2])
+        theme = query.get("theme", [self.theme_dir.name])[0]
+        fontsize = query.get("fontsize", [default_fontsize(self.deck_config or {})])[0]
+        part, _, name = unquote(rel).partition("/")
+        if not name.endswith(".webp") or theme not in self.theme_names or fontsize not in self.fontsize_names:
+            self.send_error(404)
+            return
+        file = name[:-len(".webp")]
+        if not file.endswith(".html"):  # /thumbs/ch01/01-cover.webp → slides/ch01/01-cover.html
+            file += ".html"
+        job = self._thumbnail_job(self.deck, part, file, theme, fontsize,
+                                  f"http://localhost:{self.server.server_address[1]}{quote(self.deck.prefix)}/")
+        if job is None:
+            self.send_error(404)
+            return
+        slot, key, doc = job
+        path = self.thumbnails.lookup(slot, key)
+        if path is None:
+            if not self.thumbnails.available:
+                self._send_json(501, {"error": f"缩略图需要 playwright 与 chromium：{self.thumbnails.error or '未安装 playwright'}"})
+                return
+            t0 = time.perf_counter()
+            try:
+                path = self.thumbnails.submit(slot, key, doc).result(timeout=THUMB_WAIT_SECS)
+            except TimeoutError:
+                # 渲染仍在后台进行，完成后写入缓存；客户端稍后重试即可
+                self.send_response(503)
+                self.send_header("Retry-After", "2")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            except Exception as e:
+                self._send_json(500, {"error": f"缩略图渲染失败: {e}"})
+                return
+            self.metrics.observe("deck_thumbnail_render_duration_seconds", time.perf_counter() - t0)
+        try:
+            data = path.read_bytes()
+            st = path.stat()
+        except OSError:  # 刚被更新的版本替换
+            self.send_error(404)
+            return
+        self._send_asset(CachedAsset(
+            path=path,
+            data=data,
+            mtime_ns=st.st_mtime_ns,
+            size=len(data),
+            etag=f'"{key}"',
+            last_modified=formatdate(st.st_mtime, usegmt=True),
+            content_type="image/webp",
+        ))
+
+    @classmethod
+    def _thumbnail_job(cls, deck: Deck, part: str, file: str, theme: str, fontsize: str,
+                       base_url: str) -> tuple | None:
+        """(槽位, 内容键, 渲染用 HTML)；slide 不存在时返回 None。
+
+        键覆盖 slide、(主题, 字号) 合并样式表、章节样式与编辑器覆盖样式，任一变化都会得到新键。
+        """
+        slide_path = (deck.target_dir / "slides" / part / file).resolve()
+        if deck.target_dir / "slides" not in slide_path.parents:
+            return None
+        try:
+            slide = cls.asset_cache.get(slide_path)
+        except OSError:
+            return None
+        sheet = cls.stylesheets.get(theme, fontsize)
+        if sheet is None:
+            return None
+        extras = []
+        for path in (deck.target_dir / "style" / f"{part}.css", deck.target_dir / "style" / "editor-overrides.css"):
+            try:
+                extras.append(cls.asset_cache.get(path))
+            except OSError:
+                continue
+        slot = (str(deck.target_dir), part, file, theme, fontsize)
+        components = [*slot, str(THUMB_WIDTH), slide.etag, sheet.etag, *(a.etag for a in extras)]
+        key = hashlib.blake2b("|".join(components).encode(), digest_size=16).hexdigest()
+        css = "\n".join(a.data.decode("utf-8") for a in [sheet, *extras])
+        slide_key = json.dumps(f"{part}/{file}")
+        doc = (
+            f'<!doctype html>\n<html lang="zh-CN" data-theme="{escape(theme)}" data-font-size="{escape(fontsize)}">\n'
+            f'<head>\n<meta charset="utf-8" />\n<base href="{escape(base_url)}" />\n<style>\n{css}\n</style>\n'
+            f'<style>#deck-shell {{ display: block; height: 100vh; overflow: hidden; padding: 0; }}</style>\n'
+            f'</head>\n<body>\n<main id="deck-shell" class="part-{escape(part)}">\n<div class="deck" id="deck">\n'
+            f'{slide.data.decode("utf-8")}\n</div>\n</main>\n'
+            f'<script>const s = document.querySelector(".slide"); '
+            f'if (s) {{ s.classList.add("active"); s.dataset.slideKey = {slide_key}; }}</script>\n'
+            f'</body>\n</html>\n'
+        )
+        return slot, key, doc
+
+    def _serve_bundle(self) -> None:
+        """GET /bundle[?from=i&to=j][&v=版本] — 一次返回一段（默认全部）slide 片段与涉及章节的 CSS。"""
+        query = parse_qs(self.path.partition("?")[2])
+        try:
+            start = int(query.get("from", ["0"])[0])
+            end = int(query["to"][0]) if "to" in query else None
+        except ValueError:
+            self._send_json(400, {"error": "from / to 必须是整数"})
+            return
+        asset = self._bundle(self.deck, start, end)
+        if asset is None:
+            self.send_error(404)
+            return
+        # 带当前版本号请求的 URL 内容永不变化，可长期缓存；其余按 ETag 重新验证
+        immutable = query.get("v", [""])[0] == asset.etag.strip('"')
+        self._send_asset(asset, "public, max-age=31536000, immutable" if immutable else "no-cache")
+
+    @classmethod
+    def _bundle(cls, deck: Deck, start: int = 0, end: int | None = None,
+                include_html: bool = True) -> CachedAsset | None:
+        """构建（或复用）讲稿 slides[start:end] 的打包 JSON。版本为全部组成文件内容哈希的哈希，任一文件变化即失效。
+
+        include_html=False 时只含每页的内容哈希（GET /slides-index），供客户端校验片段缓存。
+        """
+        try:
+            config_asset = cls.asset_cache.get(deck.target_dir / "slides-config.json")
+            config = json.loads(config_asset.data)
+        except (OSError, ValueError):
+            return None
+        all_slides = config.get("slides", [])
+        start, end, _ = slice(start, end).indices(len(all_slides))
+        selected = all_slides[start:end]
+        parts = list(dict.fromkeys(s.get("part", "") for s in selected))
+
+        slides_dir = deck.target_dir / "slides"
+        def load(path: Path) -> CachedAsset | None:
+            path = path.resolve()
+            if deck.target_dir not in path.parents:
+                return None
+            try:
+                return cls.asset_cache.get(path)
+            except OSError:
+                return None
+
+        slide_assets = [load(slides_dir / s.get("part", "") / s.get("file", "")) for s in selected]
+        css_assets = [load(deck.target_dir / "style" / f"{p}.css") for p in parts] if include_html else []
+        components = (config_asset.etag, *(a.etag if a else "-" for a in slide_assets + css_assets))
+        key = (deck.name, start, end, include_html)
+        with cls._bundle_lock:
+            cached = cls._bundle_cache.get(key)
+            if cached is not None and cached[0] == components:
+                cls._bundle_cache.move_to_end(key)
+                return cached[1]
+
+        version = hashlib.blake2b("".join(components).encode(), digest_size=12).hexdigest()
+        bundle = {
+            "version": version,
+            "from": start,
+            "to": end,
+            "total": len(all_slides),
+            "slides": [{
+                "index": start + i,
+                "part": s.get("part", ""),
+                "file": s.get("file", ""),
+                "hash": a.etag.strip('"') if a else None,
+                **({"html": a.data.decode("utf-8") if a else None} if include_html else {}),
+            } for i, (s, a) in enumerate(zip(selected, slide_assets))],
+        }
+        if include_html:
+            bundle["css"] = {p: a.data.decode("utf-8") for p, a in zip(parts, css_assets) if a}
+        data = json.dumps(bundle, ensure_ascii=False).encode("utf-8")
+        newest = max([config_asset] + [a for a in slide_assets + css_assets if a], key=lambda a: a.mtime_ns)
+        asset = CachedAsset(
+            path=deck.target_dir / "bundle",
+            data=data,
+            mtime_ns=newest.mtime_ns,
+            size=len(data),
+            etag=f'"{version}"',
+            last_modified=newest.last_modified,
+            content_type="application/json; charset=utf-8",
+        )
+        with cls._bundle_lock:
+            cls._bundle_cache[key] = (components, asset)
+            cls._bundle_cache.move_to_end(key)
+            while len(cls._bundle_cache) > BUNDLE_CACHE_ENTRIES:
+                cls._bundle_cache.popitem(last=False)
+        return asset
 
     def do_OPTIONS(self) -> None:
         """处理 CORS 预检请求。"""
@@ -153,11 +1994,14 @@ class DeckHandler(SimpleHTTPRequestHandler):
 
     def do_POST(self) -> None:
         """处理 POST 请求。"""
-        if self.path == "/log":
+        self.deck, path = self._mount_for(self.path)
+        if path == "/log":
             self._handle_log()
-        elif self.path == "/save" and self.target_dir is not None:
+        elif path == "/save" and self.deck is not None:
             self._handle_save()
         else:
+            # 读掉请求体，否则长连接上的下一个请求会从残留的 body 开始解析
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
             self.send_error(404)
 
     def _handle_log(self) -> None:
@@ -169,53 +2013,29 @@ class DeckHandler(SimpleHTTPRequestHandler):
             self._send_json(400, {"error": "Invalid JSON"})
             return
 
-        logs_dir = CONTAINER / "logs"
-        logs_dir.mkdir(parents=True, exist_ok=True)
+        if DeckHandler.log_store is None:
+            max_entries = load_client_config().get("log", {}).get("maxEntriesPerFile", DEFAULT_LOG_MAX_ENTRIES)
+            DeckHandler.log_store = SessionLogStore(LOGS_DIR, max_entries)
 
         new_entries = payload.get("entries", [])
-        is_full = payload.get("full", False)
-        max_per_file = 2000
-
-        # Determine target file: use most recent session file, or create new
-        if is_full:
-            # Full save: always create a new file
-            filepath = self._new_log_file(logs_dir)
-            all_entries = new_entries
-        else:
-            # Incremental: append to most recent file, rotating if needed
-            filepath, existing = self._find_active_log(logs_dir)
-            if existing is not None and len(existing) + len(new_entries) <= max_per_file:
-                all_entries = existing + new_entries
-            elif existing is not None:
-                # Would exceed limit — rotate to new file
-                filepath = self._new_log_file(logs_dir)
-                all_entries = new_entries
-            else:
-                all_entries = new_entries
-
-        filepath.write_text(
-            json.dumps({"url": payload.get("url", ""), "ua": payload.get("ua", ""), "entries": all_entries},
-                       ensure_ascii=False, indent=2),
-            encoding="utf-8"
-        )
-
-        levels = {}
-        for e in all_entries:
-            lv = e.get("level", "debug")
-            levels[lv] = levels.get(lv, 0) + 1
+        filepath, total, levels = self.log_store.append(
+            payload.get("url", ""), payload.get("ua", ""), new_entries, full=payload.get("full", False))
 
         self._send_json(200, {
             "message": f"已保存 {len(new_entries)} 条日志",
             "file": filepath.name,
-            "total": len(all_entries),
+            "total": total,
             "levels": levels
         })
-        print(f"  [log] +{len(new_entries)} → {filepath.name} (total {len(all_entries)}, {', '.join(f'{k}:{v}' for k, v in sorted(levels.items()))})")
+        print(f"  [log] +{len(new_entries)} → {filepath.name} (total {total}, {', '.join(f'{k}:{v}' for k, v in sorted(levels.items()))})")
 
     # ---- SSE hot-reload ---- #
 
     def _handle_sse(self) -> None:
-        """SSE endpoint for hot-reload notifications."""
+        """SSE endpoint for hot-reload notifications.
+
+        握手完成后把连接交给 SSEHub，工作线程立即返回；连接由 DeckServer 标记为已摘出，不会被关闭。
+        """
         self.send_response(200)
         self.send_header("Content-Type", "text/event-stream")
         self.send_header("Cache-Control", "no-cache")
@@ -224,87 +2044,120 @@ class DeckHandler(SimpleHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(b"data: connected\n\n")
         self.wfile.flush()
-        DeckHandler._sse_clients.append(self)
-        try:
-            while True:
-                time.sleep(30)
-                # Keep-alive
-                try:
-                    self.wfile.write(b": keepalive\n\n")
-                    self.wfile.flush()
-                except Exception:
-                    break
-        except Exception:
-            pass
-        finally:
-            if self in DeckHandler._sse_clients:
-                DeckHandler._sse_clients.remove(self)
+        self.close_connection = True
+        self.server.detach_request(self.request)
+        self.sse_hub.attach(self.request, self.deck.name if self.deck is not None else "")
 
     @classmethod
-    def _broadcast_reload(cls) -> None:
-        """Send reload event to all connected SSE clients."""
-        dead = []
-        for client in cls._sse_clients:
-            try:
-                client.wfile.write(b"data: reload\n\n")
-                client.wfile.flush()
-            except Exception:
-                dead.append(client)
-        for d in dead:
-            if d in cls._sse_clients:
-                cls._sse_clients.remove(d)
+    def _broadcast_event(cls, event: str, data: dict, channel: str | None = None) -> None:
+        """向 SSE 客户端推送一条具名事件（channel 为讲稿名称，None 表示所有讲稿）。"""
+        if cls.sse_hub is not None:
+            payload = json.dumps(data, ensure_ascii=False)
+            cls.sse_hub.broadcast(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"), channel)
+
+    @staticmethod
+    def _hot_reload_events(paths: list) -> list:
+        """把变化的 URL 路径归类为 (事件, 数据) 列表。
+
+        css-changed → 客户端只替换对应 <link>；slide-changed → 只重载当前页；
+        config-changed → 重新读取配置；其余（js、index.html 等）→ reload 整页刷新。
+        """
+        config = [p for p in paths if p in CONFIG_FILES]
+        css = [p for p in paths if p.endswith(".css")]
+        slides = [p for p in paths if p.startswith("slides/") and p.endswith(".html") and p.count("/") >= 2]
+        if len(config) + len(css) + len(slides) < len(paths):
+            return [("reload", {"paths": paths})]
+        events = []
+        if config:
+            events.append(("config-changed", {"paths": config}))
+        if css:
+            events.append(("css-changed", {"paths": css}))
+        for p in slides:
+            _, part, file = p.split("/", 2)
+            events.append(("slide-changed", {"part": part, "file": file, "path": p}))
+        return events
 
     @classmethod
-    def _start_watcher(cls, target_dir: Path, container_dir: Path) -> None:
-        """Start a background thread that watches target_dir and container dirs for file changes."""
-        watch_dirs = [target_dir, container_dir / "css", container_dir / "js"]
-        watch_dirs = [d for d in watch_dirs if d.exists()]
+    def _broadcast_reload(cls, paths: list | None = None, channel: str | None = None) -> None:
+        """Send typed hot-reload events for the changed URL paths (full reload when paths is empty)."""
+        for event, data in cls._hot_reload_events(paths) if paths else [("reload", {"paths": []})]:
+            cls._broadcast_event(event, data, channel)
 
-        def collect_mtimes():
-            mtimes = {}
-            for wd in watch_dirs:
-                for f in wd.rglob("*"):
-                    if f.is_file() and f.suffix in (".html", ".css", ".js", ".yaml", ".json"):
-                        mtimes[str(f)] = f.stat().st_mtime
-            return mtimes
+    @classmethod
+    def _changed_by_deck(cls, changed) -> dict:
+        """把变化的文件映射为 {讲稿名称: [相对 URL 路径]}（slides/…、style/…、css/…、js/…）。
+
+        目标目录下的文件只通知所属讲稿（目录嵌套时归最内层的讲稿）；container/ 下的骨架文件通知所有讲稿。
+        """
+        result = {name: set() for name in cls.decks}
+        for file_path in changed:
+            p = Path(file_path)
+            owners = [deck for deck in cls.decks.values() if deck.target_dir in p.parents]
+            if owners:
+                deck = max(owners, key=lambda d: len(d.target_dir.parts))
+                result[deck.name].add(p.relative_to(deck.target_dir).as_posix())
+            else:
+                try:
+                    rel = p.relative_to(CONTAINER).as_posix()
+                except ValueError:
+                    rel = p.as_posix()
+                for paths in result.values():
+                    paths.add(rel)
+        return {name: sorted(paths) for name, paths in result.items() if paths}
 
-        cls._watch_mtimes = collect_mtimes()
+    @classmethod
+    def _start_watcher(cls, container_dir: Path, backend: str = "auto") -> None:
+        """Start one background thread that watches every mounted target dir and the container dirs.
+
+        连续的保存（编辑器一次写多个文件）在 WATCH_DEBOUNCE_SECS 静默期内合并为一次通知；
+        嵌套的目录只监视最外层。
+        """
+        roots = [deck.target_dir for deck in cls.decks.values()] + [container_dir / "css", container_dir / "js"]
+        roots = list(dict.fromkeys(d.resolve() for d in roots if d.exists()))
+        watch_dirs = [d for d in roots if not any(other in d.parents for other in roots)]
+        watcher = make_watcher(watch_dirs, backend)
+        cls._watcher = watcher
 
         def watcher_loop():
-            while True:
-                time.sleep(1)
+            while cls._watcher is watcher:
                 try:
-                    cur = collect_mtimes()
-                    if cur != cls._watch_mtimes:
-                        cls._watch_mtimes = cur
-                        print("  [watch] 检测到文件变化，通知浏览器刷新…")
-                        cls._broadcast_reload()
+                    changed = watcher.wait(None)
+                    cls.metrics.observe("deck_watch_scan_duration_seconds", watcher.last_scan_secs, backend=watcher.name)
+                    if not changed:
+                        continue
+                    detected = time.perf_counter()
+                    # Debounce: keep collecting until the burst goes quiet
+                    while True:
+                        more = watcher.wait(WATCH_DEBOUNCE_SECS)
+                        if not more:
+                            break
+                        cls.metrics.observe("deck_watch_scan_duration_seconds", watcher.last_scan_secs,
+                                            backend=watcher.name)
+                        changed |= more
+                    by_deck = cls._changed_by_deck(changed)
+                    paths = sorted({p for deck_paths in by_deck.values() for p in deck_paths})
+                    print(f"  [watch] 检测到 {len(paths)} 个文件变化，通知浏览器刷新… {', '.join(paths[:5])}"
+                          + (" …" if len(paths) > 5 else "")
+                          + (f"（讲稿: {', '.join(by_deck)}）" if len(cls.decks) > 1 else ""))
+                    for name, deck_paths in by_deck.items():
+                        cls._broadcast_reload(deck_paths, name)
+                    cls.metrics.observe("deck_watch_batch_duration_seconds", time.perf_counter() - detected)
                 except Exception as e:
+                    if cls._watcher is not watcher:
+                        break
                     print(f"  [watch] 错误: {e}")
+                    time.sleep(WATCH_POLL_SECS)
 
-        t = threading.Thread(target=watcher_loop, daemon=True)
+        t = threading.Thread(target=watcher_loop, name="deck-watch", daemon=True)
         t.start()
         cls._watch_thread = t
+        print(f"  [watch] 后端: {watcher.name}，监视 {len(watch_dirs)} 个目录")
 
-    @staticmethod
-    def _new_log_file(logs_dir: Path) -> Path:
-        ts = __import__("datetime").datetime.now().strftime("%Y%m%d-%H%M%S")
-        return logs_dir / f"session-{ts}.json"
-
-    @staticmethod
-    def _find_active_log(logs_dir: Path) -> tuple:
-        """Return (filepath, entries_list) for the most recent log file, or (new_path, None)."""
-        existing = sorted(logs_dir.glob("session-*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
-        if existing:
-            try:
-                data = json.loads(existing[0].read_text(encoding="utf-8"))
-                entries = data.get("entries", [])
-                return (existing[0], entries)
-            except (json.JSONDecodeError, KeyError):
-                pass
-        # No valid existing file
-        ts = __import__("datetime").datetime.now().strftime("%Y%m%d-%H%M%S")
-        return (logs_dir / f"session-{ts}.json", None)
+    @classmethod
+    def _stop_watcher(cls) -> None:
+        watcher, cls._watcher = cls._watcher, None
+        if watcher is not None:
+            watcher.close()
 
     def _handle_save(self) -> None:
         """处理 POST /save — 接收编辑器修改并写入文件。"""
@@ -321,23 +2174,57 @@ class DeckHandler(SimpleHTTPRequestHandler):
         text_changes = payload.get("textChanges", {})
         deletions = payload.get("deletions", {})
 
+        started = time.perf_counter()
         try:
             # 1. Write CSS overrides
             if css_rules:
+                css_started = time.perf_counter()
                 self._write_css_overrides(css_rules)
+                self.metrics.observe("deck_save_css_duration_seconds", time.perf_counter() - css_started)
+
+            # 2. 每个 slide 一个任务并行执行：只解析一次、写一次，同一文件的并发保存按文件锁串行
+            pool = self._save_executor()
+            keys = list(dict.fromkeys([*dom_changes, *text_changes, *deletions]))
+            futures = [pool.submit(self._timed_patch, key, dom_changes.get(key) or {},
+                                   text_changes.get(key) or {}, deletions.get(key) or []) for key in keys]
+            files = [f.result() for f in futures]
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        updated = sum(1 for f in files if f.get("updated"))
+        errors = [f for f in files if "error" in f]
+        result = {"files": files, "ms": round((time.perf_counter() - started) * 1000, 2)}
+        if errors:
+            self._send_json(500, {"error": f"{len(errors)} 个文件保存失败: {errors[0]['error']}", **result})
+            return
+        self._send_json(200, {"message": f"已保存 {len(css_rules)} 条 CSS 规则 + {updated} 个文件的结构修改", **result})
 
-            # 2. Apply text & DOM changes to slide HTML files
-            files_updated = set()
-            if dom_changes:
-                files_updated.update(self._apply_dom_changes(dom_changes))
-            if text_changes:
-                files_updated.update(self._apply_text_changes(text_changes))
-            if deletions:
-                files_updated.update(self._apply_deletions(deletions))
+    @classmethod
+    def _save_executor(cls) -> ThreadPoolExecutor:
+        with cls._file_locks_guard:
+            if cls._save_pool is None:
+                cls._save_pool = ThreadPoolExecutor(max_workers=SAVE_WORKERS, thread_name_prefix="deck-save")
+            return cls._save_pool
 
-            self._send_json(200, {"message": f"已保存 {len(css_rules)} 条 CSS 规则 + {len(files_updated)} 个文件的结构修改"})
+    @classmethod
+    def _file_lock(cls, path: Path) -> threading.Lock:
+        """取 path 的文件锁。表中只保存弱引用，调用方须在整个保存期间持有返回的锁对象。"""
+        with cls._file_locks_guard:
+            return cls._file_locks.setdefault(str(path), threading.Lock())
+
+    def _timed_patch(self, slide_key: str, dom: dict, text: dict, deletions: list) -> dict:
+        """在保存线程池中执行 _patch_slide，返回该文件的结果与耗时（含等待文件锁的时间）。"""
+        started = time.perf_counter()
+        entry = {"slideKey": slide_key}
+        try:
+            entry["updated"] = self._patch_slide(slide_key, dom, text, deletions) is not None
         except Exception as e:
-            self._send_json(500, {"error": str(e)})
+            entry["error"] = str(e)
+        elapsed = time.perf_counter() - started
+        self.metrics.observe("deck_save_file_duration_seconds", elapsed)
+        entry["ms"] = round(elapsed * 1000, 2)
+        return entry
 
     def _send_json(self, code: int, data: dict) -> None:
         body = json.dumps(data, ensure_ascii=False).encode("utf-8")
@@ -349,383 +2236,52 @@ class DeckHandler(SimpleHTTPRequestHandler):
         self.wfile.write(body)
 
     def _write_css_overrides(self, css_rules: list) -> None:
-        """将 CSS 规则写入 style/editor-overrides.css，按 slideKey 前缀分组。"""
-        # 按 slideKey 分组
-        grouped = {}
-        for rule in css_rules:
-            slide_key = rule.get("slideKey", "")
-            selector = rule.get("selector", "")
-            props = rule.get("props", {})
-            if not slide_key or not selector or not props:
-                continue
-            grouped.setdefault(slide_key, []).append((selector, props))
-
-        if not grouped:
-            return
-
-        style_dir = self.target_dir / "style"
-        style_dir.mkdir(parents=True, exist_ok=True)
-
-        css_path = style_dir / "editor-overrides.css"
-        lines = ["/* Editor CSS Overrides — auto-generated */"]
-        for slide_key, rules in grouped.items():
-            lines.append(f"\n/* {slide_key} */")
-            for selector, props in rules:
-                decls = "".join(f"  {p}: {v} !important;\n" for p, v in props.items())
-                lines.append(f'[data-slide-key="{slide_key}"] {selector} {{\n{decls}}}')
-        lines.append("")
-
-        css_path.write_text("\n".join(lines), encoding="utf-8")
-        print(f"  [save] CSS overrides → {css_path} ({len(grouped)} slides)")
-
-    def _apply_dom_changes(self, dom_changes: dict) -> list:
-        """将 DOM 结构修改写回单页 HTML 文件。返回更新的文件路径列表。"""
-        slides_dir = self.target_dir / "slides"
-        updated = []
-
-        for slide_key, changes in dom_changes.items():
-            parts = slide_key.split("/", 1)
-            if len(parts) != 2:
-                print(f"  [save] 跳过无效的 slideKey: {slide_key}")
-                continue
-            slide_path = slides_dir / parts[0] / parts[1]
-            if not slide_path.is_file():
-                print(f"  [save] 跳过不存在的文件: {slide_path}")
-                continue
-
-            html = slide_path.read_text(encoding="utf-8")
-
-            # Handle appended elements
-            appended = changes.get("appended", [])
-            if appended:
-                for template in appended:
-                    html = self._append_to_slide_body(html, template)
-
-            # Handle reordered elements
-            reordered = changes.get("reordered", {})
-            if reordered:
-                for parent_path, fingerprints in reordered.items():
-                    html = self._reorder_children(html, parent_path, fingerprints)
-
-            slide_path.write_text(html, encoding="utf-8")
-            updated.append(str(slide_path))
-            print(f"  [save] DOM changes → {slide_path}")
-
-        return updated
-
-    def _apply_text_changes(self, text_changes: dict) -> list:
-        """将文本修改写回单页 HTML 文件。"""
-        slides_dir = self.target_dir / "slides"
-        updated = []
-
-        for slide_key, changes in text_changes.items():
-            parts = slide_key.split("/", 1)
-            if len(parts) != 2:
-                continue
-            slide_path = slides_dir / parts[0] / parts[1]
-            if not slide_path.is_file():
-                continue
-
-            html = slide_path.read_text(encoding="utf-8")
-
-            for selector, new_html in changes.items():
-                html = self._replace_element_text(html, selector, new_html)
-
-            slide_path.write_text(html, encoding="utf-8")
-            updated.append(str(slide_path))
-            print(f"  [save] Text changes → {slide_path} ({len(changes)} edits)")
-
-        return updated
-
-    def _apply_deletions(self, deletions: dict) -> list:
-        """从 HTML 文件中删除指定选择器匹配的元素。"""
-        slides_dir = self.target_dir / "slides"
-        updated = []
-
-        for slide_key, selectors in deletions.items():
-            parts = slide_key.split("/", 1)
-            if len(parts) != 2:
-                continue
-            slide_path = slides_dir / parts[0] / parts[1]
-            if not slide_path.is_file():
-                continue
-
-            html = slide_path.read_text(encoding="utf-8")
-            modified = False
-
-            for selector in selectors:
-                # Walk the selector path to find the parent context
-                path_parts = selector.split(" > ")
-                last_part = path_parts[-1]
-                tag_m = re.match(r'([a-z]+)', last_part)
-                if not tag_m:
-                    continue
-                tag = tag_m.group(1)
-                nth_m = re.search(r':nth-of-type\((\d+)\)', selector)
-                nth = int(nth_m.group(1)) if nth_m else 1
-
-                # Narrow down to parent scope if path has > 1 part
-                scope_html = html
-                scope_start = 0
-                if len(path_parts) > 1:
-                    # Find the parent container by walking path_parts[:-1]
-                    for pp in path_parts[:-1]:
-                        pp_tag_m = re.match(r'([a-z]+)', pp)
-                        if not pp_tag_m:
-                            continue
-                        pp_tag = pp_tag_m.group(1)
-                        pp_nth_m = re.search(r':nth-of-type\((\d+)\)', pp)
-                        pp_nth = int(pp_nth_m.group(1)) if pp_nth_m else 1
-                        pp_cls_m = re.search(r'\.([a-z_-]+)', pp)
-                        pp_cls = pp_cls_m.group(1) if pp_cls_m else None
-
-                        # Find nth <pp_tag> in scope_html
-                        found_pp = 0
-                        pos = 0
-                        while found_pp < pp_nth:
-                            m = re.search(r'<' + pp_tag + r'[\s>]', scope_html[pos:], re.IGNORECASE)
-                            if not m:
-                                break
-                            found_pp += 1
-                            if found_pp == pp_nth:
-                                # Extract this parent's content
-                                pp_open = scope_start + pos + m.start()
-                                gt = scope_html[scope_start + pos + m.start():].find('>')
-                                if gt == -1:
-                                    break
-                                content_start = scope_start + pos + m.start() + gt + 1
-                                # Find matching close tag
-                                depth = 1
-                                scan = content_start
-                                while depth > 0:
-                                    no = html.find('<' + pp_tag, scan)
-                                    nc = html.find('</' + pp_tag + '>', scan)
-                                    if nc == -1:
-                                        break
-                                    if no != -1 and no < nc:
-                                        at = html[no + len(pp_tag) + 1] if no + len(pp_tag) + 1 < len(html) else ''
-                                        if at in (' ', '>', '\n', '\r'):
-                                            depth += 1
-                                        scan = no + len(pp_tag) + 1
-                                    else:
-                                        depth -= 1
-                                        if depth == 0:
-                                            scope_html = html[content_start:nc]
-                                            scope_start = content_start
-                                            break
-                                        scan = nc + len(pp_tag) + 3
-                                break
-                            pos = m.end()
-
-                # Now scope_html contains the parent's content
-                # Parse only top-level children (like CSS nth-of-type on direct children)
-                top_children = DeckHandler._parse_top_level_tags(scope_html, tag)
-
-                found = 0
-                for child_start, child_end in top_children:
-                    found += 1
-                    if found == nth:
-                        # Found! Remove from abs_pos + child_start to abs_pos + child_end
-                        abs_pos = scope_start + child_start
-                        end = scope_start + child_end
-                        while end < len(html) and html[end] in (' ', '\t', '\n', '\r'):
-                            end += 1
-                        html = html[:abs_pos] + html[end:]
-                        modified = True
-                        break
-
-            if modified:
-                html = re.sub(r'\n\s*\n\s*\n', '\n\n', html)
-                slide_path.write_text(html, encoding="utf-8")
-                updated.append(str(slide_path))
-                print(f"  [save] Deletions → {slide_path} ({len(selectors)} removed)")
-
-        return updated
-
-    def _replace_element_text(self, html: str, selector: str, new_html: str) -> str:
-        """在 HTML 中查找匹配选择器的元素并替换其内部 HTML。"""
-        # selector 如 "div.card:nth-of-type(2) > p"
-        # 简化处理：按标签和 nth-of-type 匹配
-        parts = selector.split(" > ")
-        last_part = parts[-1]  # 目标元素
-        tag_match = re.match(r'([a-z]+)(.*)', last_part)
-        if not tag_match:
-            return html
-        tag = tag_match.group(1)
-
-        # 提取 nth-of-type
-        nth_match = re.search(r':nth-of-type\((\d+)\)', selector)
-        nth = int(nth_match.group(1)) if nth_match else 1
-
-        # 在 HTML 中找到第 nth 个 <tag> 并替换内容
-        pattern = re.compile(r'(<' + tag + r'\b[^>]*>)([\s\S]*?)(</' + tag + r'>)', re.IGNORECASE)
-
-        count = 0
-        def replace_nth(m):
-            nonlocal count
-            count += 1
-            if count == nth:
-                return m.group(1) + new_html + m.group(3)
-            return m.group(0)
-
-        return pattern.sub(replace_nth, html)
-
-    def _append_to_slide_body(self, html: str, template: str) -> str:
-        """在 slide HTML 的 .slide-body 末尾（或 </section> 前）追加新元素。"""
-        # Strip inline styles from the template (styles go to CSS overrides)
-        clean_template = re.sub(r'\s*style="[^"]*"', '', template)
-
-        # Insert before </section>
-        pos = html.rfind("</section>")
-        if pos > 0:
-            html = html[:pos].rstrip() + "\n" + clean_template + "\n" + html[pos:]
-        else:
-            # Fallback: append to end of HTML
-            html = html.rstrip() + "\n" + clean_template + "\n"
-        return html
-
-    def _reorder_children(self, html: str, parent_selector: str, fingerprints: list) -> str:
-        """根据文本指纹在 HTML 中重排子元素顺序。使用简单的解析器处理嵌套结构。"""
-        parent_class = None
-        for part in parent_selector.split(" > "):
-            if "." in part:
-                parent_class = part.split(".")[-1].split(":")[0]
-        # Use the LAST (innermost) class in the selector
-
-        if not parent_class:
-            print(f"  [save] 无法解析父容器选择器: {parent_selector}")
-            return html
-
-        # 定位父容器：找到 class 包含 parent_class 的 div 的起止位置
-        start_marker = f'class="{parent_class}"'
-        alt_marker = f"class='{parent_class}'"
-        # 也匹配 class 列表中包含 parent_class 的情况
-        pattern = re.compile(
-            r'(<div\s[^>]*\bclass="[^"]*\b' + re.escape(parent_class) + r'\b[^"]*"[^>]*>)',
-            re.IGNORECASE
-        )
-        m = pattern.search(html)
-        if not m:
-            # 尝试单引号
-            pattern_alt = re.compile(
-                r"(<div\s[^>]*\bclass='[^']*\b" + re.escape(parent_class) + r"\b[^']*'[^>]*>)",
-                re.IGNORECASE
-            )
-            m = pattern_alt.search(html)
-        if not m:
-            print(f"  [save] 未找到容器 .{parent_class}")
-            return html
-
-        open_tag_start = m.start()
-        open_tag = m.group(0)
-
-        # 通过计数匹配的 </div> 找到容器结束位置
-        depth = 1
-        pos = m.end()
-        while depth > 0 and pos < len(html):
-            next_open = html.find("<div", pos)
-            next_close = html.find("</div>", pos)
-            if next_close == -1:
-                break
-            if next_open != -1 and next_open < next_close:
-                depth += 1
-                pos = next_open + 4
-            else:
-                depth -= 1
-                if depth == 0:
-                    close_tag_end = next_close + len("</div>")
-                    break
-                pos = next_close + len("</div>")
-
-        if depth != 0:
-            print(f"  [save] 无法匹配容器的闭合标签")
-            return html
-
-        container_content = html[m.end():close_tag_end - len("</div>")]
-
-        # 解析容器的直接子元素（顶层 div）
-        children = self._parse_top_level_divs(container_content)
-        if not children or len(children) < 2:
-            return html
-        if len(children) != len(fingerprints):
-            print(f"  [save] 子元素数({len(children)}) ≠ 指纹数({len(fingerprints)})，跳过重排")
-            return html
-
-        # 对每个子元素计算文本指纹（模拟 textContent：去标签不加空格，保留源码空白）
-        child_by_fp = {}
-        for ch in children:
-            text = re.sub(r'<[^>]+>', '', ch)
-            fp = re.sub(r'\s+', ' ', text).strip()[:60]
-            child_by_fp[fp] = ch
-
-        if any(fp not in child_by_fp for fp in fingerprints):
-            print(f"  [save] 指纹不匹配，跳过重排")
-            return html
-
-        # 按指纹顺序重排
-        reordered_content = "\n".join(child_by_fp[fp] for fp in fingerprints)
-        html = html[:m.end()] + "\n" + reordered_content + "\n" + html[close_tag_end - len("</div>"):]
-        print(f"  [save] 已重排 .{parent_class} 中的 {len(fingerprints)} 个子元素")
-        return html
+        """把增量 CSS 规则合并进当前讲稿的 editor-overrides.css 索引，内容变化时才重写文件。"""
+        store = self.deck.overrides()
+        written, total = store.apply(css_rules)
+        if written:
+            print(f"  [save] CSS overrides → {store.path} ({len(css_rules)} 条增量，共 {total} 条)")
+
+    def _slide_path(self, slide_key: str) -> Path | None:
+        """slideKey（"ch01/01-cover.html"）→ 目标目录下的 slide 文件；无效或越界时返回 None。"""
+        parts = slide_key.split("/", 1)
+        if len(parts) != 2:
+            print(f"  [save] 跳过无效的 slideKey: {slide_key}")
+            return None
+        slides_dir = (self.deck.target_dir / "slides").resolve()
+        slide_path = (slides_dir / parts[0] / parts[1]).resolve()
+        if slides_dir not in slide_path.parents or not slide_path.is_file():
+            print(f"  [save] 跳过不存在的文件: {slide_path}")
+            return None
+        return slide_path
+
+    def _patch_slide(self, slide_key: str, dom: dict, text: dict, deletions: list) -> Path | None:
+        """把一个 slide 的全部修改应用到同一棵文档树并原子写回。返回写入的路径（无修改时 None）。"""
+        slide_path = self._slide_path(slide_key)
+        if slide_path is None:
+            return None
+        lock = self._file_lock(slide_path)  # 强引用：保存期间其他线程取到的是同一把锁
+        with lock:
+            return self._patch_slide_locked(slide_path, dom, text, deletions)
+
+    def _patch_slide_locked(self, slide_path: Path, dom: dict, text: dict, deletions: list) -> Path | None:
+        doc = SlideDocument(slide_path.read_text(encoding="utf-8"))
+        for template in dom.get("appended", []):
+            doc.append(template)
+        for parent_selector, fingerprints in dom.get("reordered", {}).items():
+            doc.reorder(parent_selector, fingerprints)
+        edited = sum(doc.set_inner_html(sel, new_html) for sel, new_html in text.items())
+        removed = sum(doc.delete(sel) for sel in deletions)
+        if not doc.changed:
+            return None
+        atomic_write_text(slide_path, doc.serialize())
+        print(f"  [save] {slide_path} (追加 {len(dom.get('appended', []))}, 重排 {len(dom.get('reordered', {}))}, "
+              f"文本 {edited}/{len(text)}, 删除 {removed}/{len(deletions)})")
+        return slide_path
 
     @staticmethod
-    def _parse_top_level_tags(content: str, tag: str) -> list:
-        """Parse all top-level occurrences of <tag>...</tag> in content.
-        Returns list of (start, end) tuples. Handles nested tags of same type."""
-        result = []
-        depth = 0
-        start = -1
-        i = 0
-        tag_len = len(tag)
-        open_str = '<' + tag
-        close_str = '</' + tag + '>'
-        while i < len(content):
-            if content[i:i+tag_len+1] == open_str and (i + tag_len + 1 >= len(content) or content[i+tag_len+1] in (' ', '>', '\n', '\r')):
-                if depth == 0:
-                    start = i
-                depth += 1
-                i += tag_len + 1
-                continue
-            elif content[i:i+tag_len+3] == close_str:
-                depth -= 1
-                if depth == 0 and start >= 0:
-                    result.append((start, i + tag_len + 3))
-                    start = -1
-                i += tag_len + 3
-                continue
-            i += 1
-        return result
-
-    @staticmethod
-    def _parse_top_level_divs(content: str) -> list:
-        """解析 HTML 内容中所有顶层 div 元素。"""
-        result = []
-        depth = 0
-        start = -1
-        i = 0
-        while i < len(content):
-            if content[i:i+4] == "<div" and (i == 0 or depth == 0):
-                # Only capture top-level divs (depth == 0)
-                if depth > 0:
-                    depth += 1
-                else:
-                    start = i
-                    depth = 1
-                i += 4
-                continue
-            elif content[i:i+6] == "</div>":
-                depth -= 1
-                if depth == 0 and start >= 0:
-                    result.append(content[start:i+6])
-                    start = -1
-                i += 6
-                continue
-            i += 1
-        return result
-
-    def _serve_from(self, root: Path, req_path: str, strip_prefix: str = "") -> None:
-        """从指定根目录提供请求路径的文件。可选去除路径前缀。"""
-        import mimetypes
+    def _resolve_file(root: Path, req_path: str, strip_prefix: str = "") -> Path:
+        """请求路径 → root 下的文件（目录取其 index.html）。越出 root 时抛 PermissionError，不是文件时抛 FileNotFoundError。"""
         rel = req_path.lstrip("/")
         if strip_prefix and rel.startswith(strip_prefix):
             rel = rel[len(strip_prefix):]
@@ -733,21 +2289,180 @@ class DeckHandler(SimpleHTTPRequestHandler):
             rel = "index.html"
         file_path = (root / rel).resolve()
         if not str(file_path).startswith(str(root.resolve())):
-            self.send_error(403)
-            return
+            raise PermissionError(req_path)
         if file_path.is_dir():
             file_path = (file_path / "index.html").resolve()
         if not file_path.is_file():
+            raise FileNotFoundError(req_path)
+        return file_path
+
+    def _serve_from(self, root: Path, req_path: str, strip_prefix: str = "") -> None:
+        """从指定根目录提供请求路径的文件。可选去除路径前缀。"""
+        try:
+            file_path = self._resolve_file(root, req_path, strip_prefix)
+        except PermissionError:
+            self.send_error(403)
+            return
+        except FileNotFoundError:
             self.send_error(404)
             return
 
-        mime_type, _ = mimetypes.guess_type(str(file_path))
-        self.send_response(200)
-        self.send_header("Content-Type", mime_type or "application/octet-stream")
+        try:
+            st = file_path.stat()
+            if self.asset_cache.streams(st.st_size):
+                # 大文件（视频、高清图等）不读入内存，按请求范围从文件描述符流式发送
+                self._send_file(file_path, st)
+                return
+            asset = self.asset_cache.get(file_path)
+        except OSError:
+            self.send_error(404)
+            return
+
+        self._send_asset(asset)
+
+    def _send_asset(self, asset: CachedAsset, cache_control: str = "no-cache") -> None:
+        """发送缓存文件：协商 Content-Encoding，处理条件 GET 与 Range。"""
+        rng = self._byte_range(asset.size, asset.etag, asset.last_modified)
+        body, encoding = asset.data, None
+        if rng is None and self.compress and asset.compressible:
+            for enc in self._accepted_encodings():
+                packed = self.asset_cache.variant(asset, enc)
+                if packed is not None:
+                    body, encoding = packed, enc
+                    break
+        # 每种编码是不同的表示，强 ETag 需要区分
+        etag = asset.etag if encoding is None else f'{asset.etag[:-1]}-{encoding}"'
+        if self._send_entity_headers(etag, asset.mtime_ns, asset.last_modified, asset.content_type,
+                                     len(body), cache_control, asset.compressible, encoding, rng):
+            self.wfile.write(body if rng is None else body[rng[0]:rng[1] + 1])
+
+    def _send_file(self, file_path: Path, st: os.stat_result) -> None:
+        """不经缓存直接从文件描述符发送，只发送请求的范围。
+
+        socket.sendfile 在支持的平台上使用 os.sendfile（内核零拷贝），否则退回按块 read/send，
+        两种方式的内存占用都与文件大小无关。
+        """
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+        content_type = mimetypes.guess_type(str(file_path))[0] or "application/octet-stream"
+        with open(file_path, "rb") as f:
+            rng = self._byte_range(st.st_size, etag, last_modified)
+            if not self._send_entity_headers(etag, st.st_mtime_ns, last_modified, content_type,
+                                             st.st_size, "no-cache", False, None, rng):
+                return
+            start, end = rng or (0, st.st_size - 1)
+            self.wfile.flush()
+            if end >= start:
+                self.connection.sendfile(f, start, end - start + 1)
+
+    def _send_entity_headers(self, etag: str, mtime_ns: int, last_modified: str, content_type: str, length: int,
+                             cache_control: str, vary: bool, encoding: str | None, rng) -> bool:
+        """发送 304 / 416 / 206 / 200 的响应头。返回 True 表示调用方需继续写出（范围内的）响应体。"""
+        if self._is_not_modified(etag, mtime_ns):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Cache-Control", cache_control)
+            if vary:
+                self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return False
+
+        if rng == RANGE_NOT_SATISFIABLE:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{length}")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return False
+
+        self.send_response(200 if rng is None else 206)
+        self.send_header("Content-Type", content_type)
         self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Cache-Control", "public, max-age=3600")
+        # no-cache = 允许缓存但每次用 ETag 重新验证：编辑后立即可见，未变化时只回 304
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Accept-Ranges", "bytes")
+        if vary:
+            self.send_header("Vary", "Accept-Encoding")
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        if rng is not None:
+            self.send_header("Content-Range", f"bytes {rng[0]}-{rng[1]}/{length}")
+            length = rng[1] - rng[0] + 1
+        self.send_header("Content-Length", str(length))
         self.end_headers()
-        self.wfile.write(file_path.read_bytes())
+        return True
+
+    def _byte_range(self, size: int, etag: str, last_modified: str):
+        """解析单段 Range（含 If-Range）。返回 (start, end)（含端点）、None（发送完整响应）或 RANGE_NOT_SATISFIABLE。
+
+        多段范围不支持，按 RFC 9110 允许的方式忽略并返回完整内容。
+        """
+        header = self.headers.get("Range", "").strip()
+        if not header.startswith("bytes="):
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range is not None:
+            # ETag 用强比较；日期必须与 Last-Modified 完全一致，否则表示已变化，发送完整内容
+            if if_range.strip() not in (etag, last_modified):
+                return None
+        spec = header[len("bytes="):].strip()
+        if "," in spec:
+            return None
+        first, sep, last = spec.partition("-")
+        if not sep:
+            return None
+        try:
+            if not first:
+                suffix = int(last)
+                if suffix <= 0:
+                    return RANGE_NOT_SATISFIABLE
+                return (max(0, size - suffix), size - 1) if size else RANGE_NOT_SATISFIABLE
+            start = int(first)
+            end = int(last) if last else max(start, size - 1)
+        except ValueError:
+            return None
+        if start < 0 or end < start:
+            return None
+        return (start, min(end, size - 1)) if start < size else RANGE_NOT_SATISFIABLE
+
+    def _accepted_encodings(self) -> list:
+        """解析 Accept-Encoding（含 q 值），按服务器偏好返回客户端可接受的编码。"""
+        prefs = {}
+        for item in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = item.strip().partition(";")
+            q = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    q = 0.0
+            if name:
+                prefs[name.strip().lower()] = q
+        star = prefs.get("*", 0.0)
+        return [enc for enc in ENCODING_PREFERENCE if enc in ENCODERS and prefs.get(enc, star) > 0]
+
+    def _is_not_modified(self, etag: str, mtime_ns: int) -> bool:
+        """按 RFC 9110 处理条件 GET：If-None-Match 优先，其次 If-Modified-Since。"""
+        inm = self.headers.get("If-None-Match")
+        if inm is not None:
+            if inm.strip() == "*":
+                return True
+            # If-None-Match 使用弱比较：忽略 W/ 前缀
+            tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+            return etag in tags
+        ims = self.headers.get("If-Modified-Since")
+        if ims:
+            try:
+                since = parsedate_to_datetime(ims).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(mtime_ns // 1_000_000_000) <= int(since)
+        return False
 
     def log_message(self, fmt, *args) -> None:
         if args and isinstance(args[0], str):
@@ -760,6 +2475,66 @@ class DeckHandler(SimpleHTTPRequestHandler):
                 print(f"  [container] {p}")
 
 
+class DeckServer(ThreadingHTTPServer):
+    """有界线程池的并发 HTTP 服务器。
+
+    每个请求由固定大小的线程池处理（而非每连接一个线程）；SSE 连接通过 detach_request()
+    交给 SSEHub 后不再占用 worker，也不会在请求结束时被关闭。HTTP/1.1 长连接在两个请求之间
+    停放在 KeepAliveHub 中，同样不占用 worker。
+    """
+
+    daemon_threads = True
+    request_queue_size = 128  # 多标签页并发建连时避免 listen backlog 溢出导致的 SYN 重传（~1s）
+
+    def __init__(self, server_address, handler_class, max_workers: int = DEFAULT_WORKERS) -> None:
+        super().__init__(server_address, handler_class)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="deck-worker")
+        self._detached: set = set()
+        self._parking: dict = {}  # 本次请求结束后转入 KeepAliveHub 的连接 → client_address
+        self._detached_lock = threading.Lock()
+        self._keepalive = KeepAliveHub(self._resume_request)
+        self._keepalive.start()
+
+    def process_request(self, request, client_address) -> None:
+        self._pool.submit(self.process_request_thread, request, client_address)
+
+    def detach_request(self, request) -> None:
+        """标记连接已被其他组件接管（如 SSEHub），请求结束时跳过 shutdown。"""
+        with self._detached_lock:
+            self._detached.add(request)
+
+    def keep_alive(self, request, client_address) -> None:
+        """请求处理完毕且连接保持打开：在 shutdown_request 时把连接交给 KeepAliveHub 等待下一个请求。"""
+        with self._detached_lock:
+            self._parking[request] = client_address
+
+    def idle_connections(self) -> int:
+        return self._keepalive.parked_count()
+
+    def _resume_request(self, request, client_address) -> None:
+        try:
+            self._pool.submit(self.process_request_thread, request, client_address)
+        except RuntimeError:  # 线程池已关闭
+            request.close()
+
+    def shutdown_request(self, request) -> None:
+        with self._detached_lock:
+            if request in self._detached:
+                self._detached.discard(request)
+                return
+            parked = request in self._parking
+            client_address = self._parking.pop(request, None)
+        if parked:
+            self._keepalive.park(request, client_address)
+            return
+        super().shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._keepalive.close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
 def read_slides_config(target: Path) -> dict | None:
     config_path = target / "slides-config.json"
     if not config_path.exists():
@@ -770,18 +2545,48 @@ def read_slides_config(target: Path) -> dict | None:
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="启动 HTML Deck 本地服务")
-    parser.add_argument("target", nargs="?", default=".", help="目标目录（包含 slides-config.json 和 slides/）")
+    parser.add_argument("targets", nargs="*", default=["."], metavar="target",
+                        help="目标目录（包含 slides-config.json 和 slides/）；给出多个时每个挂在 /<名称>/ 下，"
+                             "名称默认取目录名，也可写成 名称=目录")
     parser.add_argument("--theme", default=None, help="CSS 主题（默认从 config.yaml 读取）")
     parser.add_argument("--port", type=int, default=8080, help="HTTP 端口 (default: 8080)")
     parser.add_argument("--no-browser", action="store_true", help="不自动打开浏览器")
     parser.add_argument("--watch", action="store_true", help="监视文件变化并自动刷新浏览器")
+    parser.add_argument("--watch-backend", choices=("auto", "inotify", "poll"), default="auto",
+                        help="文件监视后端：auto 在 Linux 上使用 inotify，否则轮询 (default: auto)")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB,
+                        help=f"静态文件内存缓存上限（MB，default: {DEFAULT_CACHE_MB}）")
+    parser.add_argument("--sendfile-mb", type=float, default=DEFAULT_SENDFILE_MB,
+                        help=f"大于此大小（MB）的文件不进内存缓存，用 sendfile 流式发送 (default: {DEFAULT_SENDFILE_MB})")
+    parser.add_argument("--no-compress", action="store_true", help="禁用 gzip/brotli 响应压缩")
+    parser.add_argument("--precompress", action="store_true",
+                        help="启动时预读并预压缩 container/ 与目标 slides/、style/ 下的全部文件")
+    parser.add_argument("--log-to-json", nargs="+", metavar="JSONL", default=None,
+                        help="把 logs/session-*.jsonl 转换为旧版整文件 JSON 后退出")
+    parser.add_argument("--thumbs-dir", default=str(THUMBS_DIR),
+                        help="缩略图磁盘缓存目录 (default: container/.cache/thumbs)")
+    parser.add_argument("--thumb-workers", type=int, default=THUMB_WORKERS,
+                        help=f"缩略图渲染的无头浏览器数，首次请求 /thumbs 时才启动 (default: {THUMB_WORKERS})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"请求处理线程数上限 (default: {DEFAULT_WORKERS})；SSE 连接不占用 worker")
     args = parser.parse_args()
 
-    target = Path(args.target).resolve()
-    if not target.exists():
-        print(f"错误：目标目录不存在: {target}")
+    if args.log_to_json:
+        for src in args.log_to_json:
+            out = convert_session_log(Path(src))
+            print(f"{src} → {out}")
         return
 
+    try:
+        decks = parse_mounts(args.targets)
+    except ValueError as e:
+        print(f"错误：{e}")
+        return
+    for deck in decks:
+        if not deck.target_dir.exists():
+            print(f"错误：目标目录不存在: {deck.target_dir}")
+            return
+
     # 读取 CSS 配置
     deck_config = load_deck_config()
     theme_names = {t["id"] for t in deck_config.get("themes", [])}
@@ -789,33 +2594,66 @@ def main() -> None:
     theme = args.theme or default_theme(deck_config)
 
     print(f"容器目录: {CONTAINER}")
-    print(f"目标目录: {target}")
+    for deck in decks:
+        print(f"目标目录: {deck.target_dir}" + (f" → /{deck.name}/" if deck.name else ""))
     print(f"主题: {theme} (可用: {', '.join(sorted(theme_names))})")
     print(f"字号: {', '.join(sorted(fontsize_names))}")
 
-    slides_config = read_slides_config(target)
-    if slides_config:
-        print(f"讲稿: {slides_config.get('title', '(无标题)')}")
-        print(f"章节: {len(slides_config.get('parts', {}))} 个")
-        print(f"幻灯片: {len(slides_config.get('slides', []))} 页")
+    for deck in decks:
+        slides_config = read_slides_config(deck.target_dir)
+        if not slides_config:
+            continue
+        if deck.name:
+            print(f"讲稿 /{deck.name}/: {slides_config.get('title', '(无标题)')}"
+                  f"（{len(slides_config.get('parts', {}))} 个章节，{len(slides_config.get('slides', []))} 页）")
+        else:
+            print(f"讲稿: {slides_config.get('title', '(无标题)')}")
+            print(f"章节: {len(slides_config.get('parts', {}))} 个")
+            print(f"幻灯片: {len(slides_config.get('slides', []))} 页")
 
-    DeckHandler.target_dir = target
+    DeckHandler.decks = {deck.name: deck for deck in decks}
     DeckHandler.theme_dir = CONTAINER / "css" / "theme" / theme
     DeckHandler.deck_config = deck_config
     DeckHandler.theme_names = theme_names
     DeckHandler.fontsize_names = fontsize_names
     DeckHandler.watch_mode = args.watch
+    DeckHandler.asset_cache = AssetCache(max(0, args.cache_mb) * 1024 * 1024,
+                                         int(max(0.0, args.sendfile_mb) * 1024 * 1024))
+    DeckHandler.stylesheets = StylesheetCompiler(DeckHandler.asset_cache)
+    DeckHandler.compress = not args.no_compress
+    DeckHandler.thumbnails = ThumbnailRenderer(Path(args.thumbs_dir), args.thumb_workers)
+    log_cfg = load_client_config().get("log", {})
+    DeckHandler.log_store = SessionLogStore(LOGS_DIR, log_cfg.get("maxEntriesPerFile", DEFAULT_LOG_MAX_ENTRIES))
+    n_overrides = sum(deck.overrides().load() for deck in decks)
+    if n_overrides:
+        print(f"编辑器覆盖样式: {n_overrides} 条")
+
+    if args.precompress and DeckHandler.compress:
+        t0 = time.perf_counter()
+        roots = [CONTAINER] + [deck.target_dir / name for deck in decks
+                               for name in ("slides", "style", "slides-config.json")]
+        files, raw, packed = DeckHandler.asset_cache.warm([r for r in roots if r.exists()])
+        for theme_id in theme_names:
+            for fontsize_id in fontsize_names:
+                sheet = DeckHandler.stylesheets.get(theme_id, fontsize_id)
+                if sheet is not None:
+                    for encoding in ENCODERS:
+                        DeckHandler.asset_cache.variant(sheet, encoding)
+        print(f"预压缩: {files} 个文件，{raw / 1024:.0f} KB → {packed / 1024:.0f} KB"
+              f"（{', '.join(ENCODERS)}，{time.perf_counter() - t0:.2f}s）")
 
     if args.watch:
-        DeckHandler._start_watcher(target, CONTAINER)
+        DeckHandler.sse_hub = SSEHub()
+        DeckHandler.sse_hub.start()
+        DeckHandler._start_watcher(CONTAINER, args.watch_backend)
         print("监视模式: 已启用（文件变化时自动刷新浏览器）")
 
     if not DeckHandler.theme_dir.exists():
         print(f"警告：主题目录不存在: {DeckHandler.theme_dir}")
 
-    server = HTTPServer(("localhost", args.port), DeckHandler)
+    server = DeckServer(("localhost", args.port), DeckHandler, max_workers=max(1, args.workers))
     url = f"http://localhost:{args.port}"
-    print(f"\n服务已启动: {url}")
+    print(f"\n服务已启动: {url}" + (f"（{len(decks)} 个讲稿）" if len(decks) > 1 else ""))
     print("按 Ctrl+C 停止")
 
     if not args.no_browser:
@@ -825,6 +2663,11 @@ def main() -> None:
         server.serve_forever()
     except KeyboardInterrupt:
         print("\n服务已停止。")
+    finally:
+        server.server_close()
+        DeckHandler.thumbnails.close()
+        if DeckHandler.sse_hub is not None:
+            DeckHandler.sse_hub.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+"""bench-serve.py — Load benchmark for serve.py: many viewer tabs + one editor on one server.
+
+Generates a synthetic deck in a temp directory, starts serve.py with --watch, parks
+one SSE connection per tab, then has every tab flip through slides while an editor
+posts /save in a loop. Reports latency percentiles per route class; a head-of-line
+blocked server shows up as timeouts / multi-second max latencies.
+
+Usage: python bench-serve.py [--tabs 20] [--slides 60] [--rounds 3] [--port 8765] [--workers 32]
+"""
+
+import argparse, json, socket, statistics, subprocess, sys, tempfile, threading, time
+import urllib.request
+from pathlib import Path
+
+CONTAINER = Path(__file__).resolve().parent.parent
+
+
+def make_deck(root, n_slides):
+    slides = []
+    for i in range(n_slides):
+        part = f"ch{i // 20 + 1:02d}"
+        name = f"{i % 20 + 1:02d}-slide.html"
+        d = root / "slides" / part
+        d.mkdir(parents=True, exist_ok=True)
+        body = "\n".join(f'    <div class="card"><h3>Card {j}</h3><p>{"lorem ipsum " * 20}</p></div>' for j in range(6))
+        (d / name).write_text(
+            f'<section class="slide">\n  <div class="slide-body">\n    <h2>Slide {i}</h2>\n'
+            f'    <div class="grid">\n{body}\n    </div>\n  </div>\n</section>\n', encoding="utf-8")
+        slides.append({"part": part, "file": name, "title": f"Slide {i}"})
+    parts = sorted({s["part"] for s in slides})
+    (root / "style").mkdir(exist_ok=True)
+    for p in parts:
+        (root / "style" / f"{p}.css").write_text(f".part-{p} h2 {{ letter-spacing: 0; }}\n", encoding="utf-8")
+    config = {"title": "Bench", "parts": {p: p for p in parts}, "partOrder": parts, "slides": slides}
+    (root / "slides-config.json").write_text(json.dumps(config), encoding="utf-8")
+    return slides
+
+
+def open_sse(port):
+    s = socket.create_connection(("localhost", port), timeout=10)
+    s.sendall(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    s.recv(4096)
+    return s
+
+
+def timed(url, data=None, timeout=10):
+    t0 = time.perf_counter()
+    try:
+        req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"} if data else {})
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            r.read()
+        ok = True
+    except Exception:
+        ok = False
+    return time.perf_counter() - t0, ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description="serve.py concurrency benchmark")
+    ap.add_argument("--tabs", type=int, default=20)
+    ap.add_argument("--slides", type=int, default=60)
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=32)
+    args = ap.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    target = Path(tmp.name)
+    slides = make_deck(target, args.slides)
+    proc = subprocess.Popen(
+        [sys.executable, str(CONTAINER / "serve.py"), str(target), "--port", str(args.port),
+         "--no-browser", "--watch", "--workers", str(args.workers)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://localhost:{args.port}"
+    for _ in range(40):
+        if timed(base + "/slides-config.json", timeout=1)[1]:
+            break
+        time.sleep(0.25)
+    else:
+        proc.terminate()
+        sys.exit("server failed to start")
+
+    samples = {"index": [], "css": [], "slide": [], "save": []}
+    failures = {k: 0 for k in samples}
+    lock = threading.Lock()
+
+    def record(kind, dt_ok):
+        dt, ok = dt_ok
+        with lock:
+            samples[kind].append(dt)
+            if not ok:
+                failures[kind] += 1
+
+    stop = threading.Event()
+
+    def tab():
+        record("index", timed(base + "/"))
+        for css in ("css/common/base.css", "css/common/components.css", "css/common/editor.css"):
+            record("css", timed(f"{base}/{css}"))
+        for _ in range(args.rounds):
+            for s in slides:
+                record("slide", timed(f"{base}/slides/{s['part']}/{s['file']}"))
+
+    def editor():
+        payload = json.dumps({"cssRules": [{"slideKey": f"{slides[0]['part']}/{slides[0]['file']}",
+                                            "selector": "h2", "props": {"color": "#f00"}}]}).encode()
+        while not stop.is_set():
+            record("save", timed(base + "/save", data=payload))
+            time.sleep(0.05)
+
+    sse = []
+    try:
+        sse = [open_sse(args.port) for _ in range(args.tabs)]
+        t0 = time.perf_counter()
+        ed = threading.Thread(target=editor)
+        ed.start()
+        tabs = [threading.Thread(target=tab) for _ in range(args.tabs)]
+        for t in tabs:
+            t.start()
+        for t in tabs:
+            t.join()
+        stop.set()
+        ed.join()
+        wall = time.perf_counter() - t0
+    finally:
+        for s in sse:
+            s.close()
+        proc.terminate()
+        proc.wait(timeout=5)
+        tmp.cleanup()
+
+    total = sum(len(v) for v in samples.values())
+    print(f"tabs={args.tabs} (SSE parked) slides={args.slides} rounds={args.rounds} workers={args.workers}")
+    print(f"{total} requests in {wall:.2f}s → {total / wall:.0f} req/s")
+    print(f"{'route':<6} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'fail':>5}")
+    for kind, v in samples.items():
+        if not v:
+            continue
+        v = sorted(v)
+        p95 = v[min(len(v) - 1, int(len(v) * 0.95))]
+        print(f"{kind:<6} {len(v):>6} {statistics.median(v) * 1e3:>8.1f} {p95 * 1e3:>8.1f} "
+              f"{v[-1] * 1e3:>8.1f} {failures[kind]:>5}")
+    sys.exit(1 if any(failures.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""test-build-unit.py — Unit tests for build.py (static output tree, incremental rebuild).
+
+Run: python test-build-unit.py
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+CONTAINER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(CONTAINER))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import build  # noqa: E402
+import serve  # noqa: E402
+
+make_deck = __import__("test-serve-unit").make_deck
+
+
+class BuildTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        self.target = make_deck(root / "deck")
+        self.out = root / "dist"
+        build.configure_handler()
+        serve.DeckHandler.asset_cache = serve.AssetCache()
+        serve.DeckHandler.stylesheets = serve.StylesheetCompiler(serve.DeckHandler.asset_cache)
+        serve.DeckHandler._index_cache = None
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def run_build(self, compress: bool = True) -> build.StaticBuilder:
+        builder = build.StaticBuilder(serve.Deck(self.target), self.out, compress=compress)
+        builder.build()
+        return builder
+
+    def build_config(self) -> dict:
+        html = (self.out / "index.html").read_text(encoding="utf-8")
+        m = re.search(r"\.build = (\{.*?\});</script>", html)
+        self.assertIsNotNone(m)
+        return json.loads(m[1])
+
+    def test_output_tree_is_fingerprinted(self):
+        self.run_build()
+        html = (self.out / "index.html").read_text(encoding="utf-8")
+        self.assertRegex(html, r'src="js/deck\.[0-9a-f]{10}\.js"')
+        self.assertRegex(html, r'href="css/compiled/[\w-]+/[\w-]+\.[0-9a-f]{10}\.css"')
+        self.assertNotIn('src="js/deck.js"', html)
+        assets = self.build_config()["assets"]
+        for url in ("slides/ch01/01-slide.html", "style/ch01.css", "css/config.yaml", "js/deck.js"):
+            self.assertIn(url, assets)
+            self.assertTrue((self.out / assets[url]).is_file(), url)
+        self.assertEqual(self.build_config()["slidesConfig"]["title"], "Test")
+        self.assertTrue((self.out / "slides-config.json").is_file())
+        self.assertTrue((self.out / (assets["js/deck.js"] + ".gz")).is_file())
+
+    def test_fingerprint_matches_content(self):
+        self.run_build()
+        assets = self.build_config()["assets"]
+        src = (self.target / "slides" / "ch01" / "01-slide.html").read_bytes()
+        self.assertEqual((self.out / assets["slides/ch01/01-slide.html"]).read_bytes(), src)
+
+    def test_rebuild_without_changes_writes_nothing(self):
+        first = self.run_build()
+        self.assertGreater(first.written, 0)
+        second = self.run_build()
+        self.assertEqual(second.written, 0)
+        self.assertEqual(second.removed, 0)
+        self.assertEqual(second.skipped, first.written)
+
+    def test_changed_slide_replaces_only_its_output(self):
+        self.run_build()
+        old = self.build_config()["assets"]["slides/ch01/02-slide.html"]
+        slide = self.target / "slides" / "ch01" / "02-slide.html"
+        slide.write_text(slide.read_text(encoding="utf-8") + "<p>edited</p>\n", encoding="utf-8")
+        again = self.run_build()
+        new = self.build_config()["assets"]["slides/ch01/02-slide.html"]
+        self.assertNotEqual(old, new)
+        self.assertEqual(again.written, 2)  # slide + index.html
+        self.assertEqual(again.removed, 1)
+        self.assertFalse((self.out / old).exists())
+        self.assertIn("edited", (self.out / new).read_text(encoding="utf-8"))
+
+    def test_slide_image_is_copied_and_linked(self):
+        image = self.target / "slides" / "ch01" / "img" / "chart.png"
+        image.parent.mkdir()
+        image.write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(range(64)))
+        slide = self.target / "slides" / "ch01" / "01-slide.html"
+        slide.write_text('<section class="slide"><img src="slides/ch01/img/chart.png" alt="">'
+                         '<a href="https://example.com/">x</a></section>\n', encoding="utf-8")
+        self.run_build()
+        assets = self.build_config()["assets"]
+        built = assets["slides/ch01/img/chart.png"]
+        self.assertRegex(built, r"^slides/ch01/img/chart\.[0-9a-f]{10}\.png$")
+        self.assertEqual((self.out / built).read_bytes(), image.read_bytes())
+        fragment = (self.out / assets["slides/ch01/01-slide.html"]).read_text(encoding="utf-8")
+        self.assertIn(f'src="{built}"', fragment)
+        self.assertIn('href="https://example.com/"', fragment)
+        self.assertEqual(self.run_build().written, 0)
+
+        image.write_bytes(image.read_bytes() + b"\0")
+        again = self.run_build()
+        self.assertEqual(again.written, 3)  # image, the slide that links it, index.html
+        self.assertFalse((self.out / built).exists())
+
+    def test_no_compress_drops_precompressed_files(self):
+        self.run_build()
+        self.run_build(compress=False)
+        self.assertEqual(list(self.out.rglob("*.gz")), [])
+        self.assertEqual(list(self.out.rglob("*.br")), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)